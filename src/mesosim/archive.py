@@ -0,0 +1,279 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Indexed local case store for archived products
+
+Warnings (IEM ``results`` JSON bundles like ``tests/testfiles/svroax_*.json``) and raw lsr
+tuples are ingested once into SQLite, indexed by product type, ``utcvalid`` and the range
+of lat/lon buckets their polygon covers, with timestamps stored pre-parsed as epoch
+seconds. Replay code can then query time windows straight from disk::
+
+    python -m mesosim.archive case.db svroax_*.json --lsr lsrs.json
+"""
+
+# Imports
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone
+from math import floor
+from sqlite3 import dbapi2 as sql
+
+from .core.timing import epoch_seconds, std_fmt, to_utc
+from .warning import parse_polygon, parse_vtec
+
+default_bucket_degrees = 1.0
+
+schema = """
+CREATE TABLE IF NOT EXISTS case_meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS products (
+    product_id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    product_type TEXT NOT NULL,
+    utcvalid TEXT NOT NULL,
+    utcvalid_epoch INTEGER NOT NULL,
+    begin_epoch INTEGER,
+    end_epoch INTEGER,
+    min_lat_bucket INTEGER,
+    max_lat_bucket INTEGER,
+    min_lon_bucket INTEGER,
+    max_lon_bucket INTEGER,
+    min_lat REAL,
+    max_lat REAL,
+    min_lon REAL,
+    max_lon REAL,
+    data TEXT NOT NULL
+);
+"""
+
+indexes = """
+CREATE INDEX IF NOT EXISTS products_type_time ON products (product_type, utcvalid_epoch);
+CREATE INDEX IF NOT EXISTS products_time ON products (utcvalid_epoch);
+CREATE INDEX IF NOT EXISTS products_bucket_range
+    ON products (min_lat_bucket, min_lon_bucket, utcvalid_epoch);
+"""
+
+
+def _epoch(time):
+    return int(epoch_seconds(time))
+
+
+def _product_type_from_text(text):
+    # The AFOS pil (e.g. SVROAX) follows the WMO header line; the first three letters are
+    # the product category
+    lines = [line.strip() for line in text.replace("\r", "").split("\n") if line.strip()]
+    for i, line in enumerate(lines[:-1]):
+        words = line.split()
+        if len(words) >= 3 and words[1].isalpha() and len(words[1]) == 4:
+            return lines[i + 1][:3]
+    return None
+
+
+class CaseStore:
+    """SQLite store of one case's archived warnings and lsrs."""
+
+    def __init__(self, path, bucket_degrees=None):
+        self.con = sql.connect(path)
+        self.con.executescript(schema)
+        stored = self.con.execute(
+            "SELECT value FROM case_meta WHERE key = 'bucket_degrees'"
+        ).fetchone()
+        if stored is not None:
+            self.bucket_degrees = float(stored[0])
+        else:
+            self.bucket_degrees = bucket_degrees or default_bucket_degrees
+            self.con.execute(
+                "INSERT INTO case_meta (key, value) VALUES ('bucket_degrees', ?)",
+                [str(self.bucket_degrees)],
+            )
+        stored = self.con.execute(
+            "SELECT value FROM case_meta WHERE key = 'max_bucket_span'"
+        ).fetchone()
+        self.max_bucket_span = int(stored[0]) if stored is not None else 0
+        self.con.executescript(indexes)
+        self.con.commit()
+
+    def _bucket(self, lat, lon):
+        return floor(lat / self.bucket_degrees), floor(lon / self.bucket_degrees)
+
+    def _bucket_range(self, min_lat, max_lat, min_lon, max_lon):
+        """(min_lat_bucket, max_lat_bucket, min_lon_bucket, max_lon_bucket) of a bbox."""
+        lat0, lon0 = self._bucket(min_lat, min_lon)
+        lat1, lon1 = self._bucket(max_lat, max_lon)
+        return lat0, lat1, lon0, lon1
+
+    def _note_span(self, ranges):
+        # Widest product (in buckets), so queries can bound min_*_bucket from below
+        span = max(
+            [max(lat1 - lat0, lon1 - lon0) for lat0, lat1, lon0, lon1, *_ in ranges],
+            default=0,
+        )
+        if span > self.max_bucket_span:
+            self.max_bucket_span = span
+            self.con.execute(
+                "INSERT OR REPLACE INTO case_meta (key, value) VALUES ('max_bucket_span', ?)",
+                [str(span)],
+            )
+
+    def _insert(self, product_type, utcvalid, data, points, begin=None, end=None):
+        if points:
+            lats = [point[0] for point in points]
+            lons = [point[1] for point in points]
+            bounds = (min(lats), max(lats), min(lons), max(lons))
+            buckets = self._bucket_range(*bounds)
+        else:
+            bounds = buckets = (None,) * 4
+        digest = hashlib.sha1((product_type + "\0" + data).encode("utf-8")).hexdigest()
+        cursor = self.con.execute(
+            "INSERT OR IGNORE INTO products (digest, product_type, utcvalid, utcvalid_epoch, "
+            "begin_epoch, end_epoch, min_lat_bucket, max_lat_bucket, min_lon_bucket, "
+            "max_lon_bucket, min_lat, max_lat, min_lon, max_lon, data) "
+            "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            [
+                digest,
+                product_type,
+                to_utc(utcvalid).strftime(std_fmt),
+                _epoch(utcvalid),
+                None if begin is None else _epoch(begin),
+                None if end is None else _epoch(end),
+                *buckets,
+                *bounds,
+                data,
+            ],
+        )
+        if cursor.rowcount and points:
+            self._note_span([buckets])
+        return cursor.rowcount
+
+    def add_warning(self, text, utcvalid, product_type=None):
+        """Store one warning text; returns 1 if new, 0 if already stored."""
+        vtec = parse_vtec(text)
+        return self._insert(
+            product_type or _product_type_from_text(text) or "WRN",
+            utcvalid,
+            text,
+            parse_polygon(text),
+            begin=vtec["begin"] if vtec else None,
+            end=vtec["end"] if vtec else None,
+        )
+
+    def add_lsr(self, lsr_tuple):
+        """Store one raw lsr tuple (element 10 is the valid time)."""
+        lsr_tuple = tuple(lsr_tuple)
+        return self._insert(
+            "LSR",
+            lsr_tuple[10],
+            json.dumps(lsr_tuple),
+            [(float(lsr_tuple[2]), float(lsr_tuple[3]))],
+        )
+
+    def ingest_warning_json(self, path, product_type=None):
+        """Load an IEM ``results`` JSON bundle of warnings; returns the number added."""
+        with open(path, "r") as f:
+            data = json.load(f)
+        added = sum(
+            self.add_warning(result["data"], result["utcvalid"], product_type)
+            for result in data["results"]
+        )
+        self.con.commit()
+        return added
+
+    def ingest_lsrs(self, lsr_tuples):
+        """Load raw lsr tuples; returns the number added."""
+        added = sum(self.add_lsr(lsr_tuple) for lsr_tuple in lsr_tuples)
+        self.con.commit()
+        return added
+
+    def ingest_lsr_json(self, path):
+        """Load a JSON list of raw lsr tuples."""
+        with open(path, "r") as f:
+            return self.ingest_lsrs(json.load(f))
+
+    def _select(self, columns, product_type, start, end, bbox):
+        clauses, params = [], []
+        if product_type is not None:
+            if isinstance(product_type, str):
+                product_type = [product_type]
+            clauses.append("product_type IN ({})".format(",".join("?" * len(product_type))))
+            params.extend(product_type)
+        if start is not None:
+            clauses.append("utcvalid_epoch >= ?")
+            params.append(_epoch(start))
+        if end is not None:
+            clauses.append("utcvalid_epoch < ?")
+            params.append(_epoch(end))
+        if bbox is not None:
+            # Narrow by overlapping bucket ranges first (index on the lower ends, which lie
+            # at most max_bucket_span below the query), then by the exact product bounds
+            min_lat, min_lon, max_lat, max_lon = bbox
+            lat0, lat1, lon0, lon1 = self._bucket_range(min_lat, max_lat, min_lon, max_lon)
+            span = self.max_bucket_span
+            clauses.append(
+                "min_lat_bucket BETWEEN ? AND ? AND max_lat_bucket >= ? "
+                "AND min_lon_bucket BETWEEN ? AND ? AND max_lon_bucket >= ?"
+            )
+            params.extend([lat0 - span, lat1, lat0, lon0 - span, lon1, lon0])
+            clauses.append("max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?")
+            params.extend([min_lat, max_lat, min_lon, max_lon])
+        query = "SELECT {} FROM products".format(columns)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return self.con.execute(query + " ORDER BY utcvalid_epoch, product_id", params)
+
+    def warnings(self, start=None, end=None, product_type=None, bbox=None):
+        """(utcvalid, text) of warnings valid in [start, end).
+
+        ``bbox`` is (lat0, lon0, lat1, lon1); warnings whose polygon bounds overlap it match.
+        """
+        if product_type is None:
+            product_type = [
+                row[0]
+                for row in self.con.execute(
+                    "SELECT DISTINCT product_type FROM products WHERE product_type != 'LSR'"
+                )
+            ]
+            if not product_type:
+                return []
+        return self._select("utcvalid, data", product_type, start, end, bbox).fetchall()
+
+    def lsrs(self, start=None, end=None, bbox=None):
+        """Raw lsr tuples valid in [start, end), ready for ``scale_raw_lsr_to_cur_time``."""
+        return [
+            tuple(json.loads(row[0]))
+            for row in self._select("data", "LSR", start, end, bbox)
+        ]
+
+    def time_range(self):
+        """(first, last) utcvalid of stored products as aware datetimes."""
+        first, last = self.con.execute(
+            "SELECT MIN(utcvalid_epoch), MAX(utcvalid_epoch) FROM products"
+        ).fetchone()
+        if first is None:
+            return None, None
+        return (
+            datetime.fromtimestamp(first, tz=timezone.utc),
+            datetime.fromtimestamp(last, tz=timezone.utc),
+        )
+
+    def close(self):
+        self.con.close()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Ingest archived products for a case.")
+    arg_parser.add_argument("store", help="case store database to create or update")
+    arg_parser.add_argument("warnings", nargs="*", help="IEM warning JSON bundles")
+    arg_parser.add_argument("--lsr", action="append", default=[], help="JSON lsr tuple lists")
+    args = arg_parser.parse_args(argv)
+
+    store = CaseStore(args.store)
+    for path in args.warnings:
+        print("{}: {} warnings added".format(path, store.ingest_warning_json(path)))
+    for path in args.lsr:
+        print("{}: {} lsrs added".format(path, store.ingest_lsr_json(path)))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,10 @@
 r"""Actions/Hazards documentation TODO"""
 
 import json
-from datetime import datetime, timedelta
-from functools import partial
+from datetime import datetime, timedelta, timezone
 
-import numpy as np
-import pytz
-from dateutil import parser
-
-from ..core.timing import db_time_fmt
+from ..core.profiling import profiled, span
+from ..core.timing import format_time, parse_time
 from ..core.utils import maybe_cast_float
 
 
@@ -43,7 +39,7 @@ class Action:
 
     def generate_message(self):
         """Generate the message."""
-        return datetime.now(tz=pytz.UTC).strftime("%H%MZ") + ": " + self.message
+        return datetime.now(tz=timezone.utc).strftime("%H%MZ") + ": " + self.message
 
     def alter_status(self, team, *args):
         """Alter status if needed by action_type."""
@@ -57,20 +53,49 @@ class Action:
                 )
 
 
-class Hazard(Action):
+def _parse_flag(value):
+    return bool(value) and str(value).lower() != "false"
+
+
+def _choose_message(msg, rng=None):
+    """Flexibly choose message as given or random from list.
+
+    ``rng`` is a ``numpy.random.Generator`` to draw from (default: the global numpy state).
+    """
+    if isinstance(msg, (list, tuple)):
+        if rng is None:
+            import numpy as np
+
+            rng = np.random
+        return msg[rng.choice(len(msg))]
+    else:
+        return msg
+
+
+class HazardSpec:
     """
-    Hazards! Real stuff is going down here.
+    Hazard definitions! Static and shared by every team (and thread) using a registry.
+
+    Runtime state (expiry, the originating action) lives in ``ActiveHazard`` records
+    created by ``activate``.
     """
 
+    __slots__ = (
+        "type",
+        "alter_status",
+        "probability",
+        "message",
+        "message_end",
+        "duration_min",
+        "overridden_by_list",
+        "speed_limit",
+        "direction_lock",
+        "speed_lock",
+    )
+
     is_adjustment = False
     is_hazard = True
     action_type = "hazard"
-    expiry_time = None
-    overridden_by_list = []
-    message_end = None
-    speed_limit = None
-    direction_lock = False
-    speed_lock = False
 
     def __init__(
         self,
@@ -80,49 +105,124 @@ class Hazard(Action):
         message=None,
         message_end=None,
         duration_min=None,
-        overridden_by_list=["end_chase"],
+        overridden_by_list=("end_chase",),
         speed_limit=None,
         direction_lock=False,
         speed_lock=False,
     ):
-        self.type = hazard_type  # string
-        self.alter_status = alter_status  # function(team, config, hazard)
-        self.probability = probability  # function(team, config, hazard)
-        self.message = message  # string or iterable of strings
-        self.message_end = message_end
-        self.expiry_time = datetime.now(tz=pytz.UTC) + timedelta(minutes=duration_min)
-        self.overridden_by_list = overridden_by_list
-        self.speed_limit = speed_limit
-        self.direction_lock = direction_lock
-        self.speed_lock = speed_lock
+        if isinstance(message, list):
+            message = tuple(message)
+        if isinstance(message_end, list):
+            message_end = tuple(message_end)
+        for name, value in (
+            ("type", hazard_type),  # string
+            ("alter_status", alter_status),  # function(team, config, hazard)
+            ("probability", probability),  # function(team, config, hazard)
+            ("message", message),  # string or tuple of strings
+            ("message_end", message_end),
+            ("duration_min", duration_min),
+            ("overridden_by_list", tuple(overridden_by_list)),
+            ("speed_limit", speed_limit),
+            ("direction_lock", direction_lock),
+            ("speed_lock", speed_lock),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HazardSpec is immutable (set state on an ActiveHazard)")
+
+    def __delattr__(self, name):
+        raise AttributeError("HazardSpec is immutable (set state on an ActiveHazard)")
+
+    def __repr__(self):
+        return "HazardSpec({!r})".format(self.type)
+
+    def activate(self, action_id=None, now=None):
+        """Start this hazard now, returning its per-team state record."""
+        if now is None:
+            now = datetime.now(tz=timezone.utc)
+        return ActiveHazard(self, now + timedelta(minutes=self.duration_min), action_id)
+
+    def generate_message(self):
+        """Generate the message."""
+        return datetime.now(tz=timezone.utc).strftime("%H%MZ") + ": " + _choose_message(
+            self.message
+        )
+
+    def overridden_by(self, other_hazard):
+        """Check if this hazard is overridden by the other hazard type."""
+        return other_hazard.type in self.overridden_by_list
+
+
+# Previous name, from when definition and state were one object
+Hazard = HazardSpec
+
+
+class ActiveHazard:
+    """
+    A hazard in effect for one team: the shared spec plus expiry and stored overrides.
+    """
+
+    __slots__ = (
+        "spec",
+        "expiry_time",
+        "action_id",
+        "message",
+        "message_end",
+        "overridden_by_list",
+        "speed_limit",
+        "direction_lock",
+        "speed_lock",
+    )
+
+    is_adjustment = False
+    is_hazard = True
+    action_type = "hazard"
+
+    def __init__(self, spec, expiry_time, action_id=None):
+        self.spec = spec
+        self.expiry_time = expiry_time
+        self.action_id = action_id
+        self.message = spec.message
+        self.message_end = spec.message_end
+        self.overridden_by_list = spec.overridden_by_list
+        self.speed_limit = spec.speed_limit
+        self.direction_lock = spec.direction_lock
+        self.speed_lock = spec.speed_lock
 
     @classmethod
-    def from_hazard_tuple(cls, hazard_tuple):
-        return cls(
-            hazard_tuple[0],
-            message=json.loads(hazard_tuple[2]),
-            message_end=json.loads(hazard_tuple[3]),
-            expiry_time=parser.parse(hazard_tuple[1]),
-            overridden_by_list=json.loads(hazard_tuple[4]),
-            speed_limit=maybe_cast_float(hazard_tuple[5]),
-            direction_lock=bool(hazard_tuple[6]) and str(hazard_tuple[6]).lower() != "false",
-            speed_lock=bool(hazard_tuple[7]) and str(hazard_tuple[7]).lower() != "false",
+    def from_hazard_tuple(cls, spec, hazard_tuple):
+        """Restore from a hazard_queue row (type, expiry, message, ..., speed_lock)."""
+        hazard = cls(spec, parse_time(hazard_tuple[1]))
+        hazard.message = json.loads(hazard_tuple[2])
+        hazard.message_end = json.loads(hazard_tuple[3])
+        hazard.overridden_by_list = json.loads(hazard_tuple[4])
+        hazard.speed_limit = maybe_cast_float(hazard_tuple[5])
+        hazard.direction_lock = _parse_flag(hazard_tuple[6])
+        hazard.speed_lock = _parse_flag(hazard_tuple[7])
+        return hazard
+
+    def __repr__(self):
+        return "ActiveHazard({!r}, expires {})".format(
+            self.spec.type, format_time(self.expiry_time)
         )
 
-    def update_from_tuple(self, hazard_tuple):
-        self.message = json.loads(hazard_tuple[2])
-        self.message_end = json.loads(hazard_tuple[3])
-        self.expiry_time = parser.parse(hazard_tuple[1])
-        self.overridden_by_list = json.loads(hazard_tuple[4])
-        self.speed_limit = maybe_cast_float(hazard_tuple[5])
-        self.direction_lock = bool(hazard_tuple[6]) and str(hazard_tuple[6]).lower() != "false"
-        self.speed_lock = bool(hazard_tuple[7]) and str(hazard_tuple[7]).lower() != "false"
-        return self
+    @property
+    def type(self):
+        return self.spec.type
+
+    @property
+    def alter_status(self):
+        return self.spec.alter_status
+
+    @property
+    def probability(self):
+        return self.spec.probability
 
     def to_hazard_tuple(self):
         return (
             self.type,
-            self.expiry_time.strftime(db_time_fmt),
+            format_time(self.expiry_time),
             json.dumps(self.message),
             json.dumps(self.message_end),
             json.dumps(self.overridden_by_list),
@@ -131,29 +231,39 @@ class Hazard(Action):
             str(self.speed_lock),
         )
 
-    def _choose_message(self, end=False):
-        """Flexibly choose message or end message as given or random from list."""
-        msg = self.message_end if end else self.message
-        if isinstance(msg, (list, tuple)):
-            return np.random.choice(msg)
-        else:
-            return msg
+    def generate_message(self):
+        """Generate the message."""
+        return datetime.now(tz=timezone.utc).strftime("%H%MZ") + ": " + _choose_message(
+            self.message
+        )
 
-    def generate_expiry_message(self):
-        """Generate the expiry message."""
-        message = self._choose_message(end=True)
+    def generate_expiry_message(self, rng=None):
+        """Generate the expiry message (``rng`` as in ``shuffle_new_hazard``)."""
+        message = _choose_message(self.message_end, rng)
         if message is not None:
-            return datetime.now(tz=pytz.UTC).strftime("%H%MZ") + ": " + message
+            return datetime.now(tz=timezone.utc).strftime("%H%MZ") + ": " + message
         else:
             return ""
 
+    def is_expired(self, now=None):
+        if now is None:
+            now = datetime.now(tz=timezone.utc)
+        return self.expiry_time <= now
+
     def overridden_by(self, other_hazard):
         """Check if this hazard is overridden by the other hazard type."""
         return other_hazard.type in self.overridden_by_list
 
 
-def create_hazard_registry(config):
-    """Create the dictionary of all possible hazards given current config."""
+def create_hazard_registry(config, proximity=None):
+    """Create the dictionary of all possible hazards given current config.
+
+    With ``proximity`` (a ``ProximityGrid`` kept up to date with all team positions),
+    the chaser convergence probability scales with the number of nearby teams, down to
+    ``proximity.min_factor`` times the configured ``cc_prob`` for a team on its own.
+    """
+    import numpy as np
+
     hazard_list = []
 
     ############
@@ -182,7 +292,7 @@ def create_hazard_registry(config):
 
     if "speeding" in config.active_hazards:
         hazard_list.append(
-            Hazard(
+            HazardSpec(
                 "speeding",
                 speeding_alter_status,
                 speeding_prob,
@@ -206,7 +316,7 @@ def create_hazard_registry(config):
 
     if "dirt_road" in config.active_hazards:
         hazard_list.append(
-            Hazard(
+            HazardSpec(
                 "dirt_road",
                 dirt_road_alter_status,
                 (lambda x, y, z: dirt_road_prob),
@@ -227,7 +337,7 @@ def create_hazard_registry(config):
 
     def stuck_in_mud_prob(team, config, hazard):
         # Start with zero chance, then ramp up to set value at 90 minutes into sim
-        time_mult = max(1.0, (datetime.now(tz=pytz.UTC) - config.start_time).total_seconds() / 1800)
+        time_mult = max(1.0, (datetime.now(tz=timezone.utc) - config.start_time).total_seconds() / 1800)
         if team.is_hazard_active("dirt_road"):
             return team.vehicle.stuck_probability * time_mult
         else:
@@ -235,7 +345,7 @@ def create_hazard_registry(config):
 
     if "dirt_road" in config.active_hazards and "stuck_in_mud" in config.active_hazards:
         hazard_list.append(
-            Hazard(
+            HazardSpec(
                 "stuck_in_mud",
                 stuck_in_mud_alter_status,
                 stuck_in_mud_prob,
@@ -263,15 +373,20 @@ def create_hazard_registry(config):
 
     def cc_prob(team, config, hazard):
         # Zero to start, ramping to set value by 60 minutes in
-        time_mult = max(1.0, (datetime.now(tz=pytz.UTC) - config.start_time).seconds / 1800)
+        time_mult = max(1.0, (datetime.now(tz=timezone.utc) - config.start_time).seconds / 1800)
         if team.is_hazard_active("dirt_road") or team.speed <= 5:
             return 0.0
+        elif proximity is not None:
+            return (
+                float(config.hazard_config("cc_prob")) * time_mult
+                * proximity.density_factor(team)
+            )
         else:
             return float(config.hazard_config("cc_prob")) * time_mult
 
     if "cc" in config.active_hazards:
         hazard_list.append(
-            Hazard(
+            HazardSpec(
                 "cc",
                 cc_alter_status,
                 cc_prob,
@@ -305,7 +420,7 @@ def create_hazard_registry(config):
 
     if "flat_tire" in config.active_hazards:
         hazard_list.append(
-            Hazard(
+            HazardSpec(
                 "flat_tire",
                 flat_tire_alter_status,
                 (lambda x, y, z: flat_tire_prob),
@@ -320,7 +435,7 @@ def create_hazard_registry(config):
     ############
     # Dead End #
     ############
-    def dead_end_alter_status(team):
+    def dead_end_alter_status(team, config, hazard):
         team.direction = (float(team.direction) + 180) % 360
         team.status_color = "yellow"
         team.status_text = "Reached a dead end"
@@ -329,7 +444,7 @@ def create_hazard_registry(config):
 
     if "dead_end" in config.active_hazards:
         hazard_list.append(
-            Hazard(
+            HazardSpec(
                 "dead_end",
                 dead_end_alter_status,
                 (lambda x, y, z: dead_end_prob),
@@ -343,7 +458,7 @@ def create_hazard_registry(config):
     ################
     # Flooded Road #
     ################
-    def flooded_road_alter_status(team):
+    def flooded_road_alter_status(team, config, hazard):
         team.direction = (float(team.direction) + 180) % 360
         team.status_color = "yellow"
         team.status_text = "Reached a flooded road"
@@ -353,7 +468,7 @@ def create_hazard_registry(config):
 
     if "flooded_road" in config.active_hazards:
         hazard_list.append(
-            Hazard(
+            HazardSpec(
                 "flooded_road",
                 flooded_road_alter_status,
                 (lambda x, y, z: flooded_road_prob),
@@ -367,13 +482,13 @@ def create_hazard_registry(config):
     #############
     # End chase #
     #############
-    def end_chase_alter_status(team):
+    def end_chase_alter_status(team, config, hazard):
         team.speed = 0.0
         team.status_color = "red"
         team.status_text = "Chase Ended"
 
     hazard_list.append(
-        Hazard(
+        HazardSpec(
             "end_chase",
             end_chase_alter_status,
             (lambda x, y, z: 0.0),
@@ -387,14 +502,28 @@ def create_hazard_registry(config):
     return {hazard.type: hazard for hazard in hazard_list}
 
 
-def shuffle_new_hazard(team, seconds, hazards, config):
-    """Given a time interval, use registered hazards to shuffle a chance of a new hazard."""
+@profiled("shuffle_new_hazard")
+def shuffle_new_hazard(team, seconds, hazards, config, rng=None):
+    """Given a time interval, use registered hazards to shuffle a chance of a new hazard.
+
+    Returns the chosen ``HazardSpec`` (activate it, or pass it to ``Team.apply_hazard``) or
+    None. ``rng`` is a ``numpy.random.Generator`` to draw from; by default the global numpy
+    state is used, as in the live simulation.
+    """
+    import numpy as np
+
+    if rng is None:
+        rng = np.random
+
     # Hazards
     hazard_list = list(hazards.values())
-    hazard_probs = [seconds / 60 * hazard.probability(team, config, hazard) for hazard in hazard_list]
+    with span("shuffle_new_hazard.probability"):
+        hazard_probs = [
+            seconds / 60 * hazard.probability(team, config, hazard) for hazard in hazard_list
+        ]
     # Non-Hazard (remaining chance)
     hazard_list.append(None)
     hazard_probs.append(max(1.0 - np.sum(hazard_probs), np.sum(hazard_probs)))
     # Select one randomly
     hazard_probs = np.array(hazard_probs)
-    return np.random.choice(hazard_list, p=hazard_probs / hazard_probs.sum())
+    return hazard_list[rng.choice(len(hazard_list), p=hazard_probs / hazard_probs.sum())]
@@ -0,0 +1,144 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Event-driven hazard arrivals.
+
+An alternative to rolling ``shuffle_new_hazard`` every tick. Each hazard's probability is
+treated as a per-minute rate, so hazards for a team arrive as a Poisson process. Each
+team keeps an exponential "budget" of integrated rate left until its next hazard. A tick
+only subtracts ``rate * minutes`` from that budget, which is O(1) work when nothing is due.
+The chance of a hazard over a long gap is ``1 - exp(-rate * minutes)``, not a sum of
+probabilities that can go above 1::
+
+    arrivals = HazardArrivals()
+    ...
+    hazard = arrivals.advance(team, seconds, hazards, config)
+    if hazard is not None and not team.is_hazard_active(hazard.type):
+        team.apply_hazard(hazard)
+
+Rates are recomputed only when an input changes: the team's speed, its dirt road state,
+its vehicle or speeding override, the hazard registry, or the config DB version. They
+are also recomputed after ``refresh_seconds`` (five minutes by default), because the
+time-ramped hazards (stuck in mud, chaser convergence) drift over tens of minutes. The
+config DB version is read at most once per ``version_check_seconds`` of wall time, so a
+scheduler round that ticks every team queries it about once, not once per team. The
+remaining budget carries across a rate
+change. Since the process is memoryless, this is equivalent to redrawing the next
+arrival time, but it does not spend a random draw on the change.
+"""
+
+import random
+import time
+
+from ..core.profiling import span
+
+
+class _ArrivalState:
+    __slots__ = ("inputs", "rates", "total", "budget", "since_refresh")
+
+    def __init__(self, budget):
+        self.inputs = None
+        self.rates = []  # [(HazardSpec, per-minute rate)]
+        self.total = 0.0
+        self.budget = budget
+        self.since_refresh = 0.0
+
+
+class HazardArrivals:
+    """Per-team exponential hazard scheduler.
+
+    Parameters
+    ----------
+    refresh_seconds : float
+        Recompute rates at least this often (in tick seconds), even if no input changed.
+    rng : random.Random, optional
+        Source of randomness (defaults to a new ``random.Random``).
+    version_check_seconds : float
+        Reuse the config DB version read within this many wall-clock seconds.
+    """
+
+    def __init__(self, refresh_seconds=300.0, rng=None, version_check_seconds=1.0):
+        self.refresh_seconds = refresh_seconds
+        self.rng = random.Random() if rng is None else rng
+        self.version_check_seconds = version_check_seconds
+        self._teams = {}  # team path -> _ArrivalState
+        self._version = None  # (id(config), data_version, monotonic time read)
+
+    def _config_version(self, config):
+        now = time.monotonic()
+        cached = self._version
+        if (
+            cached is not None and cached[0] == id(config)
+            and now - cached[2] < self.version_check_seconds
+        ):
+            return cached[1]
+        version = config.data_version
+        self._version = (id(config), version, now)
+        return version
+
+    def _inputs(self, team, hazards, config):
+        vehicle = team.vehicle
+        return (
+            team.speed,
+            team.is_hazard_active("dirt_road"),
+            team.status.get("override_speeding"),
+            None if vehicle is None else vehicle.vehicle_type,
+            id(hazards),
+            self._config_version(config),
+        )
+
+    def _refresh(self, state, team, hazards, config, inputs):
+        with span("HazardArrivals.rates"):
+            rates = [
+                (hazard, hazard.probability(team, config, hazard))
+                for hazard in hazards.values()
+            ]
+        state.rates = [(hazard, rate) for hazard, rate in rates if rate > 0]
+        state.total = sum(rate for _, rate in state.rates)
+        state.inputs = inputs
+        state.since_refresh = 0.0
+
+    def advance(self, team, seconds, hazards, config):
+        """Advance the team's clock by ``seconds``; returns a due ``HazardSpec`` or None."""
+        state = self._teams.get(team.path)
+        if state is None:
+            state = self._teams[team.path] = _ArrivalState(self.rng.expovariate(1.0))
+        inputs = self._inputs(team, hazards, config)
+        if inputs != state.inputs or state.since_refresh >= self.refresh_seconds:
+            self._refresh(state, team, hazards, config, inputs)
+        state.since_refresh += seconds
+
+        if state.total <= 0:
+            return None
+        state.budget -= state.total * seconds / 60
+        if state.budget > 0:
+            return None
+
+        # Due: pick a hazard in proportion to its rate, then draw the next arrival
+        state.budget = self.rng.expovariate(1.0)
+        pick = self.rng.random() * state.total
+        for hazard, rate in state.rates:
+            pick -= rate
+            if pick < 0:
+                return hazard
+        return state.rates[-1][0]
+
+    def seconds_until_due(self, team):
+        """Expected seconds until the team's next hazard at current rates (None if idle)."""
+        state = self._teams.get(team.path)
+        if state is None or state.total <= 0:
+            return None
+        return state.budget / state.total * 60
+
+    def invalidate(self, team=None):
+        """Force a rate recompute for one team (or all) on its next ``advance``."""
+        if team is None:
+            self._version = None
+        states = self._teams.values() if team is None else [self._teams.get(team.path)]
+        for state in states:
+            if state is not None:
+                state.inputs = None
+
+    def forget(self, team):
+        """Drop a team's arrival state."""
+        self._teams.pop(team.path, None)
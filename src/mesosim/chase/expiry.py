@@ -0,0 +1,97 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Process-wide hazard expiry queue.
+
+Instead of scanning every team's ``active_hazards`` on every tick, a process that keeps
+many ``Team`` objects in memory can register them with one ``ExpiryQueue``. The queue is
+a min-heap keyed on ``expiry_time``. ``expire`` pops only the hazards that are due,
+removes them from their teams in one batch per team, and hands the expiry messages to a
+callback::
+
+    expiry = ExpiryQueue()
+    for team in teams:
+        expiry.track(team)
+    ...
+    team.apply_hazard(spec)
+    expiry.track(team)
+    ...
+    expiry.expire(callback=lambda team, hazards, messages: ...)
+    for team in teams:
+        team.write_status()
+
+Entries are validated lazily. A hazard that was cleared or replaced in the meantime (or a
+team whose ``active_hazards`` were reloaded from its DB) no longer matches its heap entry,
+and that entry is dropped when it comes due.
+"""
+
+import heapq
+import itertools
+from datetime import datetime, timezone
+
+
+class ExpiryQueue:
+    """Min-heap of (expiry_time, team, hazard type) across all tracked teams."""
+
+    def __init__(self):
+        self._heap = []
+        self._order = itertools.count()  # tie-breaker, so teams are never compared
+        self._teams = {}  # team path -> Team
+        self._queued = set()  # (team path, hazard type, expiry_time) in the heap
+
+    def __len__(self):
+        return len(self._queued)
+
+    def push(self, team, hazard):
+        """Queue one active hazard of a team."""
+        self._teams[team.path] = team
+        entry = (team.path, hazard.type, hazard.expiry_time)
+        if entry not in self._queued:
+            self._queued.add(entry)
+            heapq.heappush(self._heap, (hazard.expiry_time, next(self._order), entry))
+
+    def track(self, team):
+        """Register a team (or refresh it after it changed) and queue its active hazards."""
+        self._teams[team.path] = team
+        for hazard in team.active_hazards:
+            self.push(team, hazard)
+
+    def untrack(self, team):
+        """Stop expiring hazards for a team (its heap entries are dropped lazily)."""
+        self._teams.pop(team.path, None)
+
+    def next_expiry(self):
+        """Earliest queued expiry time, or None when nothing is queued."""
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Remove due entries; returns {team path: [ActiveHazard, ...]} still on their team."""
+        if now is None:
+            now = datetime.now(tz=timezone.utc)
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, _, entry = heapq.heappop(self._heap)
+            self._queued.discard(entry)
+            path, hazard_type, expiry_time = entry
+            team = self._teams.get(path)
+            if team is None:
+                continue
+            for hazard in team.active_hazards:
+                if hazard.type == hazard_type and hazard.expiry_time == expiry_time:
+                    due.setdefault(path, []).append(hazard)
+                    break
+        return due
+
+    def expire(self, now=None, callback=None):
+        """Expire due hazards in one batch per team; returns {team path: [messages]}.
+
+        Uses ``Team.expire_hazards``, so status and speed cap follow the hazards that
+        remain. ``callback(team, hazards, messages)`` is called once per affected team.
+        """
+        messages = {}
+        for path, expired in self.pop_due(now).items():
+            team = self._teams[path]
+            messages[path] = team.expire_hazards(expired=expired)
+            if callback is not None:
+                callback(team, expired, messages[path])
+        return messages
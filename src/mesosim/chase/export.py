@@ -0,0 +1,255 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Columnar export of team_history for post-session analysis.
+
+``export_team_history`` streams ``team_history`` out of one or many team databases in
+chunks. It writes one typed table, with timestamps as ``datetime64[s]`` and team,
+status color and status text as category codes. The output is Parquet when pyarrow is
+installed, otherwise a compressed ``.npz``::
+
+    python -m mesosim.chase.export debrief.parquet teams/*.db
+
+``load_team_history`` reads either format back into a pandas DataFrame with categoricals.
+"""
+
+import argparse
+from pathlib import Path
+from sqlite3 import dbapi2 as sql
+
+history_columns = (
+    "cur_timestamp",
+    "arc_timestamp",
+    "latitude",
+    "longitude",
+    "speed",
+    "direction",
+    "status_color",
+    "status_text",
+    "balance",
+    "points",
+    "fuel_level",
+)
+time_columns = ("cur_timestamp", "arc_timestamp")
+float_columns = ("latitude", "longitude", "speed", "direction", "balance", "fuel_level")
+category_columns = ("team", "status_color", "status_text")
+
+
+def _have_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _Categories:
+    """Growing value -> code map; codes stay stable across chunks."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, values):
+        import numpy as np
+
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = -1
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+
+def _team_label(con, path):
+    try:
+        row = con.execute(
+            "SELECT team_value FROM team_info WHERE team_setting = 'id'"
+        ).fetchone()
+    except sql.OperationalError:
+        row = None
+    return row[0] if row and row[0] is not None else Path(path).stem
+
+
+def _chunk_arrays(rows, team_code, categories):
+    """Typed column arrays for one chunk of team_history rows."""
+    import numpy as np
+
+    columns = list(zip(*rows))
+    arrays = {"team": np.full(len(rows), team_code, dtype=np.int32)}
+    for name, values in zip(history_columns, columns):
+        if name in time_columns:
+            # db_time_fmt; numpy parses the ISO part directly
+            arrays[name] = np.array(
+                [value[:19] if value else "NaT" for value in values], dtype="datetime64[s]"
+            )
+        elif name in float_columns:
+            arrays[name] = np.array(
+                [np.nan if value is None else value for value in values], dtype=np.float64
+            )
+        elif name == "points":
+            # Same cast as Team.points (missing counts as zero)
+            arrays[name] = np.array(
+                [0 if value is None else int(float(value)) for value in values], dtype=np.int64
+            )
+        else:
+            arrays[name] = categories[name].encode(values)
+    return arrays
+
+
+def _new_categories():
+    return {name: _Categories() for name in category_columns}
+
+
+def iter_history_chunks(team_paths, chunk_rows=50000, categories=None):
+    """Yield (arrays, categories) per chunk of team_history across the team DBs."""
+    if categories is None:
+        categories = _new_categories()
+    for path in team_paths:
+        con = sql.connect("file:{}?mode=ro".format(Path(path).as_posix()), uri=True)
+        try:
+            team_code = int(categories["team"].encode([_team_label(con, path)])[0])
+            cursor = con.execute(
+                "SELECT {} FROM team_history ORDER BY cur_timestamp, rowid".format(
+                    ", ".join(history_columns)
+                )
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield _chunk_arrays(rows, team_code, categories), categories
+        finally:
+            con.close()
+
+
+def _arrow_table(arrays, categories):
+    import pyarrow as pa
+
+    fields = {}
+    for name in ("team",) + history_columns:
+        if name in category_columns:
+            codes = pa.array(arrays[name], mask=arrays[name] < 0)
+            fields[name] = pa.DictionaryArray.from_arrays(
+                codes, pa.array(categories[name].values, type=pa.string())
+            )
+        else:
+            fields[name] = pa.array(arrays[name])
+    return pa.table(fields)
+
+
+def _empty_arrays():
+    import numpy as np
+
+    return {
+        name: np.array([], dtype=_empty_dtype(name)) for name in ("team",) + history_columns
+    }
+
+
+def export_team_history(team_paths, out_path, chunk_rows=50000, file_format=None):
+    """Export team_history of the given team DBs; returns (path written, rows).
+
+    ``file_format`` is "parquet" or "npz" (default: parquet if pyarrow is available). The
+    .npz holds one array per column, with ``<name>`` codes and ``<name>_categories``
+    for category columns.
+    """
+    import numpy as np
+
+    if file_format is None:
+        file_format = "parquet" if _have_pyarrow() else "npz"
+    out_path = Path(out_path)
+    if file_format == "npz" and out_path.suffix != ".npz":
+        out_path = out_path.with_suffix(".npz")
+
+    n_rows = 0
+    categories = _new_categories()
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for arrays, _ in iter_history_chunks(team_paths, chunk_rows, categories):
+                table = _arrow_table(arrays, categories)
+                if writer is None:
+                    writer = pq.ParquetWriter(str(out_path), table.schema)
+                writer.write_table(table)
+                n_rows += table.num_rows
+            if writer is None:
+                # No rows at all: still write a file with the schema
+                table = _arrow_table(_empty_arrays(), categories)
+                writer = pq.ParquetWriter(str(out_path), table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return out_path, n_rows
+    elif file_format != "npz":
+        raise ValueError("Unknown export format {!r}".format(file_format))
+
+    # npz cannot be appended to, so keep the (already typed) chunks until the end
+    chunks = {name: [] for name in ("team",) + history_columns}
+    for arrays, _ in iter_history_chunks(team_paths, chunk_rows, categories):
+        for name, array in arrays.items():
+            chunks[name].append(array)
+        n_rows += len(arrays["team"])
+    output = _empty_arrays()
+    for name, parts in chunks.items():
+        if parts:
+            output[name] = np.concatenate(parts)
+    for name in category_columns:
+        output[name + "_categories"] = np.array(categories[name].values, dtype=str)
+    np.savez_compressed(out_path, **output)
+    return out_path, n_rows
+
+
+def _empty_dtype(name):
+    if name in time_columns:
+        return "datetime64[s]"
+    if name in float_columns:
+        return "float64"
+    if name == "points":
+        return "int64"
+    return "int32"
+
+
+def load_team_history(path):
+    """Load an export (Parquet or .npz) as a pandas DataFrame with categorical columns."""
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix != ".npz":
+        return pd.read_parquet(path)
+
+    import numpy as np
+
+    with np.load(path) as data:
+        frame = {}
+        for name in ("team",) + history_columns:
+            if name in category_columns:
+                frame[name] = pd.Categorical.from_codes(
+                    data[name], categories=data[name + "_categories"]
+                )
+            else:
+                frame[name] = data[name]
+    return pd.DataFrame(frame)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Export team_history for analysis.")
+    arg_parser.add_argument("output", help="output file (.parquet or .npz)")
+    arg_parser.add_argument("teams", nargs="+", help="team databases")
+    arg_parser.add_argument("--chunk-rows", type=int, default=50000)
+    arg_parser.add_argument("--format", choices=("parquet", "npz"), default=None)
+    args = arg_parser.parse_args(argv)
+
+    path, n_rows = export_team_history(args.teams, args.output, args.chunk_rows, args.format)
+    print("{}: {} rows".format(path, n_rows))
+
+
+if __name__ == "__main__":
+    main()
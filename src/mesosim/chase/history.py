@@ -0,0 +1,338 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""team_history retention and track compaction.
+
+``team_history`` grows by one row per tick. ``compact_team_history`` keeps every row of
+a recent window, simplifies older tracks with Douglas-Peucker on lat/lon, always keeps
+rows where the status, balance or points changed, and then frees pages with an
+incremental VACUUM. A watermark remembers how far a DB has been compacted, so each run
+only looks at rows that aged out of the window since the previous one.
+
+``HistoryIndex`` keeps team_history in memory for time queries ("where was every team at
+23:40Z arc time") with linear or great circle interpolation.
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from sqlite3 import dbapi2 as sql
+
+from ..core.schema import connect
+from ..core.timing import db_time_fmt, epoch_seconds
+from ..core.utils import miles_per_degree_lat
+
+
+def douglas_peucker(lats, lons, tolerance_miles):
+    """Return a boolean keep-mask simplifying the track to within tolerance_miles."""
+    import numpy as np
+
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    n = len(lats)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3:
+        return keep
+
+    # Local equirectangular projection is plenty for a chase-sized track
+    y = lats * miles_per_degree_lat
+    x = lons * miles_per_degree_lat * np.cos(np.radians(np.nanmean(lats)))
+
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1 : last] - x[first], y[first + 1 : last] - y[first]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(dx * py - dy * px) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance_miles:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def _watermark(con):
+    row = con.execute("SELECT compacted_until FROM history_compaction WHERE id = 1").fetchone()
+    return row[0] if row else ""
+
+
+def compact_team_history(path, keep_minutes=30, tolerance_miles=0.05, vacuum_pages=512,
+                         now=None):
+    """Compact team_history of one team DB; returns counts of examined and deleted rows.
+
+    Parameters
+    ----------
+    path : str
+        Team database.
+    keep_minutes : float
+        Rows newer than this (cur time) are kept at full resolution.
+    tolerance_miles : float
+        Douglas-Peucker tolerance for older track points.
+    vacuum_pages : int
+        Pages to release per run with ``PRAGMA incremental_vacuum``. ``migrate`` switches
+        team DBs to ``auto_vacuum = INCREMENTAL``; on any other DB freed pages are only
+        reused, never released.
+    """
+    import numpy as np
+
+    if now is None:
+        now = datetime.now(tz=timezone.utc)
+    cutoff = (now - timedelta(minutes=keep_minutes)).strftime(db_time_fmt)
+
+    con = connect(path, "team")
+    try:
+        watermark = _watermark(con)
+        # Start from the last row already compacted (kept as an anchor) so segments join
+        rows = con.execute(
+            "SELECT rowid, cur_timestamp, latitude, longitude, status_color, status_text, "
+            "balance, points FROM team_history WHERE cur_timestamp >= ? "
+            "AND cur_timestamp < ? ORDER BY cur_timestamp, rowid",
+            [
+                con.execute(
+                    "SELECT COALESCE(MAX(cur_timestamp), '') FROM team_history "
+                    "WHERE cur_timestamp <= ?",
+                    [watermark],
+                ).fetchone()[0],
+                cutoff,
+            ],
+        ).fetchall()
+
+        deleted = 0
+        if len(rows) > 2:
+            lats = np.array(
+                [np.nan if row[2] is None else row[2] for row in rows], dtype=float
+            )
+            lons = np.array(
+                [np.nan if row[3] is None else row[3] for row in rows], dtype=float
+            )
+            located = ~(np.isnan(lats) | np.isnan(lons))
+
+            keep = ~located  # never drop rows we cannot place
+            keep[[0, -1]] = True
+            simplified = douglas_peucker(lats[located], lons[located], tolerance_miles)
+            keep[np.nonzero(located)[0][simplified]] = True
+
+            # Keep every row where the status, balance or points changed
+            for i in range(1, len(rows)):
+                if rows[i][4:8] != rows[i - 1][4:8]:
+                    keep[i] = True
+
+            doomed = [(rows[i][0],) for i in np.nonzero(~keep)[0]]
+            con.executemany("DELETE FROM team_history WHERE rowid = ?", doomed)
+            deleted = len(doomed)
+
+        if rows:
+            con.execute(
+                "INSERT OR REPLACE INTO history_compaction (id, compacted_until) "
+                "VALUES (1, ?)",
+                [rows[-1][1]],
+            )
+        con.commit()
+
+        auto_vacuum = con.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if auto_vacuum == 2 and deleted:
+            con.execute("PRAGMA incremental_vacuum({:d})".format(vacuum_pages)).fetchall()
+        return {"examined": len(rows), "deleted": deleted}
+    finally:
+        con.close()
+
+
+class _TeamTrack:
+    """Growing per-team arrays of team_history, in rowid (append) order."""
+
+    def __init__(self, path):
+        import numpy as np
+
+        self.path = path
+        self.last_rowid = 0
+        self.cur = np.empty(0, dtype=np.int64)
+        self.arc = np.empty(0, dtype=np.int64)
+        self.lat = np.empty(0, dtype=float)
+        self.lon = np.empty(0, dtype=float)
+
+    def refresh(self):
+        import numpy as np
+
+        con = sql.connect("file:{}?mode=ro".format(Path(self.path).as_posix()), uri=True)
+        try:
+            rows = con.execute(
+                "SELECT rowid, cur_timestamp, arc_timestamp, latitude, longitude "
+                "FROM team_history WHERE rowid > ? AND cur_timestamp IS NOT NULL "
+                "AND arc_timestamp IS NOT NULL ORDER BY rowid",
+                [self.last_rowid],
+            ).fetchall()
+        finally:
+            con.close()
+        if not rows:
+            return 0
+        rowids, cur, arc, lat, lon = zip(*rows)
+
+        def seconds(values):
+            # db_time_fmt; numpy parses the ISO part directly
+            return np.array([value[:19] for value in values], dtype="datetime64[s]").astype(
+                np.int64
+            )
+
+        self.last_rowid = rowids[-1]
+        self.cur = np.concatenate([self.cur, seconds(cur)])
+        self.arc = np.concatenate([self.arc, seconds(arc)])
+        self.lat = np.concatenate([self.lat, np.array(lat, dtype=float)])
+        self.lon = np.concatenate([self.lon, np.array(lon, dtype=float)])
+        return len(rows)
+
+
+def _slerp(lat0, lon0, lat1, lon1, fraction):
+    """Great circle interpolation between two sets of points (degrees)."""
+    import numpy as np
+
+    def unit(lat, lon):
+        lat, lon = np.radians(lat), np.radians(lon)
+        return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+    a, b = unit(lat0, lon0), unit(lat1, lon1)
+    omega = np.arccos(np.clip((a * b).sum(axis=0), -1.0, 1.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sin_omega = np.sin(omega)
+        wa = np.where(omega > 1e-12, np.sin((1 - fraction) * omega) / sin_omega, 1 - fraction)
+        wb = np.where(omega > 1e-12, np.sin(fraction * omega) / sin_omega, fraction)
+    point = wa * a + wb * b
+    return (
+        np.degrees(np.arctan2(point[2], np.hypot(point[0], point[1]))),
+        np.degrees(np.arctan2(point[1], point[0])),
+    )
+
+
+class HistoryIndex:
+    """Positions of many teams at arbitrary cur or arc times.
+
+    Each team's ``team_history`` is held as sorted epoch-second arrays. All teams are
+    laid end to end in one array, with each team's times offset into its own range, so
+    one ``searchsorted`` call finds every team's bracketing rows::
+
+        index = HistoryIndex(team_paths)
+        lats, lons = index.positions_at("2021-07-10T23:40:00Z", clock="arc")
+        ...
+        index.refresh()  # pick up rows appended since
+
+    Times outside a team's history give NaN. ``refresh`` only reads rows past the last
+    seen rowid. Rows deleted by ``compact_team_history`` stay in the index until
+    ``rebuild`` is called.
+
+    Parameters
+    ----------
+    team_paths : iterable of str
+        Team databases to index.
+    """
+
+    def __init__(self, team_paths):
+        self.team_paths = [str(path) for path in team_paths]
+        self.rebuild()
+
+    def rebuild(self):
+        """Drop everything and re-read all history."""
+        self._tracks = [_TeamTrack(path) for path in self.team_paths]
+        self._combined = {}
+        self.refresh()
+
+    def refresh(self):
+        """Append rows written since the last refresh; returns the number of new rows."""
+        added = sum(track.refresh() for track in self._tracks)
+        if added:
+            self._combined.clear()
+        return added
+
+    def _layout(self, clock):
+        """Concatenated (keys, times, lats, lons, starts, ends, origin, stride) for a clock."""
+        import numpy as np
+
+        if clock not in ("cur", "arc"):
+            raise ValueError("clock must be 'cur' or 'arc'")
+        if clock in self._combined:
+            return self._combined[clock]
+
+        times, lats, lons, lengths = [], [], [], []
+        for track in self._tracks:
+            track_times = getattr(track, clock)
+            order = np.argsort(track_times, kind="stable")  # already sorted when appended
+            times.append(track_times[order])
+            lats.append(track.lat[order])
+            lons.append(track.lon[order])
+            lengths.append(len(order))
+        times = np.concatenate(times) if times else np.empty(0, dtype=np.int64)
+        origin = int(times.min()) if len(times) else 0
+        stride = (int(times.max()) - origin + 1) if len(times) else 1
+        ends = np.cumsum(lengths, dtype=np.int64)
+        starts = ends - np.array(lengths, dtype=np.int64)
+        team_of_row = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+        layout = (
+            team_of_row * stride + (times - origin),
+            times,
+            np.concatenate(lats) if lats else np.empty(0),
+            np.concatenate(lons) if lons else np.empty(0),
+            starts,
+            ends,
+            origin,
+            stride,
+        )
+        self._combined[clock] = layout
+        return layout
+
+    def _interpolate(self, layout, teams, seconds, method):
+        import numpy as np
+
+        keys, times, lats, lons, starts, ends, origin, stride = layout
+        lat, lon = np.full(len(teams), np.nan), np.full(len(teams), np.nan)
+        if not len(times):
+            return lat, lon
+        starts, ends = starts[teams], ends[teams]
+        # Seconds may be fractional; clamp into the team's key range, validate below
+        offsets = np.clip(seconds - origin, -1, stride)
+        hi = np.searchsorted(keys, teams * stride + offsets, side="right")
+        lo = hi - 1
+        inside = (lo >= starts) & (lo < ends)
+        lo_safe = np.where(inside, lo, 0)
+        at_end = hi >= ends
+        hi_safe = np.where(inside & ~at_end, hi, lo_safe)
+        inside &= ~at_end | (times[lo_safe] == seconds)  # the last row itself is fine
+        if not inside.any():
+            return lat, lon
+        lo_i, hi_i = lo_safe[inside], hi_safe[inside]
+        span = (times[hi_i] - times[lo_i]).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = np.where(span > 0, (seconds[inside] - times[lo_i]) / span, 0.0)
+        if method == "linear":
+            lat[inside] = lats[lo_i] + fraction * (lats[hi_i] - lats[lo_i])
+            lon[inside] = lons[lo_i] + fraction * (lons[hi_i] - lons[lo_i])
+        elif method == "geodesic":
+            lat[inside], lon[inside] = _slerp(
+                lats[lo_i], lons[lo_i], lats[hi_i], lons[hi_i], fraction
+            )
+        else:
+            raise ValueError("method must be 'linear' or 'geodesic'")
+        return lat, lon
+
+    def positions_at(self, time, clock="arc", method="linear"):
+        """(latitudes, longitudes) of every team (in ``team_paths`` order) at one time."""
+        import numpy as np
+
+        teams = np.arange(len(self.team_paths), dtype=np.int64)
+        seconds = np.full(len(teams), epoch_seconds(time))
+        return self._interpolate(self._layout(clock), teams, seconds, method)
+
+    def track(self, path, times, clock="arc", method="linear"):
+        """(latitudes, longitudes) of one team at many times (e.g. a replay scrubber)."""
+        import numpy as np
+
+        seconds = np.array([epoch_seconds(time) for time in times], dtype=float)
+        teams = np.full(len(seconds), self.team_paths.index(str(path)), dtype=np.int64)
+        return self._interpolate(self._layout(clock), teams, seconds, method)
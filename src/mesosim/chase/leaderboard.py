@@ -0,0 +1,140 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Leaderboard aggregation across many team databases.
+
+Standings only need a few ``team_info`` keys, so instead of constructing a full ``Team``
+(vehicle, hazards, ``nearest_city``) per database, ``Leaderboard`` reads just those keys
+through read-only connections on a small thread pool. Connections stay open between
+refreshes, and a team is only re-read when ``PRAGMA data_version`` shows another
+connection has committed to it since (WAL commits included). A team that cannot be read
+is reported with an ``error`` and left out of the standings.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from sqlite3 import dbapi2 as sql
+
+from ..core.utils import maybe_cast_float
+
+leaderboard_keys = ("id", "name", "points", "balance")
+
+
+def _open(path):
+    # Pool threads take turns on the connection, never using it at the same time
+    return sql.connect(
+        "file:{}?mode=ro".format(Path(path).as_posix()), uri=True, check_same_thread=False
+    )
+
+
+def _query_scores(con, path, keys):
+    rows = con.execute(
+        "SELECT team_setting, team_value FROM team_info WHERE team_setting IN ({})".format(
+            ",".join("?" * len(keys))
+        ),
+        list(keys),
+    ).fetchall()
+    scores = dict(rows)
+    # Same casts as Team.points / Team.balance
+    if "points" in scores:
+        points = maybe_cast_float(scores["points"]) if scores["points"] is not None else None
+        scores["points"] = int(points) if points is not None else 0
+    if "balance" in scores and scores["balance"] is not None:
+        scores["balance"] = maybe_cast_float(scores["balance"])
+    scores["path"] = str(path)
+    return scores
+
+
+def read_team_scores(path, keys=leaderboard_keys):
+    """Read only the given team_info keys from one team DB (read-only)."""
+    con = _open(path)
+    try:
+        return _query_scores(con, path, keys)
+    finally:
+        con.close()
+
+
+class Leaderboard:
+    """Cached standings across team databases.
+
+    Parameters
+    ----------
+    team_paths : iterable of str
+        Team databases to rank.
+    keys : tuple of str
+        ``team_info`` keys to read (must include ``points`` and ``balance`` for ranking).
+    max_workers : int
+        Threads used to read changed databases.
+    """
+
+    def __init__(self, team_paths, keys=leaderboard_keys, max_workers=8):
+        self.team_paths = [str(path) for path in team_paths]
+        self.keys = tuple(keys)
+        self.max_workers = max_workers
+        self._cache = {}  # path -> (data_version, scores)
+        self._connections = {}  # path -> read-only connection
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the thread pool and close all connections."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for path in list(self._connections):
+            self._forget(path)
+
+    def _forget(self, path):
+        con = self._connections.pop(path, None)
+        if con is not None:
+            con.close()
+        self._cache.pop(path, None)
+
+    def _read(self, path):
+        try:
+            con = self._connections.get(path)
+            if con is None:
+                con = self._connections[path] = _open(path)
+            # Read the version first: a commit racing the query only causes a re-read
+            version = con.execute("PRAGMA data_version").fetchone()[0]
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            scores = _query_scores(con, path, self.keys)
+        except (sql.Error, ValueError) as exc:
+            # Reopen on the next refresh (the file may be mid-creation or replaced)
+            self._forget(path)
+            return {"path": path, "error": "{}: {}".format(type(exc).__name__, exc)}
+        self._cache[path] = (version, scores)
+        return scores
+
+    def refresh(self):
+        """Re-read changed databases; returns {path: scores} (or {"error": ...})."""
+        if len(self.team_paths) <= 1 or self.max_workers <= 1:
+            results = [self._read(path) for path in self.team_paths]
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            results = list(self._pool.map(self._read, self.team_paths))
+        # Forget databases that are no longer ranked
+        for path in set(self._connections) - set(self.team_paths):
+            self._forget(path)
+        return dict(zip(self.team_paths, results))
+
+    def standings(self):
+        """Teams ranked by points, then balance (both descending), with their rank.
+
+        Teams whose database could not be read are skipped.
+        """
+        ranked = sorted(
+            (dict(scores) for scores in self.refresh().values() if "error" not in scores),
+            key=lambda scores: (-(scores.get("points") or 0), -(scores.get("balance") or 0)),
+        )
+        for rank, scores in enumerate(ranked, start=1):
+            scores["rank"] = rank
+        return ranked
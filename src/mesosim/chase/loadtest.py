@@ -0,0 +1,354 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Offline load-testing harness simulating classroom-scale polling.
+
+Provisions N synthetic team databases, a config database (config, hazard_config and
+vehicles tables) and a synthetic city table in a temporary directory, then drives
+``output_status_dict`` polls, action enqueues and chase ticks at configurable rates from
+threads or processes, and reports latency percentiles, throughput and SQLite busy errors::
+
+    python -m mesosim.chase.loadtest --teams 40 --duration 30 --poll-rate 40 \
+        --action-rate 5 --tick-rate 4 --workers 8 --mode process
+"""
+
+import argparse
+import json
+import multiprocessing
+import queue
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from sqlite3 import dbapi2 as sql
+
+from ..core.config import Config
+from ..core.schema import connect, migrate
+from ..core.utils import set_city_csv
+from .actions import create_hazard_registry
+from .scheduler import run_tick
+from .team import Team
+
+synthetic_config = {
+    "speed_factor": "4",
+    "cur_start_time": "2022-03-30T17:00:00Z",
+    "arc_start_time": "2021-07-10T03:00:00Z",
+    "speed_limit": "65",
+    "gas_price": "3.50",
+    "fill_rate": "0.5",
+    "min_town_distance_search": "30",
+    "min_town_distance_refuel": "5",
+    "min_town_population": "1000",
+}
+
+synthetic_hazard_config = {
+    "active_hazards": json.dumps(
+        [
+            "speeding", "dirt_road", "stuck_in_mud", "cc", "flat_tire", "dead_end",
+            "flooded_road",
+        ]
+    ),
+    "speeding_max_chance": "0.05",
+    "speeding_ticket_amt": "150",
+    "dirt_road_prob": "0.02",
+    "cc_prob": "0.02",
+    "pay_for_flat_prob": "0.5",
+    "pay_for_flat_amt": "100",
+    "flat_tire_prob": "0.005",
+    "dead_end_prob": "0.01",
+    "flooded_road_prob": "0.005",
+}
+
+synthetic_vehicles = [
+    ("sedan", "Sedan", 120, 40, 60, 35, 14, 0.01, "low"),
+    ("suv", "SUV", 110, 55, 55, 24, 20, 0.004, "high"),
+]
+
+operations = ("poll", "action", "tick")
+
+
+def provision(directory, n_teams, seed=0, center=(41.5, -97.5)):
+    """Create config.db, team_NNN.db files and cities.csv in directory.
+
+    Returns (config_path, team_paths, city_csv_path).
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    config_path = directory / "config.db"
+    migrate(config_path, components=("config",))
+    con = connect(config_path, "config")
+    con.executemany("INSERT OR REPLACE INTO config VALUES (?,?)", synthetic_config.items())
+    con.executemany(
+        "INSERT OR REPLACE INTO hazard_config VALUES (?,?)", synthetic_hazard_config.items()
+    )
+    con.executemany(
+        "INSERT OR REPLACE INTO vehicles VALUES (?,?,?,?,?,?,?,?,?)", synthetic_vehicles
+    )
+    con.commit()
+    con.close()
+
+    # A grid of towns around the teams, so nearest_city has real work without the
+    # (not shipped) us_cities.csv
+    city_path = directory / "cities.csv"
+    with open(city_path, "w") as f:
+        f.write("city_ascii,state_id,lat,lng,population\n")
+        for i in range(-20, 21):
+            for j in range(-20, 21):
+                f.write(
+                    "Town {}_{},NE,{:.4f},{:.4f},{}\n".format(
+                        i, j, center[0] + i * 0.1, center[1] + j * 0.13,
+                        rng.randint(200, 50000),
+                    )
+                )
+
+    team_paths = []
+    for n in range(n_teams):
+        path = directory / "team_{:03d}.db".format(n)
+        migrate(path, components=("team",))
+        con = connect(path, "team")
+        status = {
+            "id": "team_{:03d}".format(n),
+            "name": "Team {}".format(n),
+            "vehicle": rng.choice(synthetic_vehicles)[0],
+            "latitude": "{:.4f}".format(center[0] + rng.uniform(-1.5, 1.5)),
+            "longitude": "{:.4f}".format(center[1] + rng.uniform(-2, 2)),
+            "speed": "{:.0f}".format(rng.choice([0, 35, 55, 65, 75])),
+            "direction": "{:.0f}".format(rng.uniform(0, 360)),
+            "fuel_level": "{:.1f}".format(rng.uniform(2, 14)),
+            "balance": "500",
+            "points": "0",
+            "status_color": "green",
+            "status_text": "Chase On",
+        }
+        con.executemany("INSERT OR REPLACE INTO team_info VALUES (?,?)", status.items())
+        con.commit()
+        con.close()
+        team_paths.append(str(path))
+
+    return str(config_path), team_paths, str(city_path)
+
+
+class _Runner:
+    """Per-thread (or per-process) state: own Config, registry and connections.
+
+    With ``city_csv`` (process mode) the runner points its process at that city table
+    until ``close``; thread mode passes None and ``run_load`` switches it once for all.
+    """
+
+    def __init__(self, config_path, city_csv, busy_timeout):
+        self.previous_city_csv = None if city_csv is None else set_city_csv(city_csv)
+        self.config = Config(config_path)
+        self.hazards = create_hazard_registry(self.config)
+        self.busy_timeout = busy_timeout
+
+    def run(self, operation, path):
+        if operation == "poll":
+            team = Team(path, self.hazards, self.config)
+            try:
+                team.output_status_dict()
+            finally:
+                team.con.close()
+        elif operation == "action":
+            con = sql.connect(path, timeout=self.busy_timeout)
+            try:
+                con.execute(
+                    "INSERT INTO action_queue (message, action_type, action_amount) "
+                    "VALUES (?,?,?)",
+                    ["Load test bonus", "change_points", "1"],
+                )
+                con.commit()
+            finally:
+                con.close()
+        elif operation == "tick":
+            team = Team(path, self.hazards, self.config)
+            try:
+                run_tick(team, self.hazards, self.config, 10.0)
+            finally:
+                team.con.close()
+        else:
+            raise ValueError("Unknown operation " + str(operation))
+
+    def close(self):
+        self.config.con.close()
+        if self.previous_city_csv is not None:
+            set_city_csv(self.previous_city_csv)
+
+
+def _consume(config_path, city_csv, busy_timeout, jobs, results):
+    runner = _Runner(config_path, city_csv, busy_timeout)
+    while True:
+        job = jobs.get()
+        if job is None:
+            runner.close()
+            break
+        operation, path, planned = job
+        start = time.time()
+        outcome = "ok"
+        try:
+            runner.run(operation, path)
+        except sql.OperationalError as e:
+            outcome = "busy" if "locked" in str(e) or "busy" in str(e) else "error"
+        except Exception:
+            outcome = "error"
+        end = time.time()
+        results.put((operation, outcome, end - start, start - planned))
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(records, duration):
+    """Aggregate (operation, outcome, latency, lag) records into a report dict.
+
+    ``lost`` counts operations whose result never arrived (e.g. a worker died or hung).
+    """
+    report = {}
+    for operation in operations:
+        mine = [record for record in records if record[0] == operation]
+        latencies = sorted(record[2] for record in mine if record[1] == "ok")
+        report[operation] = {
+            "count": len(mine),
+            "ok": len(latencies),
+            "busy_errors": sum(record[1] == "busy" for record in mine),
+            "other_errors": sum(record[1] == "error" for record in mine),
+            "lost": sum(record[1] == "lost" for record in mine),
+            "throughput_per_s": len(latencies) / duration if duration else None,
+            "p50_ms": None if not latencies else _percentile(latencies, 50) * 1000,
+            "p95_ms": None if not latencies else _percentile(latencies, 95) * 1000,
+            "p99_ms": None if not latencies else _percentile(latencies, 99) * 1000,
+            "max_queue_lag_ms": max((record[3] for record in mine), default=0) * 1000,
+        }
+    return report
+
+
+def run_load(config_path, team_paths, city_csv, duration=10.0, poll_rate=20.0,
+             action_rate=2.0, tick_rate=2.0, workers=4, mode="thread", busy_timeout=5.0,
+             seed=0, result_timeout=60.0):
+    """Drive the given rates (operations per second, across all teams) for duration.
+
+    Arrivals are open-loop (Poisson at each rate) so a slow server shows up as queueing
+    lag and latency rather than as silently reduced load. Once submission ends, results
+    are awaited for at most ``result_timeout`` seconds without one arriving; the rest are
+    reported as ``lost``.
+    """
+    rng = random.Random(seed)
+    if mode == "process":
+        context = multiprocessing.get_context()
+        jobs, results = context.Queue(), context.Queue()
+        spawn = lambda: context.Process(  # noqa: E731
+            target=_consume,
+            args=(config_path, city_csv, busy_timeout, jobs, results),
+            daemon=True,
+        )
+    elif mode == "thread":
+        jobs, results = queue.Queue(), queue.Queue()
+        spawn = lambda: threading.Thread(  # noqa: E731
+            target=_consume,
+            args=(config_path, None, busy_timeout, jobs, results),
+            daemon=True,
+        )
+    else:
+        raise ValueError("mode must be 'thread' or 'process'")
+
+    # Threads share this process's city table: switch it for the run and put it back after
+    previous_city_csv = set_city_csv(city_csv) if mode == "thread" else None
+    try:
+        consumers = [spawn() for _ in range(workers)]
+        for consumer in consumers:
+            consumer.start()
+
+        # Merge the three Poisson arrival streams in time order
+        rates = dict(zip(operations, (poll_rate, action_rate, tick_rate)))
+        start = time.time()
+        next_time = {
+            op: start + rng.expovariate(rate) for op, rate in rates.items() if rate > 0
+        }
+        submitted = []  # (operation, planned)
+        while next_time:
+            operation, planned = min(next_time.items(), key=lambda item: item[1])
+            if planned - start >= duration:
+                break
+            delay = planned - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            jobs.put((operation, rng.choice(team_paths), planned))
+            submitted.append((operation, planned))
+            next_time[operation] = planned + rng.expovariate(rates[operation])
+
+        for _ in consumers:
+            jobs.put(None)
+        records = []
+        while len(records) < len(submitted):
+            try:
+                records.append(results.get(timeout=result_timeout))
+            except queue.Empty:
+                break
+        elapsed = time.time() - start
+        # Results arrive out of order, so attribute the missing ones by operation counts
+        missing = {operation: 0 for operation in operations}
+        for operation, _ in submitted:
+            missing[operation] += 1
+        for record in records:
+            missing[record[0]] -= 1
+        for operation, count in missing.items():
+            records.extend([(operation, "lost", None, 0.0)] * count)
+        lost = sum(missing.values())
+        for consumer in consumers:
+            # A consumer that lost a result may be stuck; the daemon flag lets us leave it
+            consumer.join(timeout=1.0 if lost else None)
+    finally:
+        if previous_city_csv is not None:
+            set_city_csv(previous_city_csv)
+    report = summarize(records, elapsed)
+    report["settings"] = {
+        "teams": len(team_paths),
+        "duration_s": elapsed,
+        "workers": workers,
+        "mode": mode,
+        "rates_per_s": rates,
+    }
+    return report
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Offline MesoSim chase load test.")
+    arg_parser.add_argument("--teams", type=int, default=30)
+    arg_parser.add_argument("--duration", type=float, default=10.0)
+    arg_parser.add_argument("--poll-rate", type=float, default=30.0)
+    arg_parser.add_argument("--action-rate", type=float, default=3.0)
+    arg_parser.add_argument("--tick-rate", type=float, default=3.0)
+    arg_parser.add_argument("--workers", type=int, default=4)
+    arg_parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    arg_parser.add_argument("--busy-timeout", type=float, default=5.0)
+    arg_parser.add_argument("--directory", help="keep the synthetic DBs here")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="mesosim-load-") as tmp:
+        config_path, team_paths, city_csv = provision(
+            args.directory or tmp, args.teams, seed=args.seed
+        )
+        report = run_load(
+            config_path,
+            team_paths,
+            city_csv,
+            duration=args.duration,
+            poll_rate=args.poll_rate,
+            action_rate=args.action_rate,
+            tick_rate=args.tick_rate,
+            workers=args.workers,
+            mode=args.mode,
+            busy_timeout=args.busy_timeout,
+            seed=args.seed,
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
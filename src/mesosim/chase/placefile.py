@@ -0,0 +1,196 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Team track placefiles for GR.
+
+Counterpart to the LSR placefile helpers in ``mesosim.lsr``: renders each team's track
+(coloured by ``status_color``) and current position. Each team keeps a cursor on
+``team_history.cur_timestamp``, so a refresh only reads rows appended since the previous
+one, and the placefile is swapped into place atomically.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from sqlite3 import dbapi2 as sql
+
+status_rgb = {"green": (0, 200, 0), "yellow": (255, 200, 0), "red": (255, 0, 0)}
+
+
+class _TrackState:
+    """Per-team cursor and accumulated track.
+
+    The track is kept as closed colour runs, each rendered once when it closes, and the
+    open run at its end; a refresh only formats the open run and the position.
+    """
+
+    __slots__ = ("con", "name", "cursor", "runs", "closed_text", "tail", "count", "rendered")
+
+    def __init__(self, con):
+        self.con = con
+        self.name = None
+        self.cursor = ("", 0)  # (cur_timestamp, rowid) of last row read
+        self.runs = []  # [(points, rendered entry)] of closed runs, oldest first
+        self.closed_text = ""  # rendered entries of runs, joined
+        self.tail = []  # (lat, lon, status_color) of the open run
+        self.count = 0  # points kept (a closed run's last point is the next run's first)
+        self.rendered = ""
+
+
+class TeamTrackPlacefile:
+    """Incrementally maintained placefile of team tracks and positions.
+
+    Parameters
+    ----------
+    team_paths : iterable of str or Path
+        Team databases to follow.
+    title : str
+        Placefile title.
+    refresh_minutes : int
+        ``Refresh:`` interval written in the placefile header.
+    max_points : int, optional
+        Keep only the most recent points of each track. Unbounded tracks stay cheap to
+        refresh, since only the newest colour run is re-rendered.
+    """
+
+    def __init__(self, team_paths, title="MesoSim Team Tracks", refresh_minutes=1,
+                 max_points=None, line_width=2, threshold=999):
+        self.title = title
+        self.refresh_minutes = refresh_minutes
+        self.max_points = max_points
+        self.line_width = line_width
+        self.threshold = threshold
+        self._teams = {}
+        for path in team_paths:
+            self.add_team(path)
+
+    def add_team(self, path):
+        """Start following another team database."""
+        key = str(path)
+        if key not in self._teams:
+            con = sql.connect("file:{}?mode=ro".format(Path(path).as_posix()), uri=True)
+            self._teams[key] = _TrackState(con)
+
+    def _read_new_rows(self, state):
+        timestamp, rowid = state.cursor
+        rows = state.con.execute(
+            "SELECT cur_timestamp, rowid, latitude, longitude, status_color FROM team_history "
+            "WHERE cur_timestamp > ? OR (cur_timestamp = ? AND rowid > ?) "
+            "ORDER BY cur_timestamp, rowid",
+            [timestamp, timestamp, rowid],
+        ).fetchall()
+        if rows:
+            state.cursor = (rows[-1][0], rows[-1][1])
+        return [
+            (float(lat), float(lon), color or "green")
+            for _, _, lat, lon, color in rows
+            if lat is not None and lon is not None
+        ]
+
+    def refresh(self):
+        """Read new history rows for every team; return the number of teams that moved."""
+        changed = 0
+        for key, state in self._teams.items():
+            new_points = self._read_new_rows(state)
+            if not new_points and state.name is not None:
+                continue
+            row = state.con.execute(
+                "SELECT team_value FROM team_info WHERE team_setting = 'name'"
+            ).fetchone()
+            name = row[0] if row and row[0] else Path(key).stem
+            if name != state.name:
+                state.name = name
+                self._rerender_runs(state)
+            self._extend(state, new_points)
+            if self.max_points is not None and state.count > self.max_points:
+                self._trim(state, state.count - self.max_points)
+            state.rendered = self._render_team(state)
+            changed += 1
+        return changed
+
+    def _extend(self, state, points):
+        closed = []
+        for point in points:
+            if state.tail and point[2] != state.tail[-1][2]:
+                # Close the run, carrying it on to the joining vertex
+                run = state.tail + [point]
+                closed.append((run, self._line_entry(state.name, run, state.tail[-1][2])))
+                state.tail = [point]
+            else:
+                state.tail.append(point)
+        state.count += len(points)
+        if closed:
+            state.runs.extend(closed)
+            state.closed_text = "\n".join(
+                ([state.closed_text] if state.closed_text else []) + [e for _, e in closed]
+            )
+
+    def _trim(self, state, drop):
+        """Forget the oldest ``drop`` points, re-rendering only a partly dropped run."""
+        state.count -= drop
+        while drop and state.runs:
+            run, _ = state.runs[0]
+            if drop >= len(run) - 1:
+                drop -= len(run) - 1
+                del state.runs[0]
+            else:
+                run = run[drop:]
+                state.runs[0] = (run, self._line_entry(state.name, run, run[-2][2]))
+                drop = 0
+        del state.tail[:drop]
+        state.closed_text = "\n".join(entry for _, entry in state.runs)
+
+    def _rerender_runs(self, state):
+        state.runs = [
+            (run, self._line_entry(state.name, run, run[-2][2])) for run, _ in state.runs
+        ]
+        state.closed_text = "\n".join(entry for _, entry in state.runs)
+
+    def _render_team(self, state):
+        if not state.tail:
+            return ""
+        entries = [state.closed_text] if state.closed_text else []
+        if len(state.tail) > 1:
+            entries.append(self._line_entry(state.name, state.tail, state.tail[-1][2]))
+
+        lat, lon, color = state.tail[-1]
+        entries.append(
+            "Color: {} {} {}\nPlace: {:.4f}, {:.4f}, {}".format(
+                *status_rgb.get(color, status_rgb["green"]), lat, lon, state.name
+            )
+        )
+        return "\n".join(entries)
+
+    def _line_entry(self, name, points, color):
+        return "Color: {} {} {}\nLine: {}, 0, \"{}\"\n{}\nEnd:".format(
+            *status_rgb.get(color, status_rgb["green"]),
+            self.line_width,
+            name,
+            "\n".join("{:.4f}, {:.4f}".format(lat, lon) for lat, lon, _ in points),
+        )
+
+    def render(self):
+        """Render the full placefile text from the current tracks."""
+        header = "Refresh: {}\nThreshold: {}\nTitle: {}\n".format(
+            self.refresh_minutes, self.threshold, self.title
+        )
+        body = "\n\n".join(state.rendered for state in self._teams.values() if state.rendered)
+        return header + "\n" + body + "\n"
+
+    def write(self, path):
+        """Refresh and atomically replace the placefile at path."""
+        self.refresh()
+        path = Path(path)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.render())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def close(self):
+        for state in self._teams.values():
+            state.con.close()
@@ -0,0 +1,165 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""In-memory fast-forward projection of a team.
+
+Answers "if this team holds course and speed for 30 minutes, where does it end up, how
+much fuel is left and which hazards does it hit" without touching any database::
+
+    projection = project_team(team, hazards, minutes=30)
+    projection.final["latitude"], projection.final["fuel_level"], projection.hazards
+
+The team's state is cloned into a ``DetachedTeam``, which has no connection and refuses
+to write. The clone is stepped in large steps with ``move_lat_lon``,
+``Vehicle.calculate_mpg`` and ``shuffle_new_hazard`` (or a ``HazardArrivals``). As in
+play, movement happens in archive time: a step of ``s`` cur seconds covers
+``speed * speed_factor * s / 3600`` miles. Random draws come from a ``numpy.random.Generator``
+owned by the projection and passed down the hazard path, so the global numpy state is never
+read or reseeded and projections can run in any thread alongside the live simulation.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from ..core.utils import move_lat_lon
+from .actions import shuffle_new_hazard
+from .team import Team
+
+
+class DetachedTeam(Team):
+    """A Team clone that lives only in memory (no connection, no writes)."""
+
+    autocommit = False
+
+    def __init__(self, team):
+        self.path = team.path
+        self.con = None
+        self.cur = None
+        self.config = team.config
+        self.vehicle = team.vehicle
+        self.status = dict(team.status)
+        self.active_hazards = list(team.active_hazards)
+        self.previous_active_hazard_tuples = []
+
+    def _refuse(self, *args, **kwargs):
+        raise RuntimeError("A DetachedTeam never touches the team database")
+
+    reload = write_status = write_status_document = dismiss_action = _refuse
+    has_action_queue_item = get_action_queue = _refuse
+
+
+class Projection:
+    """Result of ``project_team``."""
+
+    def __init__(self, steps, hazards, distance_miles, fuel_used):
+        self.steps = steps  # [{"time", "latitude", "longitude", "speed", ...}, ...]
+        self.hazards = hazards  # [(cur time, hazard type), ...] started during projection
+        self.distance_miles = distance_miles
+        self.fuel_used = fuel_used
+
+    @property
+    def final(self):
+        return self.steps[-1]
+
+
+def _snapshot(team, time):
+    return {
+        "time": time,
+        "latitude": team.latitude,
+        "longitude": team.longitude,
+        "speed": team.speed,
+        "direction": team.direction,
+        "fuel_level": team.fuel_level,
+        "status_text": team.status_text,
+        "active_hazards": [hazard.type for hazard in team.active_hazards],
+    }
+
+
+def _held_speed(team):
+    """Speed the team would drive without its current hazards."""
+    if not team.active_hazards:
+        return team.speed or 0.0
+    # The status speed is the hazard-reduced one; assume the team resumes the posted limit
+    return min(float(team.config.speed_limit), team.vehicle.top_speed)
+
+
+def _run(team, hazards, minutes, step_seconds, now, arrivals, intended_speed, rng):
+    speed_factor = team.config.speed_factor
+    time = now
+    steps = [_snapshot(team, time)]
+    started = []
+    distance_total = fuel_used = 0.0
+    elapsed = 0.0
+    while elapsed < minutes * 60:
+        seconds = min(step_seconds, minutes * 60 - elapsed)
+        elapsed += seconds
+        time = time + timedelta(seconds=seconds)
+
+        # Expire hazards, then resume the held speed where no hazard prevents it
+        team.expire_hazards(time, rng=rng)
+        if not team.speed_locked:
+            team.speed = min(intended_speed, team.current_max_speed)
+
+        # Move, limited by the fuel left
+        speed = team.speed or 0.0
+        if speed > 0 and team.fuel_level > 0:
+            mpg = team.vehicle.calculate_mpg(speed)
+            distance = min(speed * speed_factor * seconds / 3600, team.fuel_level * mpg)
+            team.latitude, team.longitude = move_lat_lon(
+                team.latitude, team.longitude, distance, team.direction
+            )
+            team.fuel_level = team.fuel_level - distance / mpg
+            distance_total += distance
+            fuel_used += distance / mpg
+            if team.fuel_level <= 1e-9:
+                team.fuel_level = 0.0
+                team.speed = intended_speed = 0.0
+                team.status_color = "red"
+                team.status_text = "Out of Gas"
+
+        # New hazards for the step
+        if arrivals is None:
+            hazard = shuffle_new_hazard(team, seconds, hazards, team.config, rng)
+        else:
+            hazard = arrivals.advance(team, seconds, hazards, team.config)
+        if hazard is not None and not team.is_hazard_active(hazard.type):
+            team.apply_hazard(hazard.activate(now=time))
+            started.append((time, hazard.type))
+
+        steps.append(_snapshot(team, time))
+    return Projection(steps, started, distance_total, fuel_used)
+
+
+def project_team(team, hazards, minutes=30.0, step_seconds=60.0, now=None, arrivals=None,
+                 seed=None, speed=None):
+    """Project a team forward in memory; the team itself and its DB are left untouched.
+
+    Parameters
+    ----------
+    team : Team
+        Team to clone (only its in-memory state is read).
+    hazards : dict
+        Hazard registry.
+    minutes : float
+        Cur time to project.
+    step_seconds : float
+        Cur seconds per step.
+    now : datetime, optional
+        Starting cur time (default: now), used for hazard expiry.
+    arrivals : HazardArrivals, optional
+        Event-driven hazard clock to use instead of ``shuffle_new_hazard``. Give each
+        projection its own instance; a shared one would mix the projection into the live
+        team's arrival state.
+    seed : int, optional
+        Seed for the projection's random draws (fresh entropy by default).
+    speed : float, optional
+        Speed to hold (mph). Defaults to the team's speed, or, while a hazard is slowing
+        it, the configured speed limit (capped at the vehicle's top speed).
+    """
+    import numpy as np
+
+    if now is None:
+        now = datetime.now(tz=timezone.utc)
+    clone = DetachedTeam(team)
+    intended_speed = _held_speed(clone) if speed is None else float(speed)
+    rng = np.random.default_rng(seed)
+    return _run(clone, hazards, minutes, step_seconds, now, arrivals, intended_speed, rng)
@@ -0,0 +1,122 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Team proximity service on a spatial hash grid.
+
+``ProximityGrid`` buckets team positions into cells of about ``cell_miles`` on a side. A
+"teams within R miles" query only looks at the handful of cells that can hold such
+teams, so its cost depends on local density and not on the size of the class::
+
+    grid = ProximityGrid()
+    grid.update_teams(teams)  # once per tick
+    grid.within(team.latitude, team.longitude, 10.0, exclude=team.path)
+
+Passed to ``create_hazard_registry(config, proximity=grid)``, the grid also makes the
+chaser convergence probability scale with the number of nearby teams (see
+``density_factor``).
+"""
+
+from math import ceil, cos, floor, radians
+
+from ..core.utils import haversine_miles, miles_per_degree_lat
+
+
+class ProximityGrid:
+    """Spatial hash of team positions.
+
+    Parameters
+    ----------
+    cell_miles : float
+        Approximate cell size. Queries are cheapest for radii of one or two cells.
+    radius_miles : float
+        Neighborhood used by ``density_factor``.
+    reference_count : float
+        Number of neighbors at which ``density_factor`` is 1.
+    min_factor : float
+        Lower bound of ``density_factor``, so a team with nobody nearby still meets some
+        chaser convergence (as it did before proximity scaling).
+    max_factor : float
+        Upper bound of ``density_factor``.
+    """
+
+    def __init__(self, cell_miles=5.0, radius_miles=10.0, reference_count=3.0,
+                 min_factor=0.25, max_factor=5.0):
+        self.cell_degrees = cell_miles / miles_per_degree_lat
+        self.radius_miles = radius_miles
+        self.reference_count = reference_count
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self._cells = {}  # (row, col) -> {key: (lat, lon)}
+        self._positions = {}  # key -> (row, col)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, lat, lon):
+        # Columns are in degrees of longitude, so they narrow towards the poles; queries
+        # widen their column span by 1 / cos(lat) to compensate
+        return floor(lat / self.cell_degrees), floor(lon / self.cell_degrees)
+
+    def update(self, key, lat, lon):
+        """Insert or move one team (a None position removes it)."""
+        if lat is None or lon is None:
+            self.remove(key)
+            return
+        cell = self._cell(lat, lon)
+        previous = self._positions.get(key)
+        if previous is not None and previous != cell:
+            members = self._cells[previous]
+            del members[key]
+            if not members:
+                del self._cells[previous]
+        self._cells.setdefault(cell, {})[key] = (lat, lon)
+        self._positions[key] = cell
+
+    def update_teams(self, teams):
+        """Update from Team objects (keyed by their path)."""
+        for team in teams:
+            self.update(team.path, team.latitude, team.longitude)
+
+    def remove(self, key):
+        cell = self._positions.pop(key, None)
+        if cell is not None:
+            members = self._cells[cell]
+            del members[key]
+            if not members:
+                del self._cells[cell]
+
+    def within(self, lat, lon, radius_miles, exclude=None):
+        """List of (key, distance in miles) of teams within radius_miles, nearest first."""
+        row, col = self._cell(lat, lon)
+        rows = ceil(radius_miles / miles_per_degree_lat / self.cell_degrees)
+        # Use the narrowest longitude spacing within the searched rows
+        lon_miles = miles_per_degree_lat * max(
+            cos(radians(min(89.0, abs(lat) + (rows + 1) * self.cell_degrees))), 0.01
+        )
+        cols = ceil(radius_miles / lon_miles / self.cell_degrees)
+        found = []
+        for i in range(row - rows, row + rows + 1):
+            for j in range(col - cols, col + cols + 1):
+                members = self._cells.get((i, j))
+                if not members:
+                    continue
+                for key, (other_lat, other_lon) in members.items():
+                    if key == exclude:
+                        continue
+                    distance = haversine_miles(lat, lon, other_lat, other_lon)
+                    if distance <= radius_miles:
+                        found.append((key, distance))
+        found.sort(key=lambda pair: pair[1])
+        return found
+
+    def count_within(self, lat, lon, radius_miles, exclude=None):
+        return len(self.within(lat, lon, radius_miles, exclude=exclude))
+
+    def density_factor(self, team):
+        """Nearby teams (within radius_miles) relative to reference_count, clamped."""
+        if team.latitude is None or team.longitude is None:
+            return self.min_factor
+        count = self.count_within(
+            team.latitude, team.longitude, self.radius_miles, exclude=team.path
+        )
+        return max(self.min_factor, min(self.max_factor, count / self.reference_count))
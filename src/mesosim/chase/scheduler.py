@@ -0,0 +1,289 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Multi-process tick scheduler across team databases.
+
+Every team lives in its own SQLite file, so per-team ticks are independent. The
+``TickScheduler`` pins each team to one long-lived worker process (team affinity), so the
+worker keeps that team's ``Team``, its ``Config``, hazard registry and the city table warm
+between ticks::
+
+    scheduler = TickScheduler(team_paths, config_path, interval=10.0, processes=4)
+    with scheduler:
+        scheduler.run(duration=3600)
+    print(scheduler.report())
+
+If a team's previous tick is still running when its next one is due, the tick is
+skipped (backpressure) and the following tick covers the whole elapsed time.
+"""
+
+import multiprocessing
+import queue
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+
+from ..core.config import Config
+from .actions import create_hazard_registry, shuffle_new_hazard
+from .team import Team
+
+_stop = None
+
+
+def run_tick(team, hazards, config, seconds, arrivals=None):
+    """Reference tick built from the Team primitives.
+
+    Applies queued actions and hazards, expires hazards past their expiry time, shuffles
+    a new hazard for the elapsed time, and writes status and history. Returns the expiry
+    messages. With ``arrivals``
+    (a ``HazardArrivals``), new hazards come from its event-driven clock instead; use
+    ``functools.partial(run_tick, arrivals=HazardArrivals())`` as a scheduler tick.
+    """
+    for action in team.get_action_queue(hazards):
+        if action.is_hazard:
+            team.apply_hazard(action)
+        else:
+            team.apply_action(action)
+        team.dismiss_action(action)
+
+    messages = team.expire_hazards(datetime.now(tz=timezone.utc))
+
+    if team.vehicle is not None and team.speed is not None:
+        if arrivals is None:
+            hazard = shuffle_new_hazard(team, seconds, hazards, config)
+        else:
+            hazard = arrivals.advance(team, seconds, hazards, config)
+        if hazard is not None and not team.is_hazard_active(hazard.type):
+            team.apply_hazard(hazard)
+
+    team.write_status()
+    return messages
+
+
+def _worker(config_path, tick, inbox, outbox):
+    """Worker loop: keep Config, registry and Teams warm; tick teams as requested."""
+    config = Config(config_path)
+    hazards = create_hazard_registry(config)
+    teams = {}
+    while True:
+        job = inbox.get()
+        if job is _stop:
+            break
+        path, seconds, sequence = job
+        start = time.perf_counter()
+        error = None
+        try:
+            team = teams.get(path)
+            if team is None:
+                team = teams[path] = Team(path, hazards, config)
+            else:
+                team.reload(hazards)
+            tick(team, hazards, config, seconds)
+        except Exception:
+            error = traceback.format_exc()
+            # Drop the cached Team so the next tick starts from a clean connection state
+            stale = teams.pop(path, None)
+            if stale is not None:
+                try:
+                    # Closing discards the failed tick's uncommitted writes
+                    stale.con.close()
+                except Exception:
+                    # A broken connection must not take the worker down with it
+                    pass
+        outbox.put((path, sequence, time.perf_counter() - start, error))
+
+
+class TeamTickStats:
+    """Latency and overrun counters for one team."""
+
+    def __init__(self, window=1000):
+        self.latencies = deque(maxlen=window)
+        self.ticks = 0
+        self.overruns = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.last_error = None
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+    def to_dict(self):
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "mean_s": sum(self.latencies) / len(self.latencies) if self.latencies else None,
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+            "max_s": max(self.latencies) if self.latencies else None,
+            "last_error": self.last_error,
+        }
+
+
+class TickScheduler:
+    """Spread per-team ticks across a process pool with team affinity.
+
+    Parameters
+    ----------
+    team_paths : iterable of str
+        Team databases to tick.
+    config_path : str
+        Config database (shared by all teams).
+    tick : callable
+        ``tick(team, hazards, config, seconds)``; must be picklable (module level).
+    interval : float
+        Seconds between ticks of each team.
+    processes : int
+        Number of worker processes (default: CPU count, at most one per team).
+    tick_timeout : float
+        Seconds after which an unanswered tick counts as lost: its worker is restarted
+        and the team is dispatched again next round (default: 10 intervals, at least 60 s).
+        Workers that die are restarted the same way.
+    """
+
+    def __init__(self, team_paths, config_path, tick=run_tick, interval=10.0, processes=None,
+                 mp_context=None, tick_timeout=None):
+        self.team_paths = [str(path) for path in team_paths]
+        self.config_path = str(config_path)
+        self.tick = tick
+        self.interval = interval
+        self.tick_timeout = max(60.0, 10 * interval) if tick_timeout is None else tick_timeout
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.processes = max(1, min(processes, len(self.team_paths) or 1))
+        self._context = mp_context or multiprocessing.get_context()
+        self._workers = []
+        self._inboxes = []
+        self._outbox = None
+        self._in_flight = {}  # path -> (dispatch time, sequence)
+        self._sequence = 0
+        self._last_tick = {}  # path -> dispatch time of the last tick sent
+        self.stats = {path: TeamTickStats() for path in self.team_paths}
+        # Stable affinity: teams are dealt round-robin to workers in the order given
+        self._affinity = {path: i % self.processes for i, path in enumerate(self.team_paths)}
+
+    def _spawn(self):
+        inbox = self._context.Queue()
+        worker = self._context.Process(
+            target=_worker,
+            args=(self.config_path, self.tick, inbox, self._outbox),
+            daemon=True,
+        )
+        worker.start()
+        return inbox, worker
+
+    def start(self):
+        """Start the worker processes."""
+        self._outbox = self._context.Queue()
+        for _ in range(self.processes):
+            inbox, worker = self._spawn()
+            self._inboxes.append(inbox)
+            self._workers.append(worker)
+
+    def _restart(self, index, reason):
+        """Replace a dead or stuck worker; its in-flight ticks are recorded as lost."""
+        worker = self._workers[index]
+        if worker.is_alive():
+            worker.terminate()
+        worker.join(1.0)
+        self._inboxes[index], self._workers[index] = self._spawn()
+        for path in [path for path in self._in_flight if self._affinity[path] == index]:
+            del self._in_flight[path]
+            stats = self.stats[path]
+            stats.errors += 1
+            stats.timeouts += 1
+            stats.last_error = reason
+
+    def check_workers(self, now=None):
+        """Restart workers that died or hold a tick older than ``tick_timeout``."""
+        now = time.monotonic() if now is None else now
+        for index, worker in enumerate(self._workers):
+            if not worker.is_alive():
+                self._restart(index, "worker exited with code {}".format(worker.exitcode))
+                continue
+            for path, (dispatched, _) in self._in_flight.items():
+                if self._affinity[path] == index and now - dispatched > self.tick_timeout:
+                    self._restart(
+                        index, "tick timed out after {:.1f} s".format(now - dispatched)
+                    )
+                    break
+
+    def stop(self, timeout=10.0):
+        """Let in-flight ticks finish, then stop the workers."""
+        self.collect(timeout=timeout, wait_all=True)
+        for inbox in self._inboxes:
+            inbox.put(_stop)
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers, self._inboxes = [], []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def dispatch(self, now=None):
+        """Send one tick to every team that is not still busy with its previous one."""
+        now = time.monotonic() if now is None else now
+        self.check_workers(now)
+        for path in self.team_paths:
+            if path in self._in_flight:
+                self.stats[path].overruns += 1
+                continue
+            seconds = now - self._last_tick.get(path, now - self.interval)
+            self._sequence += 1
+            self._inboxes[self._affinity[path]].put((path, seconds, self._sequence))
+            self._in_flight[path] = (now, self._sequence)
+            self._last_tick[path] = now
+
+    def collect(self, timeout=0.0, wait_all=False):
+        """Record finished ticks (waiting up to timeout, or for all in flight)."""
+        deadline = time.monotonic() + timeout
+        while self._in_flight:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and not wait_all:
+                break
+            try:
+                path, sequence, latency, error = self._outbox.get(
+                    timeout=max(min(remaining, 1.0), 0.001)
+                )
+            except queue.Empty:
+                if wait_all and remaining <= 0:
+                    break
+                # Don't wait on a worker that can no longer answer
+                self.check_workers()
+                continue
+            if self._in_flight.get(path, (None, None))[1] != sequence:
+                continue  # answer to a tick already given up on
+            del self._in_flight[path]
+            stats = self.stats[path]
+            stats.ticks += 1
+            stats.latencies.append(latency)
+            if error is not None:
+                stats.errors += 1
+                stats.last_error = error
+
+    def run(self, rounds=None, duration=None):
+        """Tick every team each interval for a number of rounds or seconds (or forever)."""
+        start = time.monotonic()
+        completed = 0
+        while rounds is None or completed < rounds:
+            round_start = time.monotonic()
+            if duration is not None and round_start - start >= duration:
+                break
+            self.dispatch(round_start)
+            completed += 1
+            self.collect(timeout=max(0.0, round_start + self.interval - time.monotonic()))
+            time.sleep(max(0.0, round_start + self.interval - time.monotonic()))
+
+    def report(self):
+        """Per-team tick latency, overrun and error summary."""
+        return {path: stats.to_dict() for path, stats in self.stats.items()}
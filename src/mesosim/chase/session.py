@@ -0,0 +1,97 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Unit-of-work session sharing one connection per team tick.
+
+``Team`` and ``Config`` normally open their own connections. A ``Session`` owns a single
+connection instead, hands it to ``Config`` (and therefore ``Vehicle``) and ``Team``, and
+runs a whole tick inside one ``BEGIN IMMEDIATE`` transaction::
+
+    session = Session(team_path, config_path)
+    hazards = create_hazard_registry(session.config)
+    with session.tick(hazards) as team:
+        for action in team.get_action_queue(hazards):
+            ...
+        team.write_status()
+
+If the config tables live in a different file, it is attached to the same connection so
+that the config reads share the transaction. Unqualified table names resolve to the team
+database first, then to the attached config database.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+
+from ..core.config import Config
+from ..core.profiling import span
+from ..core.schema import check_schema, connect
+from .team import Team
+
+config_schema_name = "config_db"
+
+
+class Session:
+    """Own one sqlite connection shared by Config, Vehicle and Team."""
+
+    def __init__(self, path, config_path=None, timeout=30.0):
+        self.path = path
+        self.config_path = path if config_path is None else config_path
+        self.con = connect(path, "team", timeout=timeout)
+        config_schema = "main"
+        if str(self.config_path) != str(path):
+            # The connection takes URI filenames, so ATTACH will not create a missing file
+            self.con.execute(
+                "ATTACH DATABASE ? AS {}".format(config_schema_name),
+                ["file:{}?mode=rw".format(Path(self.config_path).as_posix())],
+            )
+            config_schema = config_schema_name
+        check_schema(self.con, "config", schema=config_schema)
+        self._config = None
+
+    @property
+    def config(self):
+        """Config bound to the session connection."""
+        if self._config is None:
+            self._config = Config(self.config_path, con=self.con)
+        return self._config
+
+    def team(self, hazard_registry):
+        """Load the team on the session connection (outside any tick transaction)."""
+        return Team(self.path, hazard_registry, self.config, con=self.con)
+
+    @contextmanager
+    def transaction(self):
+        """Run the block in one ``BEGIN IMMEDIATE`` transaction, committing once at the end."""
+        if self.con.in_transaction:
+            # Flush anything implicitly opened outside a session transaction
+            self.con.commit()
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            self.con.rollback()
+            raise
+        else:
+            with span("Session.commit"):
+                self.con.commit()
+
+    @contextmanager
+    def tick(self, hazard_registry):
+        """Load the team and run a whole tick atomically, yielding the Team."""
+        with self.transaction():
+            team = self.team(hazard_registry)
+            team.autocommit = False
+            try:
+                yield team
+            finally:
+                team.autocommit = True
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
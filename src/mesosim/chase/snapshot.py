@@ -0,0 +1,181 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+r"""Snapshot and restore of in-memory simulation state.
+
+A snapshot is one compact binary file holding every Team's in-memory state (status,
+active hazards, vehicle), the random number generator states, the replay position and
+the loaded city table::
+
+    save_snapshot("session.snap", teams, replay=scheduler)
+    ...
+    restored = restore_snapshot("session.snap", hazard_registry, config)
+    teams, replay = restored.teams, restored.replay
+
+Each team's entry carries the DB's ``team_stamp`` (a counter that triggers bump on every
+``team_info`` / ``hazard_queue`` write) and a checksum of those rows. On restore an
+unchanged stamp is trusted as is; only when it moved is the checksum recomputed, and
+teams whose rows really changed since the snapshot are reloaded from SQLite instead
+(listed in ``restored.reloaded``).
+
+Hazard callbacks are closures and are not stored: pass the (once per process) hazard
+registry to ``restore_snapshot``.
+"""
+
+import hashlib
+import os
+import pickle
+import random
+import struct
+import tempfile
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ..core.schema import connect
+from ..core.utils import city_data_cache
+from .team import Team
+
+magic = b"MSIMSNP1"
+_header = struct.Struct("<8sQ32s")  # magic, payload length, sha256 of payload
+
+
+class SnapshotError(ValueError):
+    """Raised for missing, truncated or corrupt snapshot files."""
+
+
+def team_db_stamp(con):
+    """Change counter of the rows a Team loads (see the team schema's team_stamp)."""
+    return con.execute("SELECT stamp FROM team_stamp WHERE id = 1").fetchone()[0]
+
+
+def team_db_checksum(con):
+    """Checksum of the rows a Team loads (team_info and active hazard_queue)."""
+    digest = hashlib.sha256()
+    for row in con.execute(
+        "SELECT team_setting, team_value FROM team_info ORDER BY team_setting"
+    ):
+        digest.update(repr(row).encode("utf-8"))
+    digest.update(b"\0")
+    for row in con.execute(
+        "SELECT hazard_type, expiry_time, message, message_end, overridden_by, speed_limit, "
+        "direction_lock, speed_lock FROM hazard_queue WHERE status='active' "
+        "ORDER BY hazard_type, expiry_time"
+    ):
+        digest.update(repr(row).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _rng_state():
+    state = {"python": random.getstate()}
+    try:
+        import numpy as np
+    except ImportError:
+        pass
+    else:
+        state["numpy"] = np.random.get_state()
+    return state
+
+
+def _set_rng_state(state):
+    random.setstate(state["python"])
+    if "numpy" in state:
+        import numpy as np
+
+        np.random.set_state(state["numpy"])
+
+
+def save_snapshot(path, teams, replay=None, extra=None, include_city_data=True):
+    """Write a snapshot of the given teams (dict of key -> Team); returns bytes written.
+
+    Team state is taken as it is in memory: call ``write_status`` first if the DB should
+    agree with it, otherwise the checksum will (correctly) flag the team on restore.
+    """
+    payload = {
+        "created": datetime.now(tz=timezone.utc),
+        "teams": {
+            key: {
+                "path": team.path,
+                "stamp": team_db_stamp(team.con),
+                "checksum": team_db_checksum(team.con),
+                "state": team.get_state(),
+            }
+            for key, team in teams.items()
+        },
+        "rng": _rng_state(),
+        "replay": replay,
+        "city_data": dict(city_data_cache) if include_city_data else {},
+        "extra": extra,
+    }
+    data = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    header = _header.pack(magic, len(data), hashlib.sha256(data).digest())
+    # Never truncate the previous snapshot: write aside, sync, then swap into place
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(header) + len(data)
+
+
+def read_snapshot(path):
+    """Read and integrity-check a snapshot file, returning its payload dict."""
+    with open(path, "rb") as f:
+        header = f.read(_header.size)
+        if len(header) != _header.size:
+            raise SnapshotError("Snapshot {} is truncated".format(path))
+        file_magic, length, checksum = _header.unpack(header)
+        if file_magic != magic:
+            raise SnapshotError("{} is not a MesoSim snapshot".format(path))
+        data = f.read(length)
+    if len(data) != length or hashlib.sha256(data).digest() != checksum:
+        raise SnapshotError("Snapshot {} is corrupt".format(path))
+    return pickle.loads(zlib.decompress(data))
+
+
+class RestoredSimulation:
+    """Result of ``restore_snapshot``."""
+
+    def __init__(self, teams, replay, reloaded, created, extra):
+        self.teams = teams  # key -> Team
+        self.replay = replay
+        self.reloaded = reloaded  # keys whose DB no longer matched and were reloaded
+        self.created = created
+        self.extra = extra
+
+
+def restore_snapshot(path, hazard_registry, config, verify=True, restore_rng=True):
+    """Restore teams, RNG state, replay position and city data from a snapshot."""
+    payload = read_snapshot(path)
+
+    teams = {}
+    reloaded = []
+    for key, entry in payload["teams"].items():
+        con = connect(entry["path"], "team")
+        if (
+            verify
+            and team_db_stamp(con) != entry["stamp"]
+            and team_db_checksum(con) != entry["checksum"]
+        ):
+            teams[key] = Team(entry["path"], hazard_registry, config, con=con)
+            reloaded.append(key)
+        else:
+            teams[key] = Team.from_state(
+                entry["path"], hazard_registry, config, entry["state"], con=con
+            )
+
+    if restore_rng:
+        _set_rng_state(payload["rng"])
+    for city_key, data in payload["city_data"].items():
+        city_data_cache.setdefault(city_key, data)
+
+    return RestoredSimulation(
+        teams, payload["replay"], reloaded, payload["created"], payload["extra"]
+    )
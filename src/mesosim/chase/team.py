@@ -3,29 +3,94 @@
 # SPDX-License-Identifier: Apache-2.0
 r"""Team TODO"""
 
-from datetime import datetime
+from datetime import datetime, timezone
+import json
+from pathlib import Path
 from sqlite3 import dbapi2 as sql
 import traceback
 import warnings
 
-import numpy as np
-import pytz
-from dateutil import parser
-
-from ..core.timing import arc_time_from_cur, db_time_fmt
+from ..core.profiling import profiled, span
+from ..core.schema import connect
+from ..core.timing import arc_time_from_cur, format_time, parse_time
 from ..core.utils import direction_angle_to_str, money_format, nearest_city
-from .actions import Action, Hazard
+from .actions import Action, ActiveHazard, HazardSpec
 from .vehicle import Vehicle
 
 
+def _json_default(value):
+    # numpy scalars (e.g. hazard speed limits) and anything else unexpected
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def read_status_document(path):
+    """Read the materialized status without constructing a Team.
+
+    Returns (version, last_update, document JSON text), or None if no status has been
+    materialized yet or the last write could not render it (read team_info instead).
+    """
+    con = sql.connect("file:{}?mode=ro".format(Path(path).as_posix()), uri=True)
+    try:
+        row = con.execute(
+            "SELECT version, updated, document FROM status_document WHERE doc_id = 1"
+        ).fetchone()
+    except sql.OperationalError:
+        # Table not created yet
+        return None
+    finally:
+        con.close()
+    return row if row is not None and row[2] is not None else None
+
+
 class Team:
     """Class for manipulating team status for the chase."""
 
-    def __init__(self, path, hazard_registry, config):
+    # When False, write_status leaves committing to the owner of the connection (Session)
+    autocommit = True
+
+    @profiled("Team.__init__")
+    def __init__(self, path, hazard_registry, config, con=None):
         """Construct underlying database connection, and set initial state."""
-        self.con = sql.connect(path)
+        self.path = path
+        self.con = connect(path, "team") if con is None else con
         self.cur = self.con.cursor()
+        self.config = config
+        self.vehicle = None
+        self.reload(hazard_registry)
+
+    def get_state(self):
+        """In-memory state as plain (picklable) data, for snapshots."""
+        return {
+            "status": dict(self.status),
+            "active_hazards": [
+                (hazard.to_hazard_tuple(), hazard.action_id) for hazard in self.active_hazards
+            ],
+            "previous_active_hazard_tuples": list(self.previous_active_hazard_tuples),
+            "vehicle": self.vehicle,
+        }
 
+    @classmethod
+    def from_state(cls, path, hazard_registry, config, state, con=None):
+        """Rebuild a Team from ``get_state`` output without reading the team DB."""
+        team = cls.__new__(cls)
+        team.path = path
+        team.con = connect(path, "team") if con is None else con
+        team.cur = team.con.cursor()
+        team.config = config
+        team.status = dict(state["status"])
+        team.active_hazards = []
+        for hazard_tuple, action_id in state["active_hazards"]:
+            hazard = ActiveHazard.from_hazard_tuple(hazard_registry[hazard_tuple[0]], hazard_tuple)
+            hazard.action_id = action_id
+            team.active_hazards.append(hazard)
+        team.previous_active_hazard_tuples = list(state["previous_active_hazard_tuples"])
+        team.vehicle = state["vehicle"]
+        if team.vehicle is not None:
+            team.vehicle.attach(config)
+        return team
+
+    def reload(self, hazard_registry):
+        """(Re)read status and active hazards from the DB, keeping the connection."""
         self.cur.execute("SELECT team_setting, team_value FROM team_info")
         self.status = dict(self.cur.fetchall())
 
@@ -37,16 +102,15 @@ class Team:
         self.previous_active_hazard_tuples = []
         self.active_hazards = []
         for hazard_tuple in self.cur.fetchall():
-            hazard = hazard_registry[hazard_tuple[0]].update_from_tuple(hazard_tuple)
+            hazard = ActiveHazard.from_hazard_tuple(hazard_registry[hazard_tuple[0]], hazard_tuple)
             self.previous_active_hazard_tuples.append(hazard_tuple)
             self.active_hazards.append(hazard)
 
-        self.config = config
         vehicle_id = self.status.get("vehicle", None)
-        if vehicle_id is not None:
-            self.vehicle = Vehicle(vehicle_id, config)
-        else:
+        if vehicle_id is None:
             self.vehicle = None
+        elif self.vehicle is None or self.vehicle.vehicle_type != vehicle_id:
+            self.vehicle = Vehicle(vehicle_id, self.config)
 
     @property
     def can_refuel(self):
@@ -79,19 +143,23 @@ class Team:
             elif active_hazard.speed_limit is not None:
                 return active_hazard.speed_limit
             else:
-                return np.nan
+                return None
 
         if self.hazard_max_speed is not None:
             hazard_max_speed = float(self.hazard_max_speed)
         else:
-            hazard_max_speed = np.nan
-
-        return np.nanmin(
-            [self.vehicle.top_speed, hazard_max_speed]
-            + [
-                _find_speed_limit_from_hazard(active_hazard)
-                for active_hazard in self.active_hazards
-            ]
+            hazard_max_speed = None
+
+        return min(
+            speed
+            for speed in (
+                [self.vehicle.top_speed, hazard_max_speed]
+                + [
+                    _find_speed_limit_from_hazard(active_hazard)
+                    for active_hazard in self.active_hazards
+                ]
+            )
+            if speed is not None
         )
 
     @property
@@ -99,7 +167,7 @@ class Team:
         """Give the datetime of last update (in current time)."""
         last = self.status.get("last_update", None)
         if last is not None:
-            return parser.parse(last)
+            return parse_time(last)
         else:
             return None
 
@@ -214,6 +282,37 @@ class Team:
         self.status_text = "Chase On"
         self.status["hazard_max_speed"] = None
 
+    def expire_hazards(self, now=None, expired=None, rng=None):
+        """Remove expired hazards (or the given ones); returns their expiry messages.
+
+        Status color/text and the hazard speed cap are recomputed from the hazards that
+        remain, as if only those had been applied. ``rng`` picks among alternative expiry
+        messages (default: the global numpy state).
+        """
+        if expired is None:
+            expired = [hazard for hazard in self.active_hazards if hazard.is_expired(now)]
+        if not expired:
+            return []
+        expired_ids = set(map(id, expired))
+        remaining = [hazard for hazard in self.active_hazards if id(hazard) not in expired_ids]
+        self.clear_active_hazards()
+        if remaining:
+            # Replay the remaining hazards on a scratch copy and keep only their status
+            # effects (no second ticket, direction flip, ...)
+            scratch = Team.__new__(Team)
+            scratch.__dict__.update(self.__dict__)
+            scratch.status = dict(self.status)
+            scratch.active_hazards = []
+            for hazard in remaining:
+                hazard.alter_status(scratch, self.config, hazard)
+                scratch.active_hazards.append(hazard)
+            for key in ("status_color", "status_text", "hazard_max_speed"):
+                self.status[key] = scratch.status.get(key)
+            self.active_hazards = remaining
+            if self.speed is not None and self.vehicle is not None:
+                self.speed = min(self.speed, self.current_max_speed)
+        return [hazard.generate_expiry_message(rng) for hazard in expired]
+
     def has_action_queue_item(self):
         self.cur.execute("SELECT * FROM action_queue WHERE action_taken IS NULL")
         return len(self.cur.fetchall()) > 0
@@ -222,9 +321,7 @@ class Team:
         self.cur.execute("SELECT * FROM action_queue WHERE action_taken IS NULL")
         for action_tuple in self.cur.fetchall():
             if action_tuple[2] == "hazard":
-                hazard = hazards[action_tuple[3]]
-                hazard.action_id = action_tuple[0]
-                yield hazard
+                yield hazards[action_tuple[3]].activate(action_id=action_tuple[0])
             else:
                 yield Action(action_tuple=action_tuple)
 
@@ -243,33 +340,31 @@ class Team:
         if action.action_id is not None:
             self.cur.execute(
                 "UPDATE action_queue SET action_taken = ? WHERE action_id = ?",
-                [datetime.now(tz=pytz.UTC).strftime(db_time_fmt), action.action_id],
+                [format_time(datetime.now(tz=timezone.utc)), action.action_id],
             )
 
     def apply_hazard(self, hazard):
-        """Apply the hazard to this team."""
+        """Apply the hazard (an ActiveHazard, or a HazardSpec to start now) to this team."""
+        if isinstance(hazard, HazardSpec):
+            hazard = hazard.activate()
         hazard.alter_status(self, self.config, hazard)
         self.active_hazards.append(hazard)
+        return hazard
 
     def is_hazard_active(self, hazard_id):
         return any(hazard_id == haz.type for haz in self.active_hazards)
 
+    @profiled("Team.write_status")
     def write_status(self):
         """Save the current status of this team in DB."""
-        self.status["last_update"] = datetime.now(tz=pytz.UTC).strftime(db_time_fmt)
+        self.status["last_update"] = format_time(datetime.now(tz=timezone.utc))
 
         # Current team status table
-        self.cur.execute("SELECT team_setting FROM team_info")
-        current_keys = set(row[0] for row in self.cur.fetchall())
-        for key, value in self.status.items():
-            if key in current_keys:
-                self.cur.execute(
-                    "UPDATE team_info SET team_value = ? WHERE team_setting = ?", [value, key]
-                )
-            else:
-                self.cur.execute(
-                    "INSERT INTO team_info (team_setting, team_value) VALUES (?,?)", [key, value]
-                )
+        self.cur.executemany(
+            "INSERT INTO team_info (team_setting, team_value) VALUES (?,?) "
+            "ON CONFLICT (team_setting) DO UPDATE SET team_value = excluded.team_value",
+            self.status.items(),
+        )
 
         # History table
         try:
@@ -325,9 +420,34 @@ class Team:
                     "UPDATE hazard_queue SET status='expired' WHERE hazard_type = ?",
                     [previous_active_hazard_tup[0]],
                 )
+        # What is in the DB now, so the next write (or a snapshot) compares against it
+        self.previous_active_hazard_tuples = [
+            active_hazard.to_hazard_tuple() for active_hazard in self.active_hazards
+        ]
+
+        self.write_status_document()
 
-        self.con.commit()
+        if self.autocommit:
+            with span("Team.write_status.commit"):
+                self.con.commit()
+
+    def write_status_document(self):
+        """Store the rendered status JSON (with a version) for read_status_document."""
+        try:
+            document = json.dumps(self.output_status_dict(), default=_json_default)
+        except Exception:
+            # If we don't have the full status yet (i.e., setup), mark the document stale
+            # in the same transaction rather than leave an outdated one behind
+            warnings.warn(traceback.format_exc())
+            document = None
+        self.cur.execute(
+            "INSERT INTO status_document (doc_id, version, updated, document) "
+            "VALUES (1, 1, ?, ?) ON CONFLICT (doc_id) DO UPDATE SET "
+            "version = version + 1, updated = excluded.updated, document = excluded.document",
+            [self.status["last_update"], document],
+        )
 
+    @profiled("Team.output_status_dict")
     def output_status_dict(self):
         """Output the dict for JSON to web app."""
         color = {"green": "success", "yellow": "warning", "red": "danger"}[
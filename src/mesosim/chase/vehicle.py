@@ -42,6 +42,17 @@ class Vehicle:
             self.stuck_probability = float(data[0][6])
             self.traction_rating = data[0][7]
 
+    def __getstate__(self):
+        # The cursor belongs to a connection; reattach with ``attach(config)`` after unpickling
+        state = dict(self.__dict__)
+        state.pop("_cursor", None)
+        return state
+
+    def attach(self, config):
+        """Use the given config's cursor for queries (after unpickling)."""
+        self._cursor = config.cur
+        return self
+
     def _query(self, *args):
         # Run a DB query on the DB cursor given
         self._cursor.execute(*args)
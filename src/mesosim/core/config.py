@@ -4,9 +4,10 @@
 r"""Configuration documentation TODO"""
 
 import json
-from sqlite3 import dbapi2 as sql
 
-from dateutil import parser
+from .profiling import profiled
+from .schema import connect
+from .timing import parse_time
 
 
 class Config:
@@ -42,11 +43,12 @@ class Config:
     speed_limit
     """
 
-    def __init__(self, path):
-        """Construct underlying sqlite connection."""
-        self.con = sql.connect(path)
+    def __init__(self, path, con=None):
+        """Construct underlying sqlite connection (or use the given one)."""
+        self.con = connect(path, "config") if con is None else con
         self.cur = self.con.cursor()
 
+    @profiled("Config.get_config_value")
     def get_config_value(self, config_setting):
         self.cur.execute(
             "SELECT config_value FROM config WHERE config_setting = ?", [config_setting]
@@ -65,6 +67,7 @@ class Config:
         # Default to float transform
         return float(self.get_config_value(name))
 
+    @profiled("Config.hazard_config")
     def hazard_config(self, name):
         # Get the hazard config
         self.cur.execute(
@@ -72,6 +75,11 @@ class Config:
         )
         return self.cur.fetchall()[0][0]
 
+    @property
+    def data_version(self):
+        """Changes whenever another connection commits to the config DB."""
+        return self.con.execute("PRAGMA data_version").fetchone()[0]
+
     @property
     def active_hazards(self):
         # Return list of active hazard IDs
@@ -79,7 +87,7 @@ class Config:
 
     @property
     def start_time(self):
-        return parser.parse(self.get_config_value("cur_start_time"))
+        return parse_time(self.get_config_value("cur_start_time"))
 
     @property
     def timings(self):
@@ -0,0 +1,172 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Opt-in profiling spans
+
+Spans are named timers wrapped around the hot paths of the chase (team construction,
+status writes and polls, city lookups, hazard shuffles, warning processing). While
+profiling is disabled (the default) a span costs one global flag check. Enable it with
+``enable()`` or by setting the ``MESOSIM_PROFILE`` environment variable, then call
+``export_json()`` to dump per-span histograms.
+
+span, profiled, enable, disable, reset, snapshot, export_json
+"""
+
+# Imports
+import json
+import os
+import threading
+from bisect import bisect_right
+from functools import wraps
+from time import perf_counter
+
+# Histogram bucket upper bounds (seconds); one extra bucket catches everything slower
+bucket_bounds = (
+    1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2, 1e-1, 3e-1, 1.0, 3.0, 10.0
+)
+
+_enabled = bool(os.environ.get("MESOSIM_PROFILE"))
+_lock = threading.Lock()
+_spans = {}
+
+
+class SpanStats:
+    """Accumulated timing statistics for one span name."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(bucket_bounds) + 1)
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed < self.min:
+            self.min = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.buckets[bisect_right(bucket_bounds, elapsed)] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "min_s": self.min if self.count else 0.0,
+            "max_s": self.max,
+            "histogram": {
+                ("<={}".format(bound) if i < len(bucket_bounds) else ">{}".format(bucket_bounds[-1])): n
+                for i, (bound, n) in enumerate(zip(bucket_bounds + (None,), self.buckets))
+            },
+        }
+
+
+def enable():
+    """Start collecting span timings."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop collecting span timings (collected data is kept)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Drop all collected span timings."""
+    with _lock:
+        _spans.clear()
+
+
+def record(name, elapsed):
+    """Add one timing (in seconds) to the named span."""
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = SpanStats()
+        stats.add(elapsed)
+
+
+class _Span:
+    """Active span context manager."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    """Do-nothing context manager handed out while profiling is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+def span(name):
+    """Time a block of code under the given span name."""
+    if _enabled:
+        return _Span(name)
+    return _null_span
+
+
+def profiled(name=None):
+    """Decorate a function so each call is timed as a span (default: qualified name)."""
+
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot():
+    """Return the collected span statistics as a plain dict."""
+    with _lock:
+        return {name: stats.to_dict() for name, stats in sorted(_spans.items())}
+
+
+def export_json(path=None, **json_kwargs):
+    """Export the collected span statistics as JSON (optionally also writing to path)."""
+    output = json.dumps({"enabled": _enabled, "spans": snapshot()}, **json_kwargs)
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(output)
+    return output
@@ -0,0 +1,274 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Schema management for the chase databases
+
+Two components are versioned independently in a ``schema_version`` table (so one file can
+hold both, as in tests and single-file sessions):
+
+team: team_info, action_queue, hazard_queue, team_history, status_document,
+    history_compaction, team_stamp
+config: config, hazard_config, vehicles
+
+``ensure_schema`` creates missing tables and upgrades existing ones (adding the unique
+keys needed for upserts and the indexes used by the ``Team``/``Config`` query paths).
+Migrating is an explicit step, run once per database before a session (it rewrites the
+file and switches it to WAL, and team databases to incremental auto-vacuum)::
+
+    python -m mesosim.core.schema teams/*.db config.db
+
+``connect`` only opens an existing, migrated database with the per-connection pragmas;
+it never creates a file or changes the schema.
+
+Upgrading: databases created before schema versioning (or by an older release) must be
+migrated once before use. Until then ``Team``, ``Config`` and ``Session`` raise
+``SchemaError`` naming the component and version. Migration keeps the row each table is
+read from when keys are duplicated: the first row for config and hazard_config (as
+``Config`` reads them), the last for team_info (as ``Team`` reads it).
+"""
+
+# Imports
+import argparse
+from pathlib import Path
+from sqlite3 import dbapi2 as sql
+
+# Each entry upgrades the component by one version; {schema} is the database name
+team_migrations = [
+    # 1: base tables
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.team_info (
+        team_setting TEXT PRIMARY KEY, team_value
+    );
+    CREATE TABLE IF NOT EXISTS {schema}.action_queue (
+        action_id INTEGER PRIMARY KEY, message TEXT, action_type TEXT, action_amount TEXT,
+        action_taken TEXT
+    );
+    CREATE TABLE IF NOT EXISTS {schema}.hazard_queue (
+        hazard_id INTEGER PRIMARY KEY, hazard_type TEXT, expiry_time TEXT, message TEXT,
+        message_end TEXT, overridden_by TEXT, speed_limit TEXT, direction_lock TEXT,
+        speed_lock TEXT, status TEXT
+    );
+    CREATE TABLE IF NOT EXISTS {schema}.team_history (
+        cur_timestamp TEXT, arc_timestamp TEXT, latitude REAL, longitude REAL, speed REAL,
+        direction REAL, status_color TEXT, status_text TEXT, balance REAL, points INTEGER,
+        fuel_level REAL
+    );
+    """,
+    # 2: unique keys (for upserts) and indexes, also for tables created before versioning
+    """
+    DELETE FROM {schema}.team_info WHERE rowid NOT IN (
+        SELECT MAX(rowid) FROM {schema}.team_info GROUP BY team_setting
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS {schema}.team_info_setting ON team_info (team_setting);
+    CREATE INDEX IF NOT EXISTS {schema}.action_queue_taken ON action_queue (action_taken);
+    CREATE INDEX IF NOT EXISTS {schema}.hazard_queue_status ON hazard_queue (status);
+    CREATE INDEX IF NOT EXISTS {schema}.hazard_queue_type ON hazard_queue (hazard_type);
+    CREATE INDEX IF NOT EXISTS {schema}.team_history_time ON team_history (cur_timestamp);
+    """,
+    # 3: materialized status document and history compaction watermark
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.status_document (
+        doc_id INTEGER PRIMARY KEY CHECK (doc_id = 1), version INTEGER NOT NULL,
+        updated TEXT NOT NULL, document TEXT  -- NULL: stale, read team_info
+    );
+    CREATE TABLE IF NOT EXISTS {schema}.history_compaction (
+        id INTEGER PRIMARY KEY CHECK (id = 1), compacted_until TEXT
+    );
+    """,
+    # 4: change counter of the rows a Team loads, bumped by every writer (for snapshots)
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.team_stamp (
+        id INTEGER PRIMARY KEY CHECK (id = 1), stamp INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO {schema}.team_stamp (id, stamp) VALUES (1, 0);
+    CREATE TRIGGER IF NOT EXISTS {schema}.team_info_insert_stamp
+        AFTER INSERT ON team_info BEGIN
+            UPDATE team_stamp SET stamp = stamp + 1;
+        END;
+    CREATE TRIGGER IF NOT EXISTS {schema}.team_info_update_stamp
+        AFTER UPDATE ON team_info BEGIN
+            UPDATE team_stamp SET stamp = stamp + 1;
+        END;
+    CREATE TRIGGER IF NOT EXISTS {schema}.team_info_delete_stamp
+        AFTER DELETE ON team_info BEGIN
+            UPDATE team_stamp SET stamp = stamp + 1;
+        END;
+    CREATE TRIGGER IF NOT EXISTS {schema}.hazard_queue_insert_stamp
+        AFTER INSERT ON hazard_queue BEGIN
+            UPDATE team_stamp SET stamp = stamp + 1;
+        END;
+    CREATE TRIGGER IF NOT EXISTS {schema}.hazard_queue_update_stamp
+        AFTER UPDATE ON hazard_queue BEGIN
+            UPDATE team_stamp SET stamp = stamp + 1;
+        END;
+    CREATE TRIGGER IF NOT EXISTS {schema}.hazard_queue_delete_stamp
+        AFTER DELETE ON hazard_queue BEGIN
+            UPDATE team_stamp SET stamp = stamp + 1;
+        END;
+    """,
+]
+
+config_migrations = [
+    # 1: base tables
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.config (
+        config_setting TEXT PRIMARY KEY, config_value
+    );
+    CREATE TABLE IF NOT EXISTS {schema}.hazard_config (
+        hazard_setting TEXT PRIMARY KEY, hazard_value
+    );
+    CREATE TABLE IF NOT EXISTS {schema}.vehicles (
+        vehicle_type TEXT PRIMARY KEY, print_name TEXT, top_speed REAL,
+        top_speed_on_dirt REAL, efficient_speed REAL, mpg REAL, fuel_cap REAL,
+        stuck_probability REAL, traction_rating TEXT
+    );
+    """,
+    # 2: unique keys, also for tables created before versioning; for duplicate settings
+    # keep the first row, which is the one Config read before the key existed
+    """
+    DELETE FROM {schema}.vehicles WHERE rowid NOT IN (
+        SELECT MAX(rowid) FROM {schema}.vehicles GROUP BY vehicle_type
+    );
+    DELETE FROM {schema}.config WHERE rowid NOT IN (
+        SELECT MIN(rowid) FROM {schema}.config GROUP BY config_setting
+    );
+    DELETE FROM {schema}.hazard_config WHERE rowid NOT IN (
+        SELECT MIN(rowid) FROM {schema}.hazard_config GROUP BY hazard_setting
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS {schema}.config_setting ON config (config_setting);
+    CREATE UNIQUE INDEX IF NOT EXISTS {schema}.hazard_config_setting
+        ON hazard_config (hazard_setting);
+    CREATE UNIQUE INDEX IF NOT EXISTS {schema}.vehicles_type ON vehicles (vehicle_type);
+    """,
+]
+
+migrations = {"team": team_migrations, "config": config_migrations}
+
+default_pragmas = (
+    ("synchronous", "NORMAL"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", "-8192"),  # KiB
+    ("busy_timeout", "5000"),  # ms
+)
+
+
+class SchemaError(RuntimeError):
+    """A database has not been migrated to the schema this code needs."""
+
+
+def schema_version(con, component, schema="main"):
+    """Return the stored version of a component (0 if never migrated)."""
+    try:
+        row = con.execute(
+            "SELECT version FROM {}.schema_version WHERE component = ?".format(schema),
+            [component],
+        ).fetchone()
+    except sql.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+def ensure_schema(con, component, schema="main"):
+    """Create or upgrade the tables of a component ("team" or "config"); returns version."""
+    steps = migrations[component]
+    version = schema_version(con, component, schema)
+    if version >= len(steps):
+        return version
+    if con.in_transaction:
+        con.commit()
+    for target, script in enumerate(steps[version:], start=version + 1):
+        con.executescript(
+            "BEGIN IMMEDIATE;\n"
+            "CREATE TABLE IF NOT EXISTS {schema}.schema_version "
+            "(component TEXT PRIMARY KEY, version INTEGER NOT NULL);\n"
+            "{script}\n"
+            "INSERT OR REPLACE INTO {schema}.schema_version (component, version) "
+            "VALUES ('{component}', {target:d});\n"
+            "COMMIT;".format(
+                schema=schema,
+                script=script.format(schema=schema),
+                component=component,
+                target=target,
+            )
+        )
+    return len(steps)
+
+
+def check_schema(con, component, schema="main"):
+    """Raise SchemaError unless the component is fully migrated."""
+    version = schema_version(con, component, schema)
+    if version < len(migrations[component]):
+        raise SchemaError(
+            "{} schema of {} is at version {} (need {}); run mesosim.core.schema.migrate "
+            "first".format(component, schema, version, len(migrations[component]))
+        )
+
+
+def apply_pragmas(con, wal=True, pragmas=default_pragmas):
+    """Apply performance pragmas (and switch the file to WAL, which persists)."""
+    if wal:
+        try:
+            con.execute("PRAGMA journal_mode = WAL").fetchall()
+        except sql.OperationalError:
+            # Read-only or busy: keep whatever journal mode the file has
+            pass
+    for name, value in pragmas:
+        con.execute("PRAGMA {} = {}".format(name, value))
+    return con
+
+
+def migrate(path, components=("team", "config"), timeout=30.0):
+    """Create or upgrade a database (creating the file if needed) and switch it to WAL.
+
+    Team databases are also switched to ``auto_vacuum = INCREMENTAL`` (one full VACUUM
+    the first time), so history compaction can release pages without an exclusive lock.
+
+    Returns {component: version}.
+    """
+    con = sql.connect(str(path), timeout=timeout)
+    try:
+        apply_pragmas(con)
+        versions = {component: ensure_schema(con, component) for component in components}
+        if "team" in components and con.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            con.execute("VACUUM")
+        return versions
+    finally:
+        con.close()
+
+
+def connect(path, component=None, timeout=5.0, pragmas=default_pragmas):
+    """Open an existing chase database with pragmas applied.
+
+    Raises ``sqlite3.OperationalError`` if the file does not exist, and ``SchemaError``
+    if ``component`` is given and not migrated.
+    """
+    con = sql.connect("file:{}?mode=rw".format(Path(path).as_posix()), uri=True,
+                      timeout=timeout)
+    try:
+        apply_pragmas(con, wal=False, pragmas=pragmas)
+        if component is not None:
+            check_schema(con, component)
+    except BaseException:
+        con.close()
+        raise
+    return con
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Migrate chase databases.")
+    arg_parser.add_argument("databases", nargs="+", help="team and/or config databases")
+    arg_parser.add_argument(
+        "--component", choices=("team", "config"), action="append",
+        help="component(s) to migrate (default: both)",
+    )
+    args = arg_parser.parse_args(argv)
+
+    for path in args.databases:
+        versions = migrate(path, components=args.component or ("team", "config"))
+        print("{}: {}".format(path, versions))
+
+
+if __name__ == "__main__":
+    main()
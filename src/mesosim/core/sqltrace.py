@@ -0,0 +1,245 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+"""
+SQL statement tracing
+
+Attaches ``sqlite3`` trace callbacks to the connections used by ``Config``, ``Team``
+and ``Vehicle`` (the latter shares the ``Config`` connection) and groups the statements
+they issue by logical operation::
+
+    tracer = QueryTracer(explain=True, budgets={"poll": 25})
+    tracer.attach(config, team)
+    with tracer.operation("poll"):
+        team.output_status_dict()
+    print(tracer.format_report())
+
+sqlite only reports when a statement starts, so the time charged to a statement runs
+until the next traced statement (or the end of the operation) and includes fetching its
+rows.
+"""
+
+# Imports
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from time import perf_counter
+
+untracked_operation = "(untracked)"
+default_watch_tables = ("action_queue", "hazard_queue", "team_history")
+
+
+class OperationReport:
+    """Statement counts and timings for one logical operation name."""
+
+    def __init__(self, name, budget=None):
+        self.name = name
+        self.budget = budget
+        self.calls = 0
+        self.statements = 0
+        self.statement_time = 0.0
+        self.wall_time = 0.0
+        self.repeated = Counter()
+        self.full_scans = {}
+
+    @property
+    def statements_per_call(self):
+        return self.statements / self.calls if self.calls else float(self.statements)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.statements_per_call > self.budget
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "statements": self.statements,
+            "statements_per_call": self.statements_per_call,
+            "statement_time_s": self.statement_time,
+            "wall_time_s": self.wall_time,
+            "budget": self.budget,
+            "over_budget": self.over_budget,
+            "repeated": dict(self.repeated),
+            "full_scans": dict(self.full_scans),
+        }
+
+
+class _Call:
+    """Bookkeeping for one active operation call."""
+
+    __slots__ = ("report", "seen", "last_start", "start")
+
+    def __init__(self, report):
+        self.report = report
+        self.seen = Counter()
+        self.last_start = None
+        self.start = perf_counter()
+
+    def close_statement(self, now):
+        if self.last_start is not None:
+            self.report.statement_time += now - self.last_start
+            self.last_start = None
+
+
+class QueryTracer:
+    """Count and time SQL statements per logical operation.
+
+    Parameters
+    ----------
+    explain : bool
+        Run ``EXPLAIN QUERY PLAN`` on each distinct statement at the end of an operation
+        and record full-table scans of the ``watch_tables``.
+    watch_tables : iterable of str
+        Tables where a full scan is flagged.
+    budgets : dict
+        Maximum statements per call, keyed by operation name.
+    """
+
+    def __init__(self, explain=False, watch_tables=default_watch_tables, budgets=None):
+        self.explain = explain
+        self.watch_tables = tuple(watch_tables)
+        self.budgets = dict(budgets or {})
+        self.reports = {}
+        self._connections = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._plans = {}
+
+    def attach(self, *targets):
+        """Trace the given connections (or objects with a ``con`` attribute)."""
+        for target in targets:
+            con = getattr(target, "con", target)
+            if any(con is existing for existing in self._connections):
+                continue
+            con.set_trace_callback(
+                lambda statement, con=con: self._on_statement(con, statement)
+            )
+            self._connections.append(con)
+        return self
+
+    def detach(self):
+        """Stop tracing all attached connections."""
+        for con in self._connections:
+            con.set_trace_callback(None)
+        self._connections = []
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _report(self, name):
+        report = self.reports.get(name)
+        if report is None:
+            report = self.reports[name] = OperationReport(name, self.budgets.get(name))
+        return report
+
+    def _on_statement(self, con, statement):
+        if getattr(self._local, "explaining", False):
+            # Our own EXPLAIN statements (only on this thread; others keep being traced)
+            return
+        now = perf_counter()
+        stack = self._stack()
+        with self._lock:
+            if stack:
+                call = stack[-1]
+                call.close_statement(now)
+                call.last_start = now
+                report = call.report
+                call.seen[(id(con), statement)] += 1
+                if call.seen[(id(con), statement)] == 2:
+                    report.repeated[statement] += 2
+                elif call.seen[(id(con), statement)] > 2:
+                    report.repeated[statement] += 1
+            else:
+                report = self._report(untracked_operation)
+            report.statements += 1
+
+    @contextmanager
+    def operation(self, name):
+        """Attribute statements issued inside this block to the named operation."""
+        stack = self._stack()
+        with self._lock:
+            call = _Call(self._report(name))
+            call.report.calls += 1
+        stack.append(call)
+        try:
+            yield call.report
+        finally:
+            now = perf_counter()
+            stack.pop()
+            with self._lock:
+                call.close_statement(now)
+                call.report.wall_time += now - call.start
+            if self.explain:
+                self._explain(call)
+
+    def _explain(self, call):
+        # Statements are traced fully expanded, so they can be planned without parameters
+        connections = {id(con): con for con in self._connections}
+        self._local.explaining = True
+        try:
+            for con_id, statement in call.seen:
+                if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    continue
+                if con_id not in connections:
+                    continue
+                if (con_id, statement) not in self._plans:
+                    self._plans[(con_id, statement)] = self._find_full_scans(
+                        connections[con_id], statement
+                    )
+                scans = self._plans[(con_id, statement)]
+                if scans:
+                    call.report.full_scans[statement] = scans
+        finally:
+            self._local.explaining = False
+
+    def _find_full_scans(self, con, statement):
+        try:
+            plan = con.execute("EXPLAIN QUERY PLAN " + statement).fetchall()
+        except Exception:
+            return []
+        scans = []
+        for row in plan:
+            detail = row[-1]
+            words = detail.split()
+            if words[1:2] == ["TABLE"]:
+                # "SCAN TABLE x" before SQLite 3.36, "SCAN x" since
+                del words[1]
+            if (
+                len(words) > 1
+                and words[0] == "SCAN"
+                and "USING" not in detail
+                and words[1] in self.watch_tables
+            ):
+                scans.append(detail)
+        return scans
+
+    def report(self):
+        """Return all operation reports as a plain dict."""
+        with self._lock:
+            return {name: report.to_dict() for name, report in sorted(self.reports.items())}
+
+    def format_report(self):
+        """Render a short human-readable summary of all operations."""
+        lines = []
+        for name, report in sorted(self.reports.items()):
+            lines.append(
+                "{name}: {calls} calls, {statements} statements ({per:.1f}/call), "
+                "{time:.2f} ms in SQL{flag}".format(
+                    name=name,
+                    calls=report.calls,
+                    statements=report.statements,
+                    per=report.statements_per_call,
+                    time=report.statement_time * 1000,
+                    flag=(
+                        " OVER BUDGET ({})".format(report.budget) if report.over_budget else ""
+                    ),
+                )
+            )
+            for statement, count in report.repeated.most_common():
+                lines.append("    repeated x{}: {}".format(count, statement))
+            for statement, scans in report.full_scans.items():
+                lines.append("    full scan ({}): {}".format("; ".join(scans), statement))
+        return "\n".join(lines)
@@ -7,48 +7,124 @@ Timing-related helper functions
 ...
 
 arc_time_from_cur, cur_time_from_arc (use timings)
+parse_time, format_time (fixed-layout timestamp codec)
+to_utc, epoch_seconds (normalize str/datetime times; naive means UTC)
 """
 
 # Imports
-from datetime import datetime, timedelta
-
-from dateutil import parser
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 # Define standard format
 std_fmt = db_time_fmt = "%Y-%m-%dT%H:%M:%SZ"
+vtec_time_fmt = "%y%m%dT%H%MZ"
+
+
+def _fixed_layout(value):
+    """Parse the layouts we write or receive ourselves by slicing (None if unknown)."""
+    n = len(value)
+    if value[-1:] != "Z":
+        return None
+    if n == 20 and value[4] == "-" and value[10] == "T":
+        # 2021-07-10T03:12:00Z (db_time_fmt)
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]), int(value[11:13]),
+            int(value[14:16]), int(value[17:19]), tzinfo=timezone.utc,
+        )
+    if n == 17 and value[4] == "-" and value[10] == "T":
+        # 2021-07-10T03:12Z (IEM utcvalid)
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]), int(value[11:13]),
+            int(value[14:16]), tzinfo=timezone.utc,
+        )
+    if n == 12 and value[6] == "T":
+        # 210710T0312Z (VTEC)
+        return datetime(
+            2000 + int(value[0:2]), int(value[2:4]), int(value[4:6]), int(value[7:9]),
+            int(value[9:11]), tzinfo=timezone.utc,
+        )
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_time(value):
+    """Parse a timestamp string, using fixed-layout fast paths before dateutil.
+
+    db_time_fmt, IEM utcvalid and VTEC times become aware UTC datetimes; other ISO 8601
+    strings go through ``datetime.fromisoformat`` and anything else through dateutil.
+    """
+    try:
+        parsed = _fixed_layout(value)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        return parsed
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        from dateutil import parser
+
+        return parser.parse(value)
+
+
+def format_time(time, fmt=std_fmt):
+    """Format a datetime like ``time.strftime(fmt)``, with fast paths for our layouts."""
+    if fmt == std_fmt:
+        return "{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}Z".format(
+            time.year, time.month, time.day, time.hour, time.minute, time.second
+        )
+    if fmt == vtec_time_fmt:
+        return "{:02d}{:02d}{:02d}T{:02d}{:02d}Z".format(
+            time.year % 100, time.month, time.day, time.hour, time.minute
+        )
+    return time.strftime(fmt)
+
+
+def to_utc(time):
+    """Parse (if needed) and normalize a time to an aware UTC datetime (naive means UTC)."""
+    if isinstance(time, str):
+        time = parse_time(time)
+    if time.tzinfo is None:
+        return time.replace(tzinfo=timezone.utc)
+    return time.astimezone(timezone.utc)
+
+
+def epoch_seconds(time):
+    """Epoch seconds of a time string or datetime (naive means UTC); numbers pass through."""
+    if isinstance(time, (str, datetime)):
+        return to_utc(time).timestamp()
+    return float(time)
 
 
 # Archive time given current time
 def arc_time_from_cur(cur_time, timings):
-
     # Get the references
-    arc_start_time = parser.parse(timings["arc_start_time"])
-    cur_start_time = parser.parse(timings["cur_start_time"])
+    arc_start_time = parse_time(timings["arc_start_time"])
+    cur_start_time = parse_time(timings["cur_start_time"])
     speed_factor = timings["speed_factor"]
 
     if type(cur_time) is datetime:
         return arc_start_time + timedelta(seconds=(cur_time - cur_start_time).total_seconds() * speed_factor)
     elif type(cur_time) is str:
-        return (
-            arc_start_time + timedelta(seconds=(parser.parse(cur_time) - cur_start_time).total_seconds() * speed_factor)
-        ).strftime(std_fmt)
+        return format_time(
+            arc_start_time + timedelta(seconds=(parse_time(cur_time) - cur_start_time).total_seconds() * speed_factor)
+        )
     else:
         raise ValueError("cur_time must be str or datetime.datetime")
 
 
 # Current time given archive time
 def cur_time_from_arc(arc_time, timings):
-
     # Get the references
-    arc_start_time = parser.parse(timings["arc_start_time"])
-    cur_start_time = parser.parse(timings["cur_start_time"])
+    arc_start_time = parse_time(timings["arc_start_time"])
+    cur_start_time = parse_time(timings["cur_start_time"])
     speed_factor = timings["speed_factor"]
 
     if type(arc_time) is datetime:
         return cur_start_time + timedelta(seconds=(arc_time - arc_start_time).total_seconds() / speed_factor)
     elif type(arc_time) is str:
-        return (
-            cur_start_time + timedelta(seconds=(parser.parse(arc_time) - arc_start_time).total_seconds() / speed_factor)
-        ).strftime(std_fmt)
+        return format_time(
+            cur_start_time + timedelta(seconds=(parse_time(arc_time) - arc_start_time).total_seconds() / speed_factor)
+        )
     else:
         raise ValueError("arc_time must be str or datetime.datetime")
@@ -1,22 +1,74 @@
 # Copyright (c) 2020 MesoSim Developers.
 # Distributed under the terms of the Apache 2.0 License.
 # SPDX-License-Identifier: Apache-2.0
-r"""Core utils documentation TODO"""
+r"""Core utils documentation TODO
 
-from math import floor
+pandas and pyproj are only imported when first needed (``get_geod``, ``load_city_data``)
+so that short-lived scripts touching a team DB start quickly.
+"""
+
+from functools import lru_cache
+from math import asin, cos, floor, radians, sin, sqrt
 from pathlib import Path
 
-import pandas as pd
-from pyproj import Geod
+from .profiling import profiled
 
 city_csv = Path(__file__).parent / ".." / "us_cities.csv"  # from https://simplemaps.com/data/us-cities
-g = Geod(ellps="WGS84")  # set up Geod
+city_data_cache = {}  # str(path) -> DataFrame, filled by load_city_data (or a snapshot restore)
+
+
+@lru_cache(maxsize=None)
+def get_geod():
+    """Set up the WGS84 Geod on first use."""
+    from pyproj import Geod
+
+    return Geod(ellps="WGS84")
+
+
+def set_city_csv(path):
+    """Use a different city table (e.g. a synthetic one for offline load tests).
+
+    Returns the previous path, so callers can put it back when done.
+    """
+    global city_csv
+    previous, city_csv = city_csv, Path(path)
+    return previous
+
+
+def load_city_data(path=None):
+    """Read the city table once (from ``city_csv`` by default)."""
+    key = str(city_csv if path is None else path)
+    data = city_data_cache.get(key)
+    if data is None:
+        import pandas as pd
+
+        data = city_data_cache[key] = pd.read_csv(key)
+    return data
+
+
+def __getattr__(name):
+    # Keep ``utils.g`` working without building the Geod at import
+    if name == "g":
+        return get_geod()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+earth_radius_miles = 3958.8
+miles_per_degree_lat = 69.05
+
+
+def haversine_miles(lat0, lon0, lat1, lon1):
+    """Great circle distance in miles (spherical; cheaper than the geodesic in ``g.inv``)."""
+    dlat = radians(lat1 - lat0)
+    dlon = radians(lon1 - lon0)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat0)) * cos(radians(lat1)) * sin(dlon / 2) ** 2
+    return 2 * earth_radius_miles * asin(min(1.0, sqrt(a)))
 
 
 def move_lat_lon(lat, lon, distance_miles, angle_degrees):
     """Calculate displacement to new point."""
     distance_m = distance_miles * 1609.344  # convert
-    new_lon, new_lat, _ = g.fwd(lon, lat, angle_degrees, distance_m)
+    new_lon, new_lat, _ = get_geod().fwd(lon, lat, angle_degrees, distance_m)
     return new_lat, new_lon
 
 
@@ -28,11 +80,12 @@ def money_format(money):
         return ""
 
 
+@profiled("nearest_city")
 def nearest_city(lat, lon, config):
     """Find the nearest City, ST, Distance, Direction from this point."""
 
     # Get city data
-    data = pd.read_csv(city_csv)
+    data = load_city_data()
 
     # Get search bounds
     corner_lat, corner_lon = move_lat_lon(lat, lon, config.min_town_distance_search, 45)
@@ -47,6 +100,7 @@ def nearest_city(lat, lon, config):
         & (data["lng"] <= lon + diff_lon)
     ]
 
+    g = get_geod()
     candidate_cities = []
     for _, row in subset.iterrows():
         forward_az, _, distance_m = g.inv(lon, lat, row["lng"], row["lat"])
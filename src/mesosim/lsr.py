@@ -8,13 +8,12 @@ LSR-specific helper functions
 """
 
 import textwrap
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
 from math import floor
 
 # Imports
-import pytz
-from dateutil import parser
-
-from .core.timing import cur_time_from_arc
+from .core.timing import cur_time_from_arc, format_time, parse_time, to_utc
 
 
 # Go from lsr `type` to gr_icon (also used to just keep our LSRs of interest)
@@ -62,7 +61,7 @@ End:""".format(
 def gr_lsr_text(lsr_tuple, wrap_length, tz):
     fields = [
         lsr_tuple[9],
-        parser.parse(lsr_tuple[10])
+        parse_time(lsr_tuple[10])
         .astimezone(tz)
         .strftime("%-I:%M %p"),
         lsr_tuple[0],
@@ -100,3 +99,66 @@ def scale_raw_lsr_to_cur_time(raw_tuple_list, timings):
             )
         )
     return scaled_tuple_list
+
+
+# Index of scaled lsr tuples by their cur valid time (element 10)
+class LSRTimeIndex:
+    """Answer "which reports are visible now" with bisect lookups.
+
+    Built from raw (archive time) lsr tuples; ``lsrs`` holds the same tuples as
+    ``scale_raw_lsr_to_cur_time`` would return, sorted by cur valid time. Archive times
+    are parsed once, so ``rebuild`` after a timing change only redoes the arithmetic.
+    """
+
+    def __init__(self, raw_tuple_list, timings):
+        raw_sorted = sorted(
+            ((parse_time(raw_tuple[10]), raw_tuple) for raw_tuple in raw_tuple_list),
+            key=lambda pair: pair[0],
+        )
+        self._arc_times = [arc_time for arc_time, _ in raw_sorted]
+        self._raw = [raw_tuple for _, raw_tuple in raw_sorted]
+        self._cursor = 0
+        self.rebuild(timings)
+
+    def rebuild(self, timings):
+        """Re-scale to new timings (order is preserved, so no re-sort is needed)."""
+        arc_start_time = parse_time(timings["arc_start_time"])
+        cur_start_time = parse_time(timings["cur_start_time"])
+        speed_factor = float(timings["speed_factor"])
+
+        self.timings = timings
+        self.keys = [
+            format_time(
+                cur_start_time
+                + timedelta(seconds=(arc_time - arc_start_time).total_seconds() / speed_factor)
+            )
+            for arc_time in self._arc_times
+        ]
+        # Released reports stay a prefix in the same order, so _cursor remains valid
+        self.lsrs = [raw[:10] + (key,) + raw[11:] for raw, key in zip(self._raw, self.keys)]
+
+    @staticmethod
+    def _key(time):
+        # Keys compare as strings, so normalize other spellings ("+00:00", no seconds)
+        return format_time(to_utc(time))
+
+    def __len__(self):
+        return len(self.lsrs)
+
+    def valid_between(self, t0, t1):
+        """Scaled lsr tuples valid in [t0, t1) (cur time, str or datetime)."""
+        start = bisect_left(self.keys, self._key(t0))
+        end = bisect_left(self.keys, self._key(t1))
+        return self.lsrs[start:end]
+
+    def visible_at(self, time):
+        """Scaled lsr tuples valid at or before the given cur time."""
+        return self.lsrs[: bisect_right(self.keys, self._key(time))]
+
+    def newly_visible(self, now):
+        """Scaled lsr tuples that became visible since the previous call."""
+        now = self._key(now)
+        end = bisect_right(self.keys, now)
+        new = self.lsrs[self._cursor : end]
+        self._cursor = max(self._cursor, end)
+        return new
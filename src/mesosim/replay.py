@@ -0,0 +1,114 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Precomputed replay timeline
+
+At a fixed ``speed_factor`` the cur-time release of every warning and lsr is known
+before the session starts. ``ReplayScheduler`` processes them all up front
+(``process_warning`` / ``scale_raw_lsr_to_cur_time``) and keeps them in a heap, so a poll
+only pops the events that have come due::
+
+    scheduler = ReplayScheduler.from_case_store(store, timings)
+    for event in scheduler.due():
+        ...
+
+or, from async code::
+
+    async for event in scheduler.stream():
+        ...
+"""
+
+# Imports
+import heapq
+from datetime import datetime, timezone
+
+from .core.timing import to_utc
+from .lsr import scale_raw_lsr_to_cur_time
+from .warning import process_warning
+
+
+class ReplayEvent:
+    """A warning or lsr released at a cur time."""
+
+    __slots__ = ("due", "kind", "payload")
+
+    def __init__(self, due, kind, payload):
+        self.due = due  # aware cur datetime
+        self.kind = kind  # "warning" or "lsr"
+        self.payload = payload  # ProcessedWarning or scaled lsr tuple
+
+    def __repr__(self):
+        return "ReplayEvent({!r}, {!r})".format(
+            self.due.strftime("%Y-%m-%dT%H:%M:%SZ"), self.kind
+        )
+
+
+def _utc_now():
+    return datetime.now(tz=timezone.utc)
+
+
+class ReplayScheduler:
+    """Time-ordered heap of precomputed replay events."""
+
+    def __init__(self, timings, clock=_utc_now):
+        self.timings = timings
+        self.clock = clock
+        self.last_poll = None
+        self._heap = []
+        self._sequence = 0
+
+    @classmethod
+    def from_case_store(cls, store, timings, start=None, end=None, **kwargs):
+        """Load every warning and lsr of a ``CaseStore`` (optionally an arc-time window)."""
+        scheduler = cls(timings, **kwargs)
+        scheduler.add_warnings(text for _, text in store.warnings(start, end))
+        scheduler.add_lsrs(store.lsrs(start, end))
+        return scheduler
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _push(self, due, kind, payload):
+        heapq.heappush(self._heap, (due, self._sequence, ReplayEvent(due, kind, payload)))
+        self._sequence += 1
+
+    def add_warnings(self, warning_texts):
+        """Process raw warning texts now and schedule them at their cur valid time."""
+        for text in warning_texts:
+            processed = process_warning(text, self.timings)
+            if processed is not None:
+                self._push(to_utc(processed.valid), "warning", processed)
+
+    def add_lsrs(self, raw_tuple_list):
+        """Scale raw lsr tuples now and schedule them at their cur valid time."""
+        for scaled in scale_raw_lsr_to_cur_time(list(raw_tuple_list), self.timings):
+            self._push(to_utc(scaled[10]), "lsr", scaled)
+
+    def next_due_time(self):
+        """Cur time of the next pending event (None when exhausted)."""
+        return self._heap[0][0] if self._heap else None
+
+    def due(self, now=None):
+        """Pop every event due at or before now (default: the clock), in time order."""
+        now = self.clock() if now is None else to_utc(now)
+        events = []
+        while self._heap and self._heap[0][0] <= now:
+            events.append(heapq.heappop(self._heap)[2])
+        self.last_poll = now
+        return events
+
+    def skip_until(self, cur_time):
+        """Drop events due at or before cur_time (e.g. resuming a session); returns count."""
+        return len(self.due(cur_time))
+
+    async def stream(self):
+        """Asynchronously yield events as they come due until the timeline is exhausted."""
+        import asyncio
+
+        while self._heap:
+            delay = (self._heap[0][0] - self.clock()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            for event in self.due():
+                yield event
@@ -0,0 +1,201 @@
+# Copyright (c) 2020 MesoSim Developers.
+# Distributed under the terms of the Apache 2.0 License.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Proximity scoring of team tracks against storm reports
+
+A team intercepts a report when some point of its track (``team_history``) is within
+``radius_miles`` of the report and within ``window_minutes`` of its valid time. Both use
+cur time, so pass scaled lsr tuples (``scale_raw_lsr_to_cur_time``)::
+
+    scorer = LSRScorer(scaled_lsrs, radius_miles=10, window_minutes=15)
+    results = scorer.score_teams(team_paths)
+
+Reports are bucketed by time window and by lat/lon cells about ``radius_miles`` on a
+side. Track points are grouped by bucket, and each group is compared, as one numpy
+haversine block, only against the reports in the neighboring buckets.
+"""
+
+# Imports
+from datetime import datetime, timezone
+from pathlib import Path
+from sqlite3 import dbapi2 as sql
+
+from .core.timing import epoch_seconds
+from .core.utils import earth_radius_miles, miles_per_degree_lat
+
+# Points per lsr type letter (see lsr.type_to_icon)
+default_points = {"T": 10, "C": 3, "H": 2, "D": 1}
+
+
+def _haversine_block(lats0, lons0, lats1, lons1):
+    """Pairwise great circle distances (miles), shape (len(lats0), len(lats1))."""
+    import numpy as np
+
+    lat0, lon0 = np.radians(lats0)[:, None], np.radians(lons0)[:, None]
+    lat1, lon1 = np.radians(lats1)[None, :], np.radians(lons1)[None, :]
+    a = (
+        np.sin((lat1 - lat0) / 2) ** 2
+        + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2
+    )
+    return 2 * earth_radius_miles * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def read_track(path):
+    """(epoch seconds, lats, lons) of a team's located team_history rows (read-only)."""
+    import numpy as np
+
+    con = sql.connect("file:{}?mode=ro".format(Path(path).as_posix()), uri=True)
+    try:
+        rows = con.execute(
+            "SELECT cur_timestamp, latitude, longitude FROM team_history "
+            "WHERE cur_timestamp IS NOT NULL AND latitude IS NOT NULL "
+            "AND longitude IS NOT NULL ORDER BY cur_timestamp"
+        ).fetchall()
+    finally:
+        con.close()
+    if not rows:
+        return np.empty(0), np.empty(0), np.empty(0)
+    times, lats, lons = zip(*rows)
+    # db_time_fmt; numpy parses the ISO part directly
+    seconds = np.array([time[:19] for time in times], dtype="datetime64[s]").astype(np.int64)
+    return seconds.astype(float), np.array(lats, dtype=float), np.array(lons, dtype=float)
+
+
+class LSRScorer:
+    """Score team tracks against a set of (cur time) lsr tuples.
+
+    Parameters
+    ----------
+    lsrs : list of tuple
+        Scaled lsr tuples (lat at 2, lon at 3, type letter at 8, cur valid time at 10).
+    radius_miles : float
+        Intercept distance.
+    window_minutes : float
+        Intercept time window either side of the report valid time.
+    points : dict
+        Points per lsr type letter; other types are ignored.
+    """
+
+    def __init__(self, lsrs, radius_miles=10.0, window_minutes=15.0, points=None):
+        import numpy as np
+
+        self.points = dict(default_points if points is None else points)
+        self.radius_miles = radius_miles
+        self.window_seconds = window_minutes * 60
+        self.lsrs = [lsr for lsr in lsrs if lsr[8] in self.points]
+
+        self.times = np.array([epoch_seconds(lsr[10]) for lsr in self.lsrs], dtype=float)
+        self.lats = np.array([lsr[2] for lsr in self.lsrs], dtype=float)
+        self.lons = np.array([lsr[3] for lsr in self.lsrs], dtype=float)
+        self.values = np.array([self.points[lsr[8]] for lsr in self.lsrs], dtype=np.int64)
+
+        # Cells at least radius_miles wide everywhere the reports are, so an intercept is
+        # always within one cell (and one time bin) of the point's own
+        max_lat = float(np.abs(self.lats).max()) if len(self.lsrs) else 0.0
+        self.lat_step = radius_miles / miles_per_degree_lat
+        self.lon_step = self.lat_step / max(np.cos(np.radians(min(max_lat + 1, 89.0))), 0.01)
+        buckets = {}
+        time_bins, rows, cols = self._keys(self.times, self.lats, self.lons)
+        for index, key in enumerate(zip(time_bins.tolist(), rows.tolist(), cols.tolist())):
+            buckets.setdefault(key, []).append(index)
+        self._buckets = {key: np.array(value) for key, value in buckets.items()}
+        self._neighbors = {}
+
+    def _keys(self, times, lats, lons):
+        import numpy as np
+
+        return (
+            np.floor(times / max(self.window_seconds, 1.0)).astype(np.int64),
+            np.floor(lats / self.lat_step).astype(np.int64),
+            np.floor(lons / self.lon_step).astype(np.int64),
+        )
+
+    def _candidates(self, key):
+        """Report indices in the 27 buckets around a bucket (cached)."""
+        import numpy as np
+
+        candidates = self._neighbors.get(key)
+        if candidates is None:
+            t, r, c = key
+            found = [
+                self._buckets[neighbor]
+                for neighbor in (
+                    (t + dt, r + dr, c + dc)
+                    for dt in (-1, 0, 1) for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                )
+                if neighbor in self._buckets
+            ]
+            candidates = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+            self._neighbors[key] = candidates
+        return candidates
+
+    def score_track(self, times, lats, lons):
+        """Intercepts of one track: {lsr index: (distance miles, track time)} closest pass."""
+        import numpy as np
+
+        times = np.asarray(times, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        intercepts = {}
+        if not len(times) or not self.lsrs:
+            return intercepts
+
+        keys = np.stack(self._keys(times, lats, lons), axis=1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(unique) + 1))
+        for group, key in enumerate(map(tuple, unique.tolist())):
+            candidates = self._candidates(key)
+            if not len(candidates):
+                continue
+            points = order[bounds[group] : bounds[group + 1]]
+            close_in_time = (
+                np.abs(times[points][:, None] - self.times[candidates][None, :])
+                <= self.window_seconds
+            )
+            if not close_in_time.any():
+                continue
+            distance = _haversine_block(
+                lats[points], lons[points], self.lats[candidates], self.lons[candidates]
+            )
+            distance = np.where(close_in_time, distance, np.inf)
+            best_point = np.argmin(distance, axis=0)
+            best = distance[best_point, np.arange(len(candidates))]
+            for column in np.nonzero(best <= self.radius_miles)[0]:
+                report = int(candidates[column])
+                found = (float(best[column]), float(times[points[best_point[column]]]))
+                if report not in intercepts or found[0] < intercepts[report][0]:
+                    intercepts[report] = found
+        return intercepts
+
+    def result(self, intercepts):
+        """Points and intercept list (ordered by report time) from ``score_track``."""
+        listing = [
+            {
+                "lsr": self.lsrs[report],
+                "points": int(self.values[report]),
+                "distance_miles": distance,
+                "time": datetime.fromtimestamp(time, tz=timezone.utc),
+            }
+            for report, (distance, time) in sorted(
+                intercepts.items(), key=lambda item: (self.times[item[0]], item[0])
+            )
+        ]
+        return {"points": sum(item["points"] for item in listing), "intercepts": listing}
+
+    def score_teams(self, team_paths):
+        """{path: {"points": int, "intercepts": [...]}} for each team database.
+
+        A team whose track cannot be read gets {"error": message} instead.
+        """
+        results = {}
+        for path in team_paths:
+            try:
+                track = read_track(path)
+            except (sql.Error, ValueError) as exc:
+                results[str(path)] = {"error": "{}: {}".format(type(exc).__name__, exc)}
+                continue
+            results[str(path)] = self.result(self.score_track(*track))
+        return results
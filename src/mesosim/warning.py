@@ -6,25 +6,35 @@ Warning-related helper functions
 """
 
 import re
+from bisect import bisect_right
 
 # Imports
 import pytz
 from dateutil import parser, tz
 
-from .core.timing import cur_time_from_arc
+from .core.profiling import profiled
+from .core.timing import cur_time_from_arc, format_time, parse_time, vtec_time_fmt
+
+vtec_pattern = re.compile(
+    r"/(?P<status>[OTEX])\.(?P<action>[A-Z]{3})\.(?P<office>[A-Z]{4})\."
+    r"(?P<phenomena>[A-Z]{2})\.(?P<significance>[A-Z])\.(?P<etn>[0-9]{4})\."
+    r"(?P<begin>[0-9]{6}T[0-9]{4}Z)-(?P<end>[0-9]{6}T[0-9]{4}Z)/"
+)
+polygon_pattern = re.compile(r"LAT\.\.\.LON(?P<coords>(?:\s+[0-9]{4,5})+)")
 
 
 # Process the warning text (heavy lifiting!)
+@profiled("process_warning_text")
 def process_warning_text(warning, timings):
 
     # Get the references
-    cur_start_time = parser.parse(timings["cur_start_time"])
+    cur_start_time = parse_time(timings["cur_start_time"])
 
     # Now that we have that, process piece by piece!
 
     # Now let's try the %y%m%dT%H%MZ formated times
-    # Note: parser.parse('160522T2322Z', yearfirst=True) parses out the warning
-    # start/end times to datetime objects
+    # Note: parse_time('160522T2322Z') parses out the warning start/end times to
+    # datetime objects
 
     matches = list(
         re.finditer(
@@ -34,10 +44,17 @@ def process_warning_text(warning, timings):
     )
     offset = 0
     try:
+        # The VTEC begin and end (None if open-ended: 000000T0000Z stays as it is)
+        warning_arc_time = _parse_vtec_time(matches[0].group("timestamp"))
+        warning_arc_end_time = _parse_vtec_time(matches[1].group("timestamp"))
+        issued_cur_time = None
+
         for match in matches:
-            new_timestamp = cur_time_from_arc(
-                parser.parse(match.group("timestamp"), yearfirst=True), timings
-            ).strftime("%y%m%dT%H%MZ")
+            if match.group("timestamp").startswith("000000"):
+                continue
+            new_timestamp = format_time(
+                cur_time_from_arc(parse_time(match.group("timestamp")), timings), vtec_time_fmt
+            )
             text_growth = len(new_timestamp) - len(match.group("timestamp"))
 
             warning = (
@@ -47,20 +64,13 @@ def process_warning_text(warning, timings):
             )
             offset += text_growth
 
-        # Also, since we need it later, get the starting timestamp in our standard
-        # format
-        warning_arc_time = parser.parse(matches[0].group("timestamp"), yearfirst=True)
-        warning_arc_end_time = parser.parse(matches[1].group("timestamp"), yearfirst=True)
-
         # Replace the %d%H%M strings for start and end
-        warning = warning.replace(
-            warning_arc_time.strftime("%d%H%M"),
-            cur_time_from_arc(warning_arc_time, timings).strftime("%d%H%M"),
-        )
-        warning = warning.replace(
-            warning_arc_end_time.strftime("%d%H%M"),
-            cur_time_from_arc(warning_arc_end_time, timings).strftime("%d%H%M"),
-        )
+        for arc_time in (warning_arc_time, warning_arc_end_time):
+            if arc_time is not None:
+                warning = warning.replace(
+                    arc_time.strftime("%d%H%M"),
+                    cur_time_from_arc(arc_time, timings).strftime("%d%H%M"),
+                )
 
         # Clean out the double time zone strings
         matches = list(
@@ -99,7 +109,7 @@ def process_warning_text(warning, timings):
                 "{}-{}-{}T{}:{}{}".format(year, month, day, hour, minute, zone)
             )
             arc_utc_time = arc_local_time.astimezone(pytz.UTC)
-            cur_utc_time = cur_time_from_arc(arc_utc_time, timings)
+            cur_utc_time = issued_cur_time = cur_time_from_arc(arc_utc_time, timings)
             cur_local_time = cur_utc_time.astimezone(tz.tzoffset(None, tz_zone_offset))
 
             str_to_swap = []
@@ -155,8 +165,178 @@ def process_warning_text(warning, timings):
                 offset += text_growth
 
         # All done with the processing! Return the processed text and the valid
-        # cur time
+        # cur time (the issuance time for a product already in effect)
+        if warning_arc_time is None:
+            if issued_cur_time is None:
+                raise ValueError("No begin or issuance time")
+            return warning, issued_cur_time
         return warning, cur_time_from_arc(warning_arc_time, timings)
     except:
         print("ERROR in processing warning...return null result")
         return "", cur_start_time 
+
+
+# Parse a VTEC %y%m%dT%H%MZ time (None for 000000T0000Z: "already in effect" as a begin,
+# "until further notice" as an end)
+def _parse_vtec_time(timestamp):
+    if timestamp.startswith("000000"):
+        return None
+    return parse_time(timestamp)
+
+
+def parse_vtec(warning):
+    """Return the first P-VTEC string of the warning as a dict (or None)."""
+    match = vtec_pattern.search(warning)
+    if match is None:
+        return None
+    vtec = match.groupdict()
+    vtec["begin"] = _parse_vtec_time(vtec["begin"])
+    vtec["end"] = _parse_vtec_time(vtec["end"])
+    return vtec
+
+
+def parse_polygon(warning):
+    """Return the LAT...LON polygon of the warning as a list of (lat, lon) vertices."""
+    match = polygon_pattern.search(warning)
+    if match is None:
+        return []
+    coords = match.group("coords").split()
+    return [
+        (int(lat) / 100, -int(lon) / 100) for lat, lon in zip(coords[0::2], coords[1::2])
+    ]
+
+
+class ProcessedWarning:
+    """A warning rewritten to cur time, with its VTEC window and polygon."""
+
+    __slots__ = ("text", "valid", "expire", "polygon", "vtec")
+
+    def __init__(self, text, valid, expire, polygon, vtec=None):
+        self.text = text
+        self.valid = valid  # cur datetime
+        self.expire = expire  # cur datetime
+        self.polygon = polygon  # [(lat, lon), ...]
+        self.vtec = vtec
+
+    @property
+    def event_id(self):
+        if self.vtec is None:
+            return None
+        return "{office}.{phenomena}.{significance}.{etn}".format(**self.vtec)
+
+    def is_active(self, cur_time):
+        return self.valid <= cur_time < self.expire
+
+
+def process_warning(warning, timings):
+    """Process the warning text and extract its geometry and cur-time valid window."""
+    text, valid = process_warning_text(warning, timings)
+    if not text:
+        return None
+
+    # The text is already rewritten to cur time, so VTEC times need no scaling
+    vtec = parse_vtec(text)
+    if vtec is not None and vtec["end"] is not None:
+        expire = vtec["end"]
+        if vtec["begin"] is not None:
+            valid = vtec["begin"]
+    else:
+        expire = valid
+    return ProcessedWarning(text, valid, expire, parse_polygon(text), vtec)
+
+
+class WarningIndex:
+    """Interval index of processed warnings by cur valid/expire time.
+
+    Warnings are kept sorted by valid time; "active at t" bisects on the valid times and
+    only looks back as far as the longest warning duration.
+    """
+
+    def __init__(self, warnings=()):
+        self._entries = []  # (valid, sequence, warning)
+        self._valid_times = []
+        self._max_duration = None
+        self.extend(warnings)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _note_duration(self, warning):
+        duration = warning.expire - warning.valid
+        if self._max_duration is None or duration > self._max_duration:
+            self._max_duration = duration
+
+    def add(self, warning):
+        # After any equal valid times, matching the insertion-order tie break
+        position = bisect_right(self._valid_times, warning.valid)
+        self._entries.insert(position, (warning.valid, len(self._entries), warning))
+        self._valid_times.insert(position, warning.valid)
+        self._note_duration(warning)
+
+    def extend(self, warnings):
+        """Add many warnings with one sort."""
+        for warning in warnings:
+            self._entries.append((warning.valid, len(self._entries), warning))
+            self._note_duration(warning)
+        self._entries.sort(key=lambda entry: entry[:2])
+        self._valid_times = [entry[0] for entry in self._entries]
+
+    def active_at(self, cur_time):
+        """Warnings with valid <= cur_time < expire."""
+        if not self._entries:
+            return []
+        end = bisect_right(self._valid_times, cur_time)
+        start = bisect_right(self._valid_times, cur_time - self._max_duration)
+        return [
+            warning
+            for _, _, warning in self._entries[start:end]
+            if warning.is_active(cur_time)
+        ]
+
+    def teams_inside(self, positions, cur_time):
+        """Map team id to the active warnings containing it (positions: id -> (lat, lon))."""
+        active = [warning for warning in self.active_at(cur_time) if warning.polygon]
+        team_ids = list(positions)
+        result = {team_id: [] for team_id in team_ids}
+        if not active or not team_ids:
+            return result
+        inside = points_in_polygons(
+            [positions[team_id][0] for team_id in team_ids],
+            [positions[team_id][1] for team_id in team_ids],
+            [warning.polygon for warning in active],
+        )
+        for i, j in zip(*inside.nonzero()):
+            result[team_ids[i]].append(active[j])
+        return result
+
+
+def points_in_polygons(lats, lons, polygons):
+    """Test every point against every polygon in one vectorized even-odd pass.
+
+    Polygons are sequences of (lat, lon) vertices (at least three each). Returns a boolean
+    array of shape (n_points, n_polygons).
+    """
+    import numpy as np
+
+    lats = np.asarray(lats, dtype=float).reshape(-1, 1)
+    lons = np.asarray(lons, dtype=float).reshape(-1, 1)
+
+    if not polygons:
+        return np.zeros((lats.shape[0], 0), dtype=bool)
+
+    # Stack the edges of all polygons (closing each ring) and remember where each starts
+    vertex_arrays = [np.asarray(polygon, dtype=float).reshape(-1, 2) for polygon in polygons]
+    first_edge = np.cumsum([0] + [len(vertices) for vertices in vertex_arrays[:-1]])
+    starts = np.concatenate(vertex_arrays)
+    ends = np.concatenate([np.roll(vertices, -1, axis=0) for vertices in vertex_arrays])
+    lat1, lon1 = starts[:, 0], starts[:, 1]
+    lat2, lon2 = ends[:, 0], ends[:, 1]
+
+    # Does a ray running east from each point cross each edge? -> (n_points, n_edges)
+    straddles = (lat1 > lats) != (lat2 > lats)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_lon = lon1 + (lats - lat1) * (lon2 - lon1) / (lat2 - lat1)
+    crosses = straddles & (lons < crossing_lon)
+
+    counts = np.add.reduceat(crosses.astype(np.int32), first_edge, axis=1)
+    return (counts % 2).astype(bool)
@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+
+from mesosim.core.schema import migrate as migrate_db
+
+chase_schema = """
+CREATE TABLE config (config_setting TEXT, config_value TEXT);
+CREATE TABLE hazard_config (hazard_setting TEXT, hazard_value TEXT);
+CREATE TABLE vehicles (
+    vehicle_type TEXT, print_name TEXT, top_speed REAL, top_speed_on_dirt REAL,
+    efficient_speed REAL, mpg REAL, fuel_cap REAL, stuck_probability REAL,
+    traction_rating TEXT
+);
+CREATE TABLE team_info (team_setting TEXT, team_value TEXT);
+CREATE TABLE action_queue (
+    action_id INTEGER PRIMARY KEY, message TEXT, action_type TEXT, action_amount TEXT,
+    action_taken TEXT
+);
+CREATE TABLE hazard_queue (
+    hazard_type TEXT, expiry_time TEXT, message TEXT, message_end TEXT,
+    overridden_by TEXT, speed_limit TEXT, direction_lock TEXT, speed_lock TEXT, status TEXT
+);
+CREATE TABLE team_history (
+    cur_timestamp TEXT, arc_timestamp TEXT, latitude REAL, longitude REAL, speed REAL,
+    direction REAL, status_color TEXT, status_text TEXT, balance REAL, points INTEGER,
+    fuel_level REAL
+);
+"""
+
+config_values = {
+    "speed_factor": "4",
+    "cur_start_time": "2022-03-30T17:00:00Z",
+    "arc_start_time": "2021-07-10T03:00:00Z",
+    "speed_limit": "65",
+    "min_town_distance_search": "30",
+    "min_town_distance_refuel": "5",
+    "min_town_population": "1000",
+}
+
+hazard_config_values = {
+    "active_hazards": '["speeding", "dirt_road", "stuck_in_mud", "cc", "flat_tire"]',
+    "speeding_max_chance": "0.1",
+    "speeding_ticket_amt": "150",
+    "dirt_road_prob": "0.01",
+    "cc_prob": "0.01",
+    "pay_for_flat_prob": "0.5",
+    "pay_for_flat_amt": "100",
+    "flat_tire_prob": "0.001",
+    "dead_end_prob": "0.001",
+    "flooded_road_prob": "0.001",
+}
+
+team_values = {
+    "id": "team1",
+    "name": "Team One",
+    "vehicle": "sedan",
+    "latitude": "41.5",
+    "longitude": "-97.5",
+    "speed": "60",
+    "direction": "90",
+    "fuel_level": "10",
+    "balance": "500",
+    "points": "0",
+    "status_color": "green",
+    "status_text": "Chase On",
+}
+
+
+def make_chase_db(path, team=None, migrate=True):
+    """Create a combined config + team database for tests (legacy schema if not migrate)."""
+    con = sqlite3.connect(path)
+    con.executescript(chase_schema)
+    con.executemany("INSERT INTO config VALUES (?,?)", config_values.items())
+    con.executemany("INSERT INTO hazard_config VALUES (?,?)", hazard_config_values.items())
+    con.execute(
+        "INSERT INTO vehicles VALUES ('sedan', 'Sedan', 120, 40, 60, 35, 14, 0.01, 'low')"
+    )
+    con.executemany(
+        "INSERT INTO team_info VALUES (?,?)", dict(team_values, **(team or {})).items()
+    )
+    con.commit()
+    con.close()
+    if migrate:
+        migrate_db(path)
+    return path
+
+
+@pytest.fixture
+def chase_db(tmp_path):
+    return make_chase_db(str(tmp_path / "chase.db"))
+
+
+@pytest.fixture
+def config(chase_db):
+    from mesosim.core.config import Config
+
+    return Config(chase_db)
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from mesosim.chase.actions import ActiveHazard, HazardSpec, create_hazard_registry
+from mesosim.chase.team import Team
+
+
+def test_hazard_specs_are_shared_and_immutable(config):
+    registry = create_hazard_registry(config)
+    spec = registry["flat_tire"]
+    with pytest.raises(AttributeError):
+        spec.expiry_time = None
+
+    first, second = spec.activate(action_id=1), spec.activate(action_id=2)
+    assert isinstance(first, ActiveHazard)
+    assert first.spec is second.spec is spec
+    assert (first.action_id, second.action_id) == (1, 2)
+
+
+def test_active_hazards_round_trip_through_team_db(chase_db, config):
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    active = team.apply_hazard(registry["cc"])
+    assert team.status_text == "Chaser Convergence"
+    team.write_status()
+
+    reloaded = Team(chase_db, registry, config)
+    assert [hazard.type for hazard in reloaded.active_hazards] == ["cc"]
+    assert reloaded.active_hazards[0].to_hazard_tuple()[:5] == active.to_hazard_tuple()[:5]
+    assert reloaded.active_hazards[0].speed_limit == float(active.speed_limit)
+    assert reloaded.active_hazards[0].spec is registry["cc"]
+    assert isinstance(registry["cc"], HazardSpec)
+
+
+def test_partial_expiry_restores_status_of_remaining_hazards(chase_db, config):
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    start = datetime(2022, 3, 30, 18, tzinfo=timezone.utc)
+    team.apply_hazard(registry["dirt_road"].activate(now=start))  # 2 minutes
+    cc = registry["cc"].activate(now=start)
+    cc.expiry_time = start + timedelta(minutes=1)
+    team.apply_hazard(cc)
+    assert team.status_text == "Chaser Convergence" and team.status["hazard_max_speed"]
+
+    messages = team.expire_hazards(start + timedelta(seconds=90))
+    assert messages[0].endswith("The chaser convergence has cleared.")
+    assert [hazard.type for hazard in team.active_hazards] == ["dirt_road"]
+    assert team.status_text == "On a dirt road" and team.status_color == "yellow"
+    assert team.status["hazard_max_speed"] is None
+    assert team.balance == 500.0
+
+    assert team.expire_hazards(start + timedelta(minutes=5))
+    assert team.active_hazards == [] and team.status_text == "Chase On"
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from mesosim.archive import CaseStore
+
+warnings_json = Path(__file__).parent / "testfiles" / "svroax_202107100300Z.json"
+
+# A warning spanning 40-44N, 95-100W (centroid bucket far from its corners)
+wide_warning = "SVRTST\n\nLAT...LON 4000 10000 4000 9500 4400 9500 4400 10000\n"
+
+
+def lsr(lat, lon, valid):
+    return ("AMES", "STORY", lat, lon, "1.00", "", "PUBLIC", "IA", "H", "HAIL", valid, "")
+
+
+def test_ingest_and_time_queries(tmp_path):
+    store = CaseStore(str(tmp_path / "case.db"))
+    assert store.ingest_warning_json(warnings_json) == 4
+    assert store.ingest_warning_json(warnings_json) == 0  # deduplicated
+    assert store.ingest_lsrs([lsr(42.0, -97.4, "2021-07-10T03:20:00Z")]) == 1
+
+    first, last = store.time_range()
+    assert first.isoformat() == "2021-07-10T03:12:00+00:00"
+    assert len(store.warnings()) == 4
+    assert store.warnings(start="2021-07-10T05:00:00Z") == []
+    assert store.lsrs(start="2021-07-10T03:20:00Z", end="2021-07-10T03:21:00Z")[0][2] == 42.0
+    assert store.lsrs(end="2021-07-10T03:20:00Z") == []
+    store.close()
+
+
+def test_bbox_matches_any_overlap(tmp_path):
+    store = CaseStore(str(tmp_path / "case.db"))
+    store.add_warning(wide_warning, "2021-07-10T03:00:00Z", product_type="SVR")
+    store.add_lsr(lsr(42.0, -97.4, "2021-07-10T03:00:00Z"))
+    store.con.commit()
+
+    # A corner of the warning, several buckets from its centroid
+    assert len(store.warnings(bbox=(40.1, -99.9, 40.2, -99.8))) == 1
+    assert store.lsrs(bbox=(40.1, -99.9, 40.2, -99.8)) == []
+    assert len(store.lsrs(bbox=(41.9, -97.5, 42.1, -97.3))) == 1
+    assert store.warnings(bbox=(45.1, -99.9, 45.2, -99.8)) == []
+    store.close()
+
+    # Reopening keeps the widest span for the lower bound of the bucket query
+    store = CaseStore(str(tmp_path / "case.db"))
+    assert store.max_bucket_span == 5
+    assert len(store.warnings(bbox=(43.9, -95.2, 44.5, -94.0))) == 1
+    store.close()
@@ -0,0 +1,68 @@
+import random
+import sqlite3
+
+from conftest import make_chase_db
+from mesosim.chase.actions import create_hazard_registry
+from mesosim.chase.arrivals import HazardArrivals
+from mesosim.chase.team import Team
+from mesosim.core.config import Config
+
+
+class CountingConfig(Config):
+    version_reads = 0
+
+    @property
+    def data_version(self):
+        self.version_reads += 1
+        return super().data_version
+
+
+def test_hazard_arrivals_catch_up_and_redraw(chase_db, config):
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    flat_tire = {"flat_tire": registry["flat_tire"]}  # constant 0.001 per minute
+
+    # One hour-long gap: chance of a hazard is 1 - exp(-0.06), not 0.06 * rolls
+    arrivals = HazardArrivals(rng=random.Random(0))
+    hits = 0
+    for _ in range(4000):
+        arrivals.forget(team)
+        hits += arrivals.advance(team, 3600, flat_tire, config) is not None
+    assert abs(hits / 4000 - 0.0582) < 0.015
+
+    # No hazard due: rates are not recomputed between ticks
+    arrivals.forget(team)
+    arrivals.advance(team, 1, registry, config)
+    state = arrivals._teams[team.path]
+    rates = state.rates
+    arrivals.advance(team, 1, registry, config)
+    assert state.rates is rates
+    team.speed = 5.0  # an input changed
+    arrivals.advance(team, 1, registry, config)
+    assert state.rates is not rates
+
+
+def test_config_version_is_read_once_per_batch(tmp_path):
+    paths = [make_chase_db(str(tmp_path / "team{}.db".format(i))) for i in range(5)]
+    config = CountingConfig(paths[0])
+    registry = create_hazard_registry(config)
+    teams = [Team(path, registry, config) for path in paths]
+
+    arrivals = HazardArrivals(rng=random.Random(0), version_check_seconds=3600)
+    for team in teams:
+        arrivals.advance(team, 10, registry, config)
+    assert config.version_reads == 1
+
+    # Once the cached version is stale, a commit from another connection is seen
+    arrivals.version_check_seconds = 0.0
+    states = [arrivals._teams[team.path] for team in teams]
+    rates = [state.rates for state in states]
+    con = sqlite3.connect(paths[0])
+    con.execute(
+        "UPDATE hazard_config SET hazard_value = '0.5' WHERE hazard_setting = 'cc_prob'"
+    )
+    con.commit()
+    con.close()
+    for team in teams:
+        arrivals.advance(team, 10, registry, config)
+    assert all(state.rates is not old for state, old in zip(states, rates))
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+
+from mesosim.chase.actions import create_hazard_registry
+from mesosim.chase.expiry import ExpiryQueue
+from mesosim.chase.team import Team
+
+
+def test_expiry_queue_expires_due_hazards_in_batches(chase_db, config):
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    start = datetime(2022, 3, 30, 18, tzinfo=timezone.utc)
+    dirt = team.apply_hazard(registry["dirt_road"].activate(now=start))  # 2 minutes
+    flat = team.apply_hazard(registry["flat_tire"].activate(now=start))  # 3+ minutes
+
+    expiry = ExpiryQueue()
+    expiry.track(team)
+    expiry.track(team)  # idempotent
+    assert len(expiry) == 2 and expiry.next_expiry() == dirt.expiry_time
+
+    batches = []
+    assert expiry.expire(now=start + timedelta(minutes=1)) == {}
+    expiry.expire(now=dirt.expiry_time, callback=lambda *batch: batches.append(batch))
+    assert team.active_hazards == [flat]
+    assert team.status_text == "Flat Tire!"  # from the remaining hazard, not the dirt road
+    assert len(batches) == 1 and batches[0][1] == [dirt]
+    assert batches[0][2][0].endswith("You are back on pavement.")
+
+    # Hazards cleared elsewhere are dropped when their entry comes due
+    team.clear_active_hazards()
+    assert expiry.expire(now=start + timedelta(hours=1)) == {}
+    assert len(expiry) == 0 and team.status_text == "Chase On"
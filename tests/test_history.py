@@ -0,0 +1,174 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import make_chase_db
+from mesosim.chase.export import export_team_history, load_team_history
+
+
+def add_history(path, rows):
+    con = sqlite3.connect(path)
+    con.executemany(
+        "INSERT INTO team_history (cur_timestamp, arc_timestamp, latitude, longitude, speed, "
+        "direction, status_color, status_text, balance, points, fuel_level) "
+        "VALUES (?,?,?,?,60,90,?,?,500,?,10)",
+        rows,
+    )
+    con.commit()
+    con.close()
+
+
+def test_export_team_history_npz(tmp_path):
+    paths = []
+    for n, status in enumerate(["green", "red"]):
+        path = str(tmp_path / "team{}.db".format(n))
+        make_chase_db(path, team={"id": "team{}".format(n)})
+        add_history(
+            path,
+            [
+                ("2022-03-30T17:0{}:00Z".format(i), "2021-07-10T03:0{}:00Z".format(i),
+                 41.5, -97.5 + i / 10, status, "Chase On", None if i == 0 else i)
+                for i in range(3)
+            ],
+        )
+        paths.append(path)
+
+    out, n_rows = export_team_history(
+        paths, tmp_path / "debrief", chunk_rows=2, file_format="npz"
+    )
+    assert out.suffix == ".npz" and n_rows == 6
+
+    frame = load_team_history(out)
+    assert list(frame["team"]) == ["team0"] * 3 + ["team1"] * 3
+    assert list(frame["status_color"].cat.categories) == ["green", "red"]
+    assert frame["cur_timestamp"].iloc[1] == np.datetime64("2022-03-30T17:01:00")
+    assert list(frame["points"]) == [0, 1, 2] * 2
+
+
+def test_history_index_interpolates_and_refreshes(tmp_path):
+    from mesosim.chase.history import HistoryIndex
+
+    paths = []
+    for n in range(2):
+        path = str(tmp_path / "team{}.db".format(n))
+        make_chase_db(path)
+        add_history(
+            path,
+            [
+                ("2022-03-30T17:0{}:00Z".format(i), "2021-07-10T03:0{}:00Z".format(2 * i),
+                 41.0 + n, -97.0 + i, "green", "Chase On", 0)
+                for i in range(2)
+            ],
+        )
+        paths.append(path)
+    index = HistoryIndex(paths)
+
+    lats, lons = index.positions_at("2021-07-10T03:01:00Z")
+    assert np.allclose(lats, [41.0, 42.0]) and np.allclose(lons, [-96.5, -96.5])
+    lats, lons = index.positions_at("2022-03-30T17:00:30Z", clock="cur", method="geodesic")
+    assert np.allclose(lons, -96.5, atol=0.01) and lats[0] > 41.0
+
+    # Outside a team's history gives NaN; the last row itself is still found
+    lats, _ = index.track(paths[0], ["2021-07-10T02:59:00Z", "2021-07-10T03:02:00Z",
+                                     "2021-07-10T03:03:00Z"])
+    assert np.isnan(lats[0]) and lats[1] == 41.0 and np.isnan(lats[2])
+
+    add_history(paths[1], [("2022-03-30T17:02:00Z", "2021-07-10T03:04:00Z", 42.0, -95.0,
+                            "green", "Chase On", 0)])
+    assert index.refresh() == 1
+    lats, lons = index.positions_at("2021-07-10T03:03:00Z")
+    assert np.isnan(lons[0]) and np.isclose(lons[1], -95.5)
+
+
+def _track_error_miles(lats, lons, keep):
+    """Largest distance (miles) of any point from the simplified polyline through keep."""
+    y = np.asarray(lats) * 69.05
+    x = np.asarray(lons) * 69.05 * np.cos(np.radians(np.mean(lats)))
+    kept = np.nonzero(keep)[0]
+    worst = 0.0
+    for first, last in zip(kept[:-1], kept[1:]):
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first : last + 1] - x[first], y[first : last + 1] - y[first]
+        worst = max(worst, float(np.max(np.abs(dx * py - dy * px) / np.hypot(dx, dy))))
+    return worst
+
+
+def test_douglas_peucker_keeps_endpoints_within_tolerance():
+    from mesosim.chase.history import douglas_peucker
+
+    rng = np.random.default_rng(3)
+    lats = 41.0 + np.linspace(0, 0.5, 200) + rng.normal(0, 0.001, 200)
+    lons = -97.0 + np.linspace(0, 0.3, 200) ** 2
+    keep = douglas_peucker(lats, lons, 0.1)
+    assert keep[0] and keep[-1]
+    assert 2 < keep.sum() < 200
+    assert _track_error_miles(lats, lons, keep) <= 0.1
+    assert list(douglas_peucker([41.0, 41.1], [-97.0, -97.0], 0.1)) == [True, True]
+
+
+def test_compact_team_history(tmp_path):
+    from datetime import datetime, timezone
+
+    from mesosim.chase.history import compact_team_history
+
+    path = make_chase_db(str(tmp_path / "team.db"))
+    # An hour of a slightly wiggling eastbound track, one row per minute; one status change
+    rows = [
+        ("2022-03-30T17:{:02d}:00Z".format(i), "2021-07-10T03:{:02d}:00Z".format(i),
+         41.5 + 0.001 * (i % 2), -97.5 + i / 60, "red" if i == 20 else "green",
+         "Chase On", 0)
+        for i in range(60)
+    ]
+    add_history(path, rows)
+    now = datetime(2022, 3, 30, 18, 0, tzinfo=timezone.utc)
+
+    counts = compact_team_history(path, keep_minutes=15, tolerance_miles=0.1, now=now)
+    assert counts["examined"] == 45 and counts["deleted"] > 0
+
+    con = sqlite3.connect(path)
+    kept = con.execute(
+        "SELECT cur_timestamp, latitude, longitude FROM team_history ORDER BY cur_timestamp"
+    ).fetchall()
+    con.close()
+    times = [row[0] for row in kept]
+    # Endpoints, the status change (and its recovery) and the recent window all remain
+    assert times[0] == rows[0][0] and times[-1] == rows[-1][0]
+    assert {rows[20][0], rows[21][0]} <= set(times)
+    assert [row[0] for row in rows[45:]] == times[-15:]
+    # Every original point lies within tolerance of the compacted track
+    keep = np.isin([row[0] for row in rows], times)
+    lats, lons = [row[2] for row in rows], [row[3] for row in rows]
+    assert _track_error_miles(lats, lons, keep) <= 0.1
+
+    # A second run at the same time finds nothing new to do
+    again = compact_team_history(path, keep_minutes=15, tolerance_miles=0.1, now=now)
+    assert again["deleted"] == 0
+    con = sqlite3.connect(path)
+    assert con.execute("SELECT COUNT(*) FROM team_history").fetchone()[0] == len(kept)
+    con.close()
+
+
+def test_export_team_history_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    empty = make_chase_db(str(tmp_path / "empty.db"), team={"id": "empty"})
+    out, n_rows = export_team_history(
+        [empty], tmp_path / "none.parquet", file_format="parquet"
+    )
+    assert n_rows == 0 and out.exists()
+    frame = load_team_history(out)
+    assert len(frame) == 0 and list(frame.columns)[:2] == ["team", "cur_timestamp"]
+
+    path = make_chase_db(str(tmp_path / "team.db"), team={"id": "team1"})
+    add_history(path, [
+        ("2022-03-30T17:0{}:00Z".format(i), "2021-07-10T03:0{}:00Z".format(i), 41.5, -97.5,
+         "green", "Chase On", i)
+        for i in range(3)
+    ])
+    out, n_rows = export_team_history(
+        [path, empty], tmp_path / "debrief.parquet", chunk_rows=2, file_format="parquet"
+    )
+    frame = load_team_history(out)
+    assert n_rows == 3 and list(frame["team"]) == ["team1"] * 3
+    assert list(frame["points"]) == [0, 1, 2]
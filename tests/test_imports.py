@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Generous enough for slow CI machines, far below the cost of importing pandas/pyproj
+import_budget_seconds = 0.25
+
+heavy_modules = ("pandas", "pyproj", "numpy", "pytz", "dateutil")
+
+script = """
+import sys
+import time
+start = time.perf_counter()
+import mesosim.chase.team
+print(time.perf_counter() - start)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+@pytest.fixture(scope="module")
+def cold_import():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    env.pop("MESOSIM_PROFILE", None)
+    timings = []
+    for _ in range(3):
+        output = subprocess.run(
+            [sys.executable, "-c", script.format(heavy=heavy_modules)],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.splitlines()
+        timings.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else ""
+    return min(timings), loaded
+
+
+def test_team_import_skips_heavy_dependencies(cold_import):
+    _, loaded = cold_import
+    assert loaded == ""
+
+
+def test_team_import_within_budget(cold_import):
+    elapsed, _ = cold_import
+    assert elapsed < import_budget_seconds
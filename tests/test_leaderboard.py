@@ -0,0 +1,67 @@
+import sqlite3
+
+from conftest import make_chase_db
+from mesosim.chase import leaderboard
+from mesosim.chase.leaderboard import Leaderboard
+
+
+def set_scores(path, points, balance):
+    con = sqlite3.connect(path)
+    con.executemany(
+        "UPDATE team_info SET team_value = ? WHERE team_setting = ?",
+        [(str(points), "points"), (str(balance), "balance")],
+    )
+    con.commit()
+    con.close()
+
+
+def make_teams(tmp_path, scores):
+    paths = []
+    for n, (points, balance) in enumerate(scores):
+        path = make_chase_db(str(tmp_path / "team{}.db".format(n)), team={"id": str(n)})
+        set_scores(path, points, balance)
+        paths.append(path)
+    return paths
+
+
+def test_standings_rank_by_points_then_balance(tmp_path):
+    paths = make_teams(tmp_path, [(5, 100), (7, 50), (5, 300)])
+    with Leaderboard(paths, max_workers=2) as board:
+        standings = board.standings()
+    assert [(row["id"], row["rank"]) for row in standings] == [("1", 1), ("2", 2), ("0", 3)]
+    assert standings[0]["points"] == 7 and standings[0]["balance"] == 50.0
+
+
+def test_refresh_rereads_only_changed_teams(tmp_path, monkeypatch):
+    paths = make_teams(tmp_path, [(1, 100), (2, 100)])
+    reads = []
+    query = leaderboard._query_scores
+
+    def counting_query(con, path, keys):
+        reads.append(path)
+        return query(con, path, keys)
+
+    monkeypatch.setattr(leaderboard, "_query_scores", counting_query)
+    with Leaderboard(paths, max_workers=2) as board:
+        board.refresh()
+        assert sorted(reads) == sorted(paths)
+
+        reads.clear()
+        assert board.refresh()[paths[0]]["points"] == 1
+        assert reads == []
+
+        set_scores(paths[0], 9, 100)  # a WAL commit by another connection
+        assert board.refresh()[paths[0]]["points"] == 9
+        assert reads == [paths[0]]
+        assert board.standings()[0]["path"] == paths[0]
+
+
+def test_unreadable_team_is_skipped(tmp_path):
+    paths = make_teams(tmp_path, [(1, 100)]) + [str(tmp_path / "missing.db")]
+    with Leaderboard(paths, max_workers=2) as board:
+        scores = board.refresh()
+        assert "error" in scores[paths[1]]
+        assert [row["path"] for row in board.standings()] == [paths[0]]
+
+        make_chase_db(paths[1])  # retried on the next refresh
+        assert len(board.standings()) == 2
@@ -0,0 +1,24 @@
+import sqlite3
+
+from mesosim.chase.loadtest import provision, run_load
+from mesosim.core import utils
+
+
+def test_two_team_smoke_run(tmp_path):
+    city_csv_before = utils.city_csv
+    config_path, team_paths, city_csv = provision(tmp_path, 2, seed=1)
+    report = run_load(
+        config_path, team_paths, city_csv, duration=2.0, poll_rate=10.0, action_rate=2.0,
+        tick_rate=4.0, workers=2, seed=1, result_timeout=10.0,
+    )
+
+    assert report["settings"]["teams"] == 2
+    assert utils.city_csv == city_csv_before  # the synthetic table was only used for the run
+    for operation in ("poll", "action", "tick"):
+        counts = report[operation]
+        assert counts["count"] > 0
+        assert counts["ok"] == counts["count"], counts
+        assert counts["lost"] == 0
+    con = sqlite3.connect(team_paths[0])
+    assert con.execute("SELECT COUNT(*) FROM team_history").fetchone()[0] > 0
+    con.close()
@@ -0,0 +1,54 @@
+import pytest
+
+from mesosim.lsr import LSRTimeIndex, scale_raw_lsr_to_cur_time
+
+
+def raw_lsr(valid):
+    return ("AMES", "STORY", 42.03, -93.62, "1.00", "", "PUBLIC", "IA", "H", "HAIL", valid, "")
+
+
+@pytest.fixture
+def raw_lsrs():
+    return [raw_lsr(valid) for valid in (
+        "2021-07-10T03:20:00Z", "2021-07-10T03:00:00Z", "2021-07-10T03:40:00Z",
+        "2021-07-10T03:10:00Z",
+    )]
+
+
+timings = {
+    "arc_start_time": "2021-07-10T03:00:00Z",
+    "cur_start_time": "2022-03-30T17:00:00Z",
+    "speed_factor": 4,
+}
+
+
+def test_index_matches_scaled_tuples(raw_lsrs):
+    index = LSRTimeIndex(raw_lsrs, timings)
+    assert index.lsrs == sorted(
+        scale_raw_lsr_to_cur_time(raw_lsrs, timings), key=lambda lsr: lsr[10]
+    )
+
+
+def test_index_queries(raw_lsrs):
+    index = LSRTimeIndex(raw_lsrs, timings)
+    assert [lsr[10] for lsr in index.valid_between(
+        "2022-03-30T17:00:00Z", "2022-03-30T17:05:00Z"
+    )] == ["2022-03-30T17:00:00Z", "2022-03-30T17:02:30Z"]
+
+    assert len(index.newly_visible("2022-03-30T17:03:00Z")) == 2
+    assert index.newly_visible("2022-03-30T17:03:00Z") == []
+    assert [lsr[10] for lsr in index.newly_visible("2022-03-30T17:06:00Z")] == [
+        "2022-03-30T17:05:00Z"
+    ]
+
+    # Slowing the replay pushes the last report later without re-releasing earlier ones
+    index.rebuild(dict(timings, speed_factor=2))
+    assert index.newly_visible("2022-03-30T17:15:00Z") == []
+    assert len(index.newly_visible("2022-03-30T17:20:00Z")) == 1
+
+
+def test_index_normalizes_query_time_strings(raw_lsrs):
+    index = LSRTimeIndex(raw_lsrs, timings)
+    for spelling in ("2022-03-30T17:02:30Z", "2022-03-30T17:02:30+00:00",
+                     "2022-03-30 17:02:30", "2022-03-30T12:02:30-05:00"):
+        assert len(index.visible_at(spelling)) == 2
@@ -0,0 +1,103 @@
+import sqlite3
+
+from conftest import make_chase_db
+from mesosim.chase.placefile import TeamTrackPlacefile
+
+
+def add_track(path, points, start=0):
+    con = sqlite3.connect(path)
+    con.executemany(
+        "INSERT INTO team_history (cur_timestamp, latitude, longitude, status_color) "
+        "VALUES (?,?,?,?)",
+        [
+            ("2022-03-30T17:{:02d}:00Z".format(start + i), lat, lon, color)
+            for i, (lat, lon, color) in enumerate(points)
+        ],
+    )
+    con.commit()
+    con.close()
+
+
+def test_team_track_placefile(tmp_path):
+    moving = make_chase_db(str(tmp_path / "a.db"), team={"name": "Alpha"})
+    parked = make_chase_db(str(tmp_path / "b.db"), team={"name": "Bravo"})
+    add_track(moving, [(41.0, -97.0, "green"), (41.1, -97.0, "green"), (41.2, -97.0, "red")])
+    add_track(parked, [(42.0, -98.0, "green"), (42.0, -98.0, "green")])
+
+    placefile = TeamTrackPlacefile([moving, parked], title="Test Tracks", refresh_minutes=2)
+    out = tmp_path / "tracks.txt"
+    placefile.write(out)
+    text = out.read_text()
+    assert text.startswith("Refresh: 2\nThreshold: 999\nTitle: Test Tracks\n")
+    # Alpha's green run carries on to the first red vertex; one red point draws no line
+    assert text.count('Line: 2, 0, "Alpha"') == 1
+    assert "Color: 0 200 0\nLine: 2, 0, \"Alpha\"\n41.0000, -97.0000\n41.1000, -97.0000\n" \
+        "41.2000, -97.0000\nEnd:" in text
+    assert "Color: 255 0 0\nPlace: 41.2000, -97.0000, Alpha" in text
+    assert text.count('Line: 2, 0, "Bravo"') == 1
+    assert "Place: 42.0000, -98.0000, Bravo" in text
+
+    # Only Alpha moved; Bravo's rendering is reused
+    add_track(moving, [(41.3, -97.0, "red")], start=3)
+    assert placefile.refresh() == 1
+    assert placefile.refresh() == 0
+    text = placefile.render()
+    assert "Place: 41.3000, -97.0000, Alpha" in text
+    assert 'Color: 255 0 0\nLine: 2, 0, "Alpha"\n41.2000, -97.0000\n41.3000, -97.0000\nEnd:' \
+        in text
+    assert "Place: 42.0000, -98.0000, Bravo" in text
+    placefile.close()
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".tmp"] == []
+
+
+def full_render(name, points):
+    # The whole track split into colour runs, as GR should see it
+    entries, run = [], [points[0]]
+    for point in points[1:]:
+        if point[2] != run[-1][2]:
+            entries.append((run[-1][2], run + [point]))
+            run = [point]
+        else:
+            run.append(point)
+    if len(run) > 1:
+        entries.append((run[-1][2], run))
+    return [
+        (color, ["{:.4f}, {:.4f}".format(lat, lon) for lat, lon, _ in run])
+        for color, run in entries
+    ]
+
+
+def parse_lines(text):
+    lines = []
+    for block in text.split("Color: ")[1:]:
+        head, _, rest = block.partition("\n")
+        if rest.startswith("Line:"):
+            color = {"0 200 0": "green", "255 200 0": "yellow", "255 0 0": "red"}[head]
+            lines.append((color, rest.split("\nEnd:")[0].split("\n")[1:]))
+    return lines
+
+
+def test_incremental_track_matches_full_render(tmp_path):
+    import random
+
+    rng = random.Random(4)
+    path = make_chase_db(str(tmp_path / "a.db"), team={"name": "Alpha"})
+    points = [
+        (41 + i * 0.01, -97.0, rng.choice(["green", "green", "yellow", "red"]))
+        for i in range(59)
+    ]
+    unbounded = TeamTrackPlacefile([path])
+    bounded = TeamTrackPlacefile([path], max_points=7)
+    written = 0
+    while written < len(points):
+        chunk = points[written:written + rng.randint(1, 5)]
+        add_track(path, chunk, start=written)
+        written += len(chunk)
+        unbounded.refresh()
+        bounded.refresh()
+        assert parse_lines(unbounded.render()) == full_render("Alpha", points[:written])
+        assert parse_lines(bounded.render()) == full_render(
+            "Alpha", points[max(0, written - 7):written]
+        )
+    unbounded.close()
+    bounded.close()
@@ -0,0 +1,31 @@
+import json
+
+from mesosim.core import profiling
+
+
+def test_spans_only_recorded_when_enabled():
+    profiling.reset()
+
+    @profiling.profiled("square")
+    def square(x):
+        return x * x
+
+    assert square(3) == 9
+    with profiling.span("block"):
+        pass
+    assert profiling.snapshot() == {}
+
+    profiling.enable()
+    try:
+        square(4)
+        square(5)
+        with profiling.span("block"):
+            pass
+    finally:
+        profiling.disable()
+
+    exported = json.loads(profiling.export_json())
+    assert exported["spans"]["square"]["count"] == 2
+    assert exported["spans"]["block"]["count"] == 1
+    assert sum(exported["spans"]["square"]["histogram"].values()) == 2
+    profiling.reset()
@@ -0,0 +1,85 @@
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from mesosim.chase.actions import create_hazard_registry
+from mesosim.chase.projection import DetachedTeam, project_team
+from mesosim.chase.team import Team
+from mesosim.core.utils import move_lat_lon
+
+
+def test_projection_moves_burns_fuel_and_never_writes(chase_db, config):
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    status = dict(team.status)
+
+    # 20 cur minutes at 60 mph east with speed_factor 4: 80 miles on 35 mpg
+    projection = project_team(team, {}, minutes=20, step_seconds=300)
+    assert len(projection.steps) == 5 and projection.hazards == []
+    assert projection.distance_miles == pytest.approx(80.0)
+    assert projection.final["fuel_level"] == pytest.approx(10 - 80 / 35)
+    lat, lon = move_lat_lon(41.5, -97.5, 80, 90)
+    assert projection.final["longitude"] == pytest.approx(lon, abs=1e-3)
+
+    # Running out of fuel stops the team
+    assert project_team(team, {}, minutes=600).final["status_text"] == "Out of Gas"
+
+    # Hazards come from the registry; the live team and DB are untouched
+    hits = project_team(team, registry, minutes=240, step_seconds=600, seed=1).hazards
+    assert all(hazard_type in registry for _, hazard_type in hits)
+    assert team.status == status and team.active_hazards == []
+    assert Team(chase_db, registry, config).status == status
+    with pytest.raises(RuntimeError):
+        DetachedTeam(team).write_status()
+
+
+def test_projection_resumes_speed_after_hazard(chase_db, config):
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    start = datetime(2022, 3, 30, 18, tzinfo=timezone.utc)
+    team.apply_hazard(registry["dirt_road"].activate(now=start))  # 2 minutes at <= 40 mph
+    team.speed = 40.0
+
+    projection = project_team(team, {}, minutes=5, step_seconds=60, now=start, speed=60)
+    assert [step["speed"] for step in projection.steps[1:]] == [40.0, 60.0, 60.0, 60.0, 60.0]
+    assert projection.final["status_text"] == "Chase On"
+    assert projection.final["active_hazards"] == []
+
+    # Without a speed, a slowed team resumes the speed limit
+    projection = project_team(team, {}, minutes=5, step_seconds=60, now=start)
+    assert projection.final["speed"] == 65.0
+
+
+def test_projection_never_touches_global_rng(chase_db, config):
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    start = datetime(2022, 3, 30, 18, tzinfo=timezone.utc)
+
+    def project():
+        return project_team(team, registry, minutes=240, step_seconds=60, now=start, seed=7)
+
+    # Seeded projections repeat exactly
+    assert project().hazards == project().hazards
+
+    # The live simulation's draws are unaffected by projections running in other threads
+    np.random.seed(11)
+    expected = np.random.random(2000)
+    np.random.seed(11)
+    stop = threading.Event()
+
+    def keep_projecting():
+        while not stop.is_set():
+            project()
+
+    threads = [threading.Thread(target=keep_projecting) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        drawn = np.array([np.random.random() for _ in range(2000)])
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert np.array_equal(drawn, expected)
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from mesosim.chase.actions import create_hazard_registry
+from mesosim.chase.proximity import ProximityGrid
+from mesosim.chase.team import Team
+from mesosim.core.utils import haversine_miles
+
+
+def test_proximity_grid_matches_brute_force():
+    grid = ProximityGrid(cell_miles=5.0)
+    rng = random.Random(1)
+    points = {n: (41 + rng.uniform(-1, 1), -97 + rng.uniform(-1, 1)) for n in range(300)}
+    for key, (lat, lon) in points.items():
+        grid.update(key, lat, lon)
+    grid.update(0, 41.0, -97.0)  # move
+    points[0] = (41.0, -97.0)
+    grid.remove(1)
+    del points[1]
+
+    expected = sorted(
+        key for key, (lat, lon) in points.items()
+        if haversine_miles(41.0, -97.0, lat, lon) <= 12
+    )
+    assert sorted(key for key, _ in grid.within(41.0, -97.0, 12)) == expected
+
+
+def test_density_scaled_cc(chase_db, config):
+    team = Team(chase_db, create_hazard_registry(config), config)
+    grid = ProximityGrid(radius_miles=10.0, reference_count=2.0, min_factor=0.25)
+    registry = create_hazard_registry(config, proximity=grid)
+    base = create_hazard_registry(config)["cc"]
+    base_prob = base.probability(team, config, base)
+    assert base_prob > 0
+
+    # Alone: chaser convergence is rarer, but never switched off
+    grid.update_teams([team])
+    assert registry["cc"].probability(team, config, registry["cc"]) == pytest.approx(
+        0.25 * base_prob
+    )
+    grid.update("other1", team.latitude + 0.05, team.longitude)
+    grid.update("other2", team.latitude, team.longitude - 0.05)
+    grid.update("far", team.latitude + 1.0, team.longitude)
+    assert registry["cc"].probability(team, config, registry["cc"]) == pytest.approx(
+        base_prob
+    )
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from mesosim.archive import CaseStore
+from mesosim.replay import ReplayScheduler
+
+warnings_json = Path(__file__).parent / "testfiles" / "svroax_202107100300Z.json"
+
+timings = {
+    "arc_start_time": "2021-07-10T03:00:00Z",
+    "cur_start_time": "2022-03-30T17:00:00Z",
+    "speed_factor": 4,
+}
+
+
+def lsr(valid):
+    return ("AMES", "STORY", 42.03, -93.62, "1.00", "", "PUBLIC", "IA", "H", "HAIL", valid, "")
+
+
+def cur(minutes):
+    return datetime(2022, 3, 30, 17, tzinfo=timezone.utc) + timedelta(minutes=minutes)
+
+
+def make_scheduler(tmp_path, **kwargs):
+    store = CaseStore(str(tmp_path / "case.db"))
+    store.ingest_warning_json(warnings_json)
+    store.ingest_lsrs([lsr("2021-07-10T03:10:00Z"), lsr("2021-07-10T03:40:00Z")])
+    scheduler = ReplayScheduler.from_case_store(store, timings, **kwargs)
+    store.close()
+    return scheduler
+
+
+def test_due_pops_events_in_time_order(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    assert len(scheduler) == 6
+    assert scheduler.next_due_time() == cur(2.5)  # the 03:10Z lsr, at speed factor 4
+
+    assert scheduler.due(cur(2)) == []
+    events = scheduler.due(cur(5))
+    assert [event.kind for event in events] == ["lsr", "warning", "warning"]
+    assert [event.due for event in events] == sorted(event.due for event in events)
+    assert events[1].payload.event_id == "KOAX.SV.W.0089"
+    assert events[1].due == events[1].payload.valid
+    assert scheduler.last_poll == cur(5)
+
+    assert scheduler.due("2022-03-30T17:05:00Z") == []  # nothing is released twice
+    assert scheduler.skip_until(cur(13)) == 2  # the 03:40Z lsr and a warning
+    assert [event.kind for event in scheduler.due(cur(60))] == ["warning"]
+    assert scheduler.next_due_time() is None
+
+
+def test_stream_waits_for_each_event(tmp_path, monkeypatch):
+    now = [cur(0)]
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        now[0] += timedelta(seconds=delay)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    scheduler = make_scheduler(tmp_path, clock=lambda: now[0])
+
+    async def collect():
+        return [event async for event in scheduler.stream()]
+
+    events = asyncio.run(collect())
+    assert len(events) == 6 and len(scheduler) == 0
+    assert [event.due for event in events] == sorted(event.due for event in events)
+    assert sleeps[0] == 150.0
+    assert now[0] == events[-1].due
@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import queue
+import sqlite3
+import time
+
+import pytest
+
+from conftest import make_chase_db
+from mesosim.chase.scheduler import TickScheduler, _worker, run_tick
+
+
+def die_on_team0(team, hazards, config, seconds):
+    if team.path.endswith("team0.db"):
+        os._exit(3)
+    run_tick(team, hazards, config, seconds)
+
+
+def hang_on_team0(team, hazards, config, seconds):
+    if team.path.endswith("team0.db"):
+        time.sleep(3600)
+    run_tick(team, hazards, config, seconds)
+
+
+def history_count(path):
+    con = sqlite3.connect(path)
+    count = con.execute("SELECT COUNT(*) FROM team_history").fetchone()[0]
+    con.close()
+    return count
+
+
+def team_paths(tmp_path, n):
+    paths = [str(tmp_path / "team{}.db".format(i)) for i in range(n)]
+    for i, path in enumerate(paths):
+        make_chase_db(path, team={"id": "team{}".format(i)})
+    return paths
+
+
+def test_scheduler_ticks_teams_on_two_workers(tmp_path):
+    paths = team_paths(tmp_path, 3)
+    scheduler = TickScheduler(
+        paths, paths[0], interval=0.5, processes=2,
+        mp_context=multiprocessing.get_context("fork"),
+    )
+    with scheduler:
+        scheduler.run(rounds=3)
+
+    report = scheduler.report()
+    for path in paths:
+        stats = report[path]
+        assert stats["errors"] == 0 and stats["timeouts"] == 0
+        assert stats["ticks"] >= 1 and stats["ticks"] + stats["overruns"] == 3
+        assert stats["p50_s"] is not None
+        assert history_count(path) == stats["ticks"]
+
+
+def test_scheduler_restarts_dead_workers(tmp_path):
+    paths = team_paths(tmp_path, 2)
+    scheduler = TickScheduler(
+        paths, paths[1], tick=die_on_team0, interval=0.5, processes=2,
+        mp_context=multiprocessing.get_context("fork"),
+    )
+    with scheduler:
+        scheduler.run(rounds=3)
+
+    report = scheduler.report()
+    assert report[paths[0]]["timeouts"] >= 2  # lost, restarted and dispatched again
+    assert "worker exited" in report[paths[0]]["last_error"]
+    assert report[paths[1]]["errors"] == 0 and report[paths[1]]["ticks"] >= 1
+    assert history_count(paths[1]) == report[paths[1]]["ticks"]
+
+
+def test_scheduler_gives_up_on_stuck_ticks(tmp_path):
+    paths = team_paths(tmp_path, 2)
+    scheduler = TickScheduler(
+        paths, paths[1], tick=hang_on_team0, interval=0.5, processes=2, tick_timeout=0.7,
+        mp_context=multiprocessing.get_context("fork"),
+    )
+    with scheduler:
+        scheduler.run(rounds=4)
+
+    report = scheduler.report()
+    assert report[paths[0]]["timeouts"] >= 1
+    assert "timed out" in report[paths[0]]["last_error"]
+    assert report[paths[1]]["errors"] == 0
+
+
+class BrokenConnection:
+    def __init__(self, con):
+        self.con = con
+
+    def __getattr__(self, name):
+        return getattr(self.con, name)
+
+    def close(self):
+        self.con.close()
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+def test_worker_closes_the_connection_of_a_failed_tick(tmp_path):
+    path = team_paths(tmp_path, 1)[0]
+    seen = []
+
+    def fail_twice(team, hazards, config, seconds):
+        seen.append(team)
+        if len(seen) == 2:
+            team.con = BrokenConnection(team.con)
+        if len(seen) <= 2:
+            raise RuntimeError("tick failed")
+        run_tick(team, hazards, config, seconds)
+
+    inbox, outbox = queue.Queue(), queue.Queue()
+    for sequence in range(3):
+        inbox.put((path, 10.0, sequence))
+    inbox.put(None)
+    _worker(path, fail_twice, inbox, outbox)
+
+    results = [outbox.get_nowait() for _ in range(3)]
+    assert [error is not None for _, _, _, error in results] == [True, True, False]
+    assert len({id(team) for team in seen}) == 3  # a fresh Team after each failure
+    for team in seen[:2]:
+        with pytest.raises(sqlite3.ProgrammingError):
+            team.con.execute("SELECT 1")
+    assert history_count(path) == 1
@@ -0,0 +1,119 @@
+import sqlite3
+
+import pytest
+
+from conftest import make_chase_db
+from mesosim.chase.actions import create_hazard_registry
+from mesosim.chase.team import Team
+from mesosim.core.config import Config
+from mesosim.core.schema import (
+    SchemaError,
+    connect,
+    ensure_schema,
+    migrate,
+    migrations,
+    schema_version,
+)
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    return make_chase_db(str(tmp_path / "legacy.db"), migrate=False)
+
+
+def test_legacy_db_is_upgraded_with_indexes(legacy_db):
+    con = sqlite3.connect(legacy_db)
+    con.execute("INSERT INTO team_info VALUES ('points', '5')")  # duplicate key
+    con.commit()
+
+    assert schema_version(con, "team") == 0
+    assert ensure_schema(con, "team") == len(migrations["team"])
+    assert ensure_schema(con, "config") == len(migrations["config"])
+    assert ensure_schema(con, "team") == len(migrations["team"])  # idempotent
+
+    # Duplicates collapse to the newest row, and upserts now work
+    rows = con.execute("SELECT team_value FROM team_info WHERE team_setting='points'")
+    assert rows.fetchall() == [("5",)]
+    con.execute(
+        "INSERT INTO team_info VALUES ('points', '7') ON CONFLICT (team_setting) "
+        "DO UPDATE SET team_value = excluded.team_value"
+    )
+
+    plan = " ".join(
+        row[-1]
+        for row in con.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM hazard_queue WHERE status='active'"
+        )
+    )
+    assert "hazard_queue_status" in plan
+    con.close()
+
+
+def test_migrate_dedupes_vehicles(legacy_db):
+    con = sqlite3.connect(legacy_db)
+    con.execute(
+        "INSERT INTO vehicles VALUES ('sedan', 'Sedan', 100, 40, 60, 30, 14, 0.01, 'low')"
+    )
+    con.commit()
+    con.close()
+
+    assert migrate(legacy_db) == {
+        "team": len(migrations["team"]), "config": len(migrations["config"])
+    }
+    con = sqlite3.connect(legacy_db)
+    assert con.execute("SELECT top_speed FROM vehicles").fetchall() == [(100.0,)]
+    assert con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    con.close()
+
+
+def test_construction_needs_existing_migrated_db(legacy_db, tmp_path):
+    missing = str(tmp_path / "typo.db")
+    with pytest.raises(sqlite3.OperationalError):
+        connect(missing, "team")
+    assert not (tmp_path / "typo.db").exists()
+
+    with pytest.raises(SchemaError):
+        Config(legacy_db)
+    con = sqlite3.connect(legacy_db)
+    assert schema_version(con, "team") == 0  # untouched
+    assert con.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    con.close()
+
+    migrate(legacy_db)
+    config = Config(legacy_db)
+    Team(legacy_db, create_hazard_registry(config), config)
+
+
+def test_migrate_keeps_config_values_in_use(legacy_db):
+    con = sqlite3.connect(legacy_db)
+    con.execute("INSERT INTO config VALUES ('speed_limit', '80')")
+    con.execute("INSERT INTO hazard_config VALUES ('cc_prob', '0.5')")
+    con.commit()
+    con.close()
+
+    legacy = Config(legacy_db, con=sqlite3.connect(legacy_db))
+    before = (legacy.get_config_value("speed_limit"), legacy.hazard_config("cc_prob"))
+    legacy.con.close()
+
+    migrate(legacy_db)
+    config = Config(legacy_db)
+    assert (config.get_config_value("speed_limit"), config.hazard_config("cc_prob")) == before
+    assert before == ("65", "0.01")
+
+
+def test_migrate_switches_team_dbs_to_incremental_vacuum(legacy_db, tmp_path):
+    def auto_vacuum(path):
+        con = sqlite3.connect(path)
+        try:
+            return con.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            con.close()
+
+    assert auto_vacuum(legacy_db) == 0
+    migrate(legacy_db)
+    assert auto_vacuum(legacy_db) == 2  # INCREMENTAL, so compaction never needs VACUUM
+    assert Team(legacy_db, create_hazard_registry(Config(legacy_db)), Config(legacy_db))
+
+    config_only = str(tmp_path / "config.db")
+    migrate(config_only, components=("config",))
+    assert auto_vacuum(config_only) == 0
@@ -0,0 +1,67 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+
+from conftest import make_chase_db
+from mesosim.scoring import LSRScorer, _haversine_block
+
+
+def lsr(lat, lon, type_letter, valid):
+    return ("TOWN", "COUNTY", lat, lon, "", "", "PUBLIC", "NE", type_letter, "", valid, "")
+
+
+def test_scorer_matches_brute_force():
+    rng = np.random.default_rng(0)
+    start = np.datetime64("2022-03-30T17:00:00").astype(np.int64)
+    lsrs = [
+        lsr(41 + rng.uniform(-1, 1), -97 + rng.uniform(-1, 1), rng.choice(["T", "H", "X"]),
+            str(np.datetime64(int(start + rng.uniform(0, 7200)), "s")) + "Z")
+        for _ in range(200)
+    ]
+    scorer = LSRScorer(lsrs, radius_miles=8, window_minutes=10)
+    assert all(report[8] != "X" for report in scorer.lsrs)
+
+    times = start + np.arange(0, 7200, 30.0)
+    lats = 40.5 + np.cumsum(rng.normal(0, 0.01, len(times)))
+    lons = -97.5 + np.cumsum(rng.normal(0.005, 0.01, len(times)))
+    intercepts = scorer.score_track(times, lats, lons)
+
+    distance = _haversine_block(lats, lons, scorer.lats, scorer.lons)
+    ok = (distance <= 8) & (np.abs(times[:, None] - scorer.times[None, :]) <= 600)
+    assert sorted(intercepts) == sorted(np.nonzero(ok.any(axis=0))[0].tolist())
+    for report, (miles, _) in intercepts.items():
+        assert np.isclose(miles, distance[ok[:, report], report].min())
+
+    result = scorer.result(intercepts)
+    assert result["points"] == sum(scorer.values[report] for report in intercepts)
+
+
+def test_score_teams_from_team_databases(tmp_path):
+    path = make_chase_db(str(tmp_path / "team.db"))
+    con = sqlite3.connect(path)
+    con.executemany(
+        "INSERT INTO team_history (cur_timestamp, latitude, longitude) VALUES (?,?,?)",
+        [("2022-03-30T17:00:00Z", 41.0, -97.0), ("2022-03-30T17:10:00Z", 41.0, -97.2),
+         ("2022-03-30T17:20:00Z", None, None)],
+    )
+    con.commit()
+    con.close()
+    bare = str(tmp_path / "bare.db")
+    sqlite3.connect(bare).close()  # no team_history table
+
+    lsrs = [
+        lsr(41.01, -97.2, "T", datetime(2022, 3, 30, 17, 12, tzinfo=timezone.utc)),
+        lsr(41.0, -97.0, "H", "2022-03-30T17:02:00Z"),
+        lsr(41.0, -97.0, "H", "2022-03-30T18:00:00Z"),  # too late
+        lsr(45.0, -97.0, "T", "2022-03-30T17:00:00Z"),  # too far
+    ]
+    scorer = LSRScorer(lsrs, radius_miles=5, window_minutes=10)
+    results = scorer.score_teams([path, bare])
+
+    assert results[path]["points"] == 12
+    assert [item["lsr"][8] for item in results[path]["intercepts"]] == ["H", "T"]
+    assert results[path]["intercepts"][1]["time"] == datetime(
+        2022, 3, 30, 17, 10, tzinfo=timezone.utc
+    )
+    assert "team_history" in results[bare]["error"]
@@ -0,0 +1,77 @@
+import json
+import sqlite3
+
+import pytest
+
+from mesosim.chase.actions import create_hazard_registry
+from mesosim.chase.session import Session
+from mesosim.chase.team import read_status_document
+
+
+def history_rows(path):
+    con = sqlite3.connect(path)
+    rows = con.execute("SELECT latitude, speed FROM team_history").fetchall()
+    con.close()
+    return rows
+
+
+def test_tick_commits_once_atomically(chase_db):
+    with Session(chase_db) as session:
+        hazards = create_hazard_registry(session.config)
+        with session.tick(hazards) as team:
+            assert team.con is session.con is session.config.con
+            team.speed = 30.0
+            team.write_status()
+            assert history_rows(chase_db) == []  # not yet committed
+        assert history_rows(chase_db) == [(41.5, 30.0)]
+
+
+def test_tick_rolls_back_on_error(chase_db):
+    with Session(chase_db) as session:
+        hazards = create_hazard_registry(session.config)
+        with pytest.raises(RuntimeError):
+            with session.tick(hazards) as team:
+                team.write_status()
+                raise RuntimeError("boom")
+        assert history_rows(chase_db) == []
+
+
+def test_write_status_materializes_status_document(chase_db, monkeypatch):
+    monkeypatch.setattr(
+        "mesosim.chase.team.nearest_city", lambda *args: ("Norfolk", "NE", 3, 90)
+    )
+    assert read_status_document(chase_db) is None
+    with Session(chase_db) as session:
+        hazards = create_hazard_registry(session.config)
+        for _ in range(2):
+            with session.tick(hazards) as team:
+                team.write_status()
+        expected = team.output_status_dict()
+
+    version, updated, document = read_status_document(chase_db)
+    assert version == 2
+    assert updated == team.status["last_update"]
+    assert json.loads(document) == json.loads(json.dumps(expected))
+
+
+def test_unrenderable_status_marks_document_stale(chase_db, monkeypatch):
+    monkeypatch.setattr(
+        "mesosim.chase.team.nearest_city", lambda *args: ("Norfolk", "NE", 3, 90)
+    )
+    with Session(chase_db) as session:
+        hazards = create_hazard_registry(session.config)
+        with session.tick(hazards) as team:
+            team.write_status()
+        assert read_status_document(chase_db)[0] == 1
+
+        def fail(*args):
+            raise OSError("no city data")
+
+        monkeypatch.setattr("mesosim.chase.team.nearest_city", fail)
+        with pytest.warns(UserWarning, match="no city data"):
+            with session.tick(hazards) as team:
+                team.speed = 20.0
+                team.write_status()
+    # The tick still commits, and readers are told to fall back to team_info
+    assert history_rows(chase_db)[-1] == (41.5, 20.0)
+    assert read_status_document(chase_db) is None
@@ -0,0 +1,84 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from mesosim.chase import snapshot
+from mesosim.chase.actions import create_hazard_registry
+from mesosim.chase.snapshot import SnapshotError, restore_snapshot, save_snapshot
+from mesosim.chase.team import Team
+from mesosim.core.config import Config
+
+
+def test_snapshot_round_trip_and_verification(chase_db, tmp_path):
+    config = Config(chase_db)
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    team.apply_hazard(registry["flat_tire"])
+    team.write_status()
+
+    snap = str(tmp_path / "session.snap")
+    save_snapshot(snap, {"team1": team})
+    expected_draw = np.random.random()
+
+    restored = restore_snapshot(snap, registry, config)
+    assert restored.reloaded == []
+    copy = restored.teams["team1"]
+    assert copy.status == team.status
+    assert [h.to_hazard_tuple() for h in copy.active_hazards] == [
+        h.to_hazard_tuple() for h in team.active_hazards
+    ]
+    assert copy.vehicle.calculate_mpg(60) == team.vehicle.calculate_mpg(60)
+    assert np.random.random() == expected_draw
+
+    # A write that leaves the rows as they were moves the stamp but passes the checksum
+    con = sqlite3.connect(chase_db)
+    con.execute("UPDATE team_info SET team_value = team_value WHERE team_setting = 'points'")
+    con.commit()
+    assert restore_snapshot(snap, registry, config).reloaded == []
+
+    # A DB change after the snapshot forces a reload of that team
+    con.execute("UPDATE team_info SET team_value = '1' WHERE team_setting = 'points'")
+    con.commit()
+    con.close()
+    restored = restore_snapshot(snap, registry, config)
+    assert restored.reloaded == ["team1"]
+    assert restored.teams["team1"].points == 1
+
+
+def test_unchanged_stamp_skips_checksum(chase_db, tmp_path, monkeypatch):
+    config = Config(chase_db)
+    registry = create_hazard_registry(config)
+    team = Team(chase_db, registry, config)
+    snap = str(tmp_path / "session.snap")
+    save_snapshot(snap, {"team1": team})
+
+    def no_checksum(con):
+        raise AssertionError("checksum computed for an unchanged team")
+
+    monkeypatch.setattr(snapshot, "team_db_checksum", no_checksum)
+    assert restore_snapshot(snap, registry, config).reloaded == []
+
+
+def test_corrupt_snapshot_rejected(tmp_path):
+    snap = tmp_path / "session.snap"
+    save_snapshot(str(snap), {})
+    data = bytearray(snap.read_bytes())
+    data[-1] ^= 0xFF
+    snap.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError):
+        restore_snapshot(str(snap), {}, None)
+
+
+def test_failed_save_keeps_previous_snapshot(tmp_path, monkeypatch):
+    snap = tmp_path / "session.snap"
+    save_snapshot(str(snap), {}, extra="first")
+
+    def disk_full(fd):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(snapshot.os, "fsync", disk_full)
+    with pytest.raises(OSError):
+        save_snapshot(str(snap), {}, extra="second")
+    assert restore_snapshot(str(snap), {}, None, restore_rng=False).extra == "first"
+    assert [path.name for path in tmp_path.iterdir()] == ["session.snap"]
@@ -0,0 +1,59 @@
+import sqlite3
+
+from mesosim.core.sqltrace import QueryTracer
+
+
+def test_query_tracer_counts_repeats_and_scans():
+    con = sqlite3.connect(":memory:")
+    con.execute("CREATE TABLE action_queue (action_id INTEGER PRIMARY KEY, action_taken TEXT)")
+    tracer = QueryTracer(explain=True, budgets={"poll": 2}).attach(con)
+
+    with tracer.operation("poll"):
+        for _ in range(3):
+            con.execute("SELECT * FROM action_queue WHERE action_taken IS NULL").fetchall()
+
+    report = tracer.report()["poll"]
+    assert report["calls"] == 1
+    assert report["statements"] == 3
+    assert report["over_budget"]
+    assert list(report["repeated"].values()) == [3]
+    assert len(report["full_scans"]) == 1
+
+    tracer.detach()
+    con.execute("SELECT 1")
+    assert tracer.report()["poll"]["statements"] == 3
+
+
+class _FakeConnection:
+    """Returns a canned query plan, as older SQLite versions word it."""
+
+    def __init__(self, detail):
+        self.detail = detail
+
+    def execute(self, statement):
+        return self
+
+    def fetchall(self):
+        return [(2, 0, 0, self.detail)]
+
+
+def test_full_scans_recognized_in_old_plan_wording():
+    tracer = QueryTracer(explain=True)
+    for detail in ("SCAN TABLE action_queue", "SCAN action_queue"):
+        assert tracer._find_full_scans(_FakeConnection(detail), "SELECT 1") == [detail]
+    assert tracer._find_full_scans(
+        _FakeConnection("SCAN TABLE action_queue USING INDEX action_queue_taken"), "SELECT 1"
+    ) == []
+
+
+def test_explaining_on_one_thread_keeps_tracing_others():
+    import threading
+
+    con = sqlite3.connect(":memory:", check_same_thread=False)
+    tracer = QueryTracer().attach(con)
+    tracer._local.explaining = True
+    worker = threading.Thread(target=lambda: con.execute("SELECT 1"))
+    worker.start()
+    worker.join()
+    con.execute("SELECT 2")  # ignored: this thread is explaining
+    assert tracer.report()["(untracked)"]["statements"] == 1
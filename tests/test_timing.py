@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from dateutil import parser
+
+from mesosim.core.timing import (
+    epoch_seconds, format_time, parse_time, std_fmt, to_utc, vtec_time_fmt
+)
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2021-07-10T03:12:45Z", "2021-07-10T03:12Z", "210710T0312Z", "2021-07-10 03:12:00+00:00"],
+)
+def test_parse_time_matches_dateutil(value):
+    fast = parse_time(value)
+    assert fast == parser.parse(value, yearfirst=True)
+    assert fast.utcoffset().total_seconds() == 0
+
+
+def test_parse_time_falls_back_to_dateutil():
+    assert parse_time("July 10 2021 3:12 AM") == datetime(2021, 7, 10, 3, 12)
+    with pytest.raises(ValueError):
+        parse_time("000000T0000Z")  # VTEC "until further notice"
+
+
+def test_format_time_matches_strftime():
+    time = datetime(2021, 7, 1, 3, 2, 9, tzinfo=timezone.utc)
+    for fmt in (std_fmt, vtec_time_fmt, "%d%H%M"):
+        assert format_time(time, fmt) == time.strftime(fmt)
+
+
+def test_to_utc_and_epoch_seconds_agree_across_spellings():
+    expected = datetime(2021, 7, 10, 3, 12, tzinfo=timezone.utc)
+    central = timezone(timedelta(hours=-5))
+    for time in (
+        "2021-07-10T03:12:00Z",
+        "2021-07-10T03:12Z",
+        "2021-07-09T22:12:00-05:00",
+        datetime(2021, 7, 10, 3, 12),  # naive means UTC
+        expected.astimezone(central),
+    ):
+        assert to_utc(time) == expected and to_utc(time).tzinfo == timezone.utc
+        assert epoch_seconds(time) == expected.timestamp()
+    assert epoch_seconds(1625886720) == 1625886720.0
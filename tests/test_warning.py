@@ -4,7 +4,9 @@ from pathlib import Path
 
 import pytest
 
-from mesosim.warning import process_warning_text
+from mesosim.warning import (
+    WarningIndex, points_in_polygons, process_warning, process_warning_text
+)
 
 @pytest.fixture(scope='session')
 def warning_text(request):
@@ -44,3 +46,78 @@ def test_warning_parsing_basic(warning_text, new_time):
         assert new_text_lines[37][-12:-1] == '1200 PM CDT'
         assert new_text_lines[38][-12:-1] == '1203 PM CDT'
         assert new_text_lines[39][-12:-1] == '1204 PM CDT'
+
+
+@pytest.fixture(scope='module')
+def processed_warnings():
+    with open(Path(__file__).parent / "testfiles/svroax_202107100300Z.json", "r") as f:
+        data = json.load(f)
+    timings = {
+        'arc_start_time': '2021-07-10T03:00Z',
+        'cur_start_time': '2022-03-30T17:00Z',
+        'speed_factor': 4
+    }
+    return [process_warning(result['data'], timings) for result in data['results']]
+
+
+def test_process_warning_geometry(processed_warnings):
+    first = processed_warnings[0]
+    assert first.event_id == 'KOAX.SV.W.0089'
+    assert first.valid == parser.parse('2022-03-30T17:03Z')
+    assert first.expire == parser.parse('2022-03-30T17:15Z')
+    assert first.polygon[0] == (42.37, -98.30)
+    assert len(first.polygon) == 6
+
+
+def test_warning_index_and_teams_inside(processed_warnings):
+    index = WarningIndex(processed_warnings)
+    active = index.active_at(parser.parse('2022-03-30T17:05Z'))
+    assert [w.event_id for w in active] == ['KOAX.SV.W.0089', 'KOAX.SV.W.0090']
+    assert index.active_at(parser.parse('2022-03-30T16:59Z')) == []
+
+    positions = {'in_first': (42.3, -97.7), 'outside': (40.0, -100.0)}
+    inside = index.teams_inside(positions, parser.parse('2022-03-30T17:05Z'))
+    assert [w.event_id for w in inside['in_first']] == ['KOAX.SV.W.0089']
+    assert inside['outside'] == []
+
+
+def test_points_in_polygons():
+    square = [(0, 0), (0, 1), (1, 1), (1, 0)]
+    triangle = [(0, 0), (2, 0), (0, 2)]
+    result = points_in_polygons([0.5, 1.5, 3], [0.5, 0.2, 3], [square, triangle])
+    assert result.tolist() == [[True, True], [False, True], [False, False]]
+
+
+def test_warning_index_add_matches_bulk(processed_warnings):
+    added = WarningIndex()
+    for warning in reversed(processed_warnings):
+        added.add(warning)
+    added.add(processed_warnings[0])  # equal valid time goes after the existing one
+    bulk = WarningIndex(list(reversed(processed_warnings)) + [processed_warnings[0]])
+    assert added._valid_times == sorted(
+        w.valid for w in processed_warnings + [processed_warnings[0]]
+    )
+    assert [entry[2] for entry in added._entries] == [entry[2] for entry in bulk._entries]
+    time = parser.parse('2022-03-30T17:05Z')
+    assert added.active_at(time) == bulk.active_at(time)
+
+
+def test_open_ended_vtec_begin_is_carried_through():
+    with open(Path(__file__).parent / "testfiles/svroax_202107100300Z.json", "r") as f:
+        text = json.load(f)['results'][0]['data']
+    # A continuation: already in effect, so VTEC has no begin time
+    text = text.replace(
+        "/O.NEW.KOAX.SV.W.0089.210710T0312Z-", "/O.CON.KOAX.SV.W.0089.000000T0000Z-"
+    )
+    timings = {
+        'arc_start_time': '2021-07-10T03:12Z',
+        'cur_start_time': '2022-03-30T17:00Z',
+        'speed_factor': 4
+    }
+
+    processed = process_warning(text, timings)
+    assert "/O.CON.KOAX.SV.W.0089.000000T0000Z-220330T1712Z/" in processed.text
+    assert processed.vtec['begin'] is None
+    # Valid from the issuance line (1012 PM CDT, the arc start) until the VTEC end
+    assert processed.valid == parser.parse('2022-03-30T17:00Z')
+    assert processed.expire == parser.parse('2022-03-30T17:12Z')